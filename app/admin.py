@@ -1,9 +1,85 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.text import smart_split, unescape_string_literal
+from . import asistencia, fts, search
 from .models import (
     Especialidad, Medico, Paciente, Receta,
-    DisponibilidadMedico, Turno, HistorialClinico
+    DisponibilidadMedico, Turno, HistorialClinico, ResumenAsistencia
 )
+from .serializers import ReporteAsistenciaQuerySerializer
+from .pagination import EstimatedCountPaginator
+
+
+class FiltroSeleccionado(admin.RelatedFieldListFilter):
+    """
+    Filtro por FK para tablas grandes: en vez de listar todas las filas
+    relacionadas muestra sólo la elegida y un campo para ingresar el id.
+    """
+    template = 'admin/app/filtro_seleccionado.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.otros_parametros = [
+            (clave, valor) for clave, valor in request.GET.items()
+            if not clave.startswith(field_path + '__') and clave != 'p'
+        ]
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        ids = [valor for valor in self.lookup_val or () if str(valor).isdigit()]
+        if not ids:
+            return []
+        relacionados = field.remote_field.model._default_manager.filter(pk__in=ids)
+        return [(obj.pk, str(obj)) for obj in relacionados]
+
+    def has_output(self):
+        return True
+
+
+class ListadoGrandeAdmin(admin.ModelAdmin):
+    """Changelist sin COUNT(*) completo: ver EstimatedCountPaginator."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class DescripcionFTSAdmin(ListadoGrandeAdmin):
+    """
+    Busca 'descripcion' en el índice de texto completo (ver app.fts) y los
+    campos de las relaciones con un subquery sobre la tabla relacionada, así
+    la tabla propia se lee sólo por índices (pk, paciente_id, medico_id) y
+    nunca con LIKE '%x%'. Como en Django, cada término tiene que aparecer en
+    alguno de los campos.
+    """
 
+    def get_search_results(self, request, queryset, search_term):
+        relaciones = [campo for campo in self.search_fields if campo != 'descripcion']
+        for termino in smart_split(search_term):
+            if termino.startswith(('"', "'")) and termino[0] == termino[-1]:
+                termino = unescape_string_literal(termino)
+            condicion = Q(pk__in=fts.filtrar(queryset.model._default_manager.all(), termino)
+                          .values('pk'))
+            for campo in relaciones:
+                condicion |= self.buscar_en_relacion(queryset.model, campo, termino)
+            queryset = queryset.filter(condicion)
+        return queryset, False
+
+    @staticmethod
+    def buscar_en_relacion(modelo, campo, termino):
+        relacion, _, atributo = campo.partition('__')
+        relacionado = modelo._meta.get_field(relacion).related_model
+        if relacionado is Paciente:
+            # Prefijos de DNI, apellido o nombre por índice (ver app.search).
+            filtro = search.filtro(termino)
+            encontrados = (relacionado.objects.filter(filtro) if filtro is not None
+                           else relacionado.objects.none())
+        else:
+            # Médicos: tabla chica, el LIKE recorre sólo esa tabla.
+            encontrados = relacionado.objects.filter(**{f'{atributo}__icontains': termino})
+        return Q(**{f'{relacion}__in': encontrados.values('pk')})
 
 @admin.register(Especialidad)
 class EspecialidadAdmin(admin.ModelAdmin):
@@ -13,12 +89,19 @@ class EspecialidadAdmin(admin.ModelAdmin):
     ordering = ('nombre',)
 
 @admin.register(Paciente)
-class PacienteAdmin(admin.ModelAdmin):
+class PacienteAdmin(ListadoGrandeAdmin):
     """Configuración para el modelo Paciente."""
     list_display = ('id', 'dni', 'nombre', 'apellido', 'mail')
     search_fields = ('dni', 'nombre', 'apellido')
     ordering = ('apellido', 'nombre')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Prefijos por índice en vez de LIKE '%x%' sobre toda la tabla (ver app.search).
+        condicion = search.filtro(search_term)
+        if condicion is None:
+            return queryset, False
+        return queryset.filter(condicion), False
+
 class DisponibilidadMedicoInline(admin.TabularInline):
     """Muestra la disponibilidad dentro de la vista de Medico."""
     model = DisponibilidadMedico
@@ -36,23 +119,29 @@ class MedicoAdmin(admin.ModelAdmin):
 @admin.register(DisponibilidadMedico)
 class DisponibilidadMedicoAdmin(admin.ModelAdmin):
     list_display = ('id', 'medico', 'dia_semana', 'hora_inicio', 'hora_fin')
+    list_select_related = ('medico',)
     list_filter = ('medico', 'dia_semana')
 
 @admin.register(Turno)
-class TurnoAdmin(admin.ModelAdmin):
+class TurnoAdmin(ListadoGrandeAdmin):
     """Configuración para el modelo Turno."""
     list_display = ('id', 'paciente', 'medico', 'fecha', 'estado', 'duracion', 'recordatorio')
+    list_select_related = ('paciente', 'medico')
     search_fields = ('paciente__nombre', 'paciente__apellido', 'medico__apellido', 'motivo_consulta')
-    list_filter = ('estado', 'medico', 'fecha')
+    list_filter = ('estado', ('medico', FiltroSeleccionado), ('paciente', FiltroSeleccionado), 'fecha')
+    autocomplete_fields = ('paciente', 'medico')
     ordering = ('-fecha',) # Ordena por fecha más reciente primero
-    date_hierarchy = 'fecha' # Permite navegar por fechas
+    # Sin date_hierarchy: arma sus links con un DISTINCT sobre toda la tabla.
+    # El filtro por 'fecha' de la barra lateral cubre la navegación por fechas.
 
 @admin.register(Receta)
-class RecetaAdmin(admin.ModelAdmin):
+class RecetaAdmin(DescripcionFTSAdmin):
     """Configuración para el modelo Receta."""
     list_display = ('id', 'paciente', 'medico', 'descripcion_corta')
+    list_select_related = ('paciente', 'medico')
     search_fields = ('paciente__nombre', 'medico__nombre', 'descripcion')
-    list_filter = ('medico',)
+    list_filter = (('medico', FiltroSeleccionado), ('paciente', FiltroSeleccionado))
+    autocomplete_fields = ('paciente', 'medico')
 
     def descripcion_corta(self, obj):
         """Muestra una vista previa de la descripción."""
@@ -63,14 +152,64 @@ class RecetaAdmin(admin.ModelAdmin):
 
 # 7. Historial Clínico
 @admin.register(HistorialClinico)
-class HistorialClinicoAdmin(admin.ModelAdmin):
+class HistorialClinicoAdmin(DescripcionFTSAdmin):
     """Configuración para el modelo HistorialClinico."""
     # Como el ID es la clave foránea a Turno, lo mostramos.
     list_display = ('turno', 'paciente', 'descripcion_corta')
+    # str(turno) muestra paciente y médico del turno.
+    list_select_related = ('paciente', 'turno__paciente', 'turno__medico')
     search_fields = ('paciente__nombre', 'descripcion')
-    list_filter = ('paciente',)
+    list_filter = (('paciente', FiltroSeleccionado),)
+    autocomplete_fields = ('paciente', 'turno')
 
     def descripcion_corta(self, obj):
         """Muestra una vista previa de la descripción."""
         return obj.descripcion[:50] + '...' if len(obj.descripcion) > 50 else obj.descripcion
     descripcion_corta.short_description = 'Descripción del Historial'
+
+# ---
+
+# 8. Resumen de Asistencia (solo lectura: lo mantiene app.asistencia)
+@admin.register(ResumenAsistencia)
+class ResumenAsistenciaAdmin(ListadoGrandeAdmin):
+    """Filas del resumen y el "Reporte de Asistencia" (admin:reporte-asistencia)."""
+    list_display = ('medico', 'dia', 'estado', 'cantidad')
+    list_select_related = ('medico',)
+    list_filter = ('estado', ('medico', FiltroSeleccionado), 'dia')
+    ordering = ('-dia',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('reporte/', self.admin_site.admin_view(self.reporte_view),
+                 name='reporte-asistencia'),
+        ] + super().get_urls()
+
+    def reporte_view(self, request):
+        hoy = timezone.localdate()
+        # En ISO: el <input type="date"> del formulario no acepta el formato local.
+        params = ReporteAsistenciaQuerySerializer(data={
+            'desde': (hoy - timedelta(days=30)).isoformat(), 'hasta': hoy.isoformat(),
+            **request.GET.dict(),
+        })
+        resultados = []
+        if params.is_valid():
+            datos = params.validated_data
+            resultados = asistencia.reporte(datos['desde'], datos['hasta'], datos.get('medico'))
+        return TemplateResponse(request, 'admin/app/reporte_asistencia.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Reporte de Asistencia',
+            'params': params.data,
+            'errores': params.errors,
+            'estados': asistencia.ESTADOS,
+            'resultados': resultados,
+        })
@@ -0,0 +1,153 @@
+"""
+Agenda semanal de un médico (GET /app/medicos/{id}/agenda/?semana=).
+
+La respuesta de cada (médico, semana ISO) se guarda en la caché compartida
+(ver CACHES en tp.settings) y se borra sólo cuando cambia un turno de esa
+semana: al crear, editar o borrar un turno se invalidan la semana en la que
+estaba (Turno.agenda_original) y la semana en la que quedó, así que mover un
+turno de semana o de médico limpia las dos entradas. Las señales de Turno y
+las rutas de lotes (app.bulk) llaman a `invalidar_turnos`.
+
+Cada turno muestra además los nombres del médico y del paciente. La clave
+incluye una versión propia de cada médico, que cambia cuando se guarda el
+médico (`invalidar_medico`); al guardar un paciente se borran sólo las
+semanas de sus turnos (`invalidar_paciente`). Ninguno de los dos toca la
+agenda de los demás médicos.
+
+Con réplicas (app.routers), una semana invalidada queda marcada como
+INVALIDADA durante REPLICA_PEGADO_SEGUNDOS: en ese lapso sólo la vuelve a
+guardar una lectura del primario, y lo leído de una réplica (que puede no
+tener el cambio) se responde sin guardarlo. Lo mismo vale para las semanas
+de un médico cuya versión acaba de cambiar.
+"""
+import time as time_module
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import TIMEOUT_RESPUESTAS, cambio_reciente
+from .fast import PlanLectura
+from .models import Medico, Turno
+from .routers import lee_de_replica
+from .serializers import TurnoSerializer
+
+INVALIDADA = 'invalidada'
+_plan = None
+
+
+def semana_iso(fecha):
+    """(año, semana) ISO del día local de `fecha` (date o datetime aware)."""
+    if isinstance(fecha, datetime):
+        fecha = timezone.localdate(fecha)
+    año, semana, _ = fecha.isocalendar()
+    return año, semana
+
+
+def _clave_version(medico_id):
+    return f'agenda:version:{medico_id}'
+
+
+def _versiones(medico_ids):
+    """{medico_id: versión} en una sola lectura de caché."""
+    claves = {medico_id: _clave_version(medico_id) for medico_id in medico_ids}
+    actuales = cache.get_many(claves.values())
+    resultado = {}
+    for medico_id, clave in claves.items():
+        if clave not in actuales:
+            # Médico sin versión registrada (caché nueva o expulsada): se inicializa.
+            cache.add(clave, time_module.time_ns(), None)
+            actuales[clave] = cache.get(clave)
+        resultado[medico_id] = actuales[clave]
+    return resultado
+
+
+def _clave(medico_id, año, semana, version):
+    return f'agenda:{medico_id}:{año}-W{semana:02d}:{version}'
+
+
+def _borrar(semanas):
+    """Borra las semanas (medico_id, año, semana) cacheadas."""
+    if not semanas:
+        return
+    versiones = _versiones({medico_id for medico_id, _, _ in semanas})
+    marcas = {_clave(*semana, versiones[semana[0]]): INVALIDADA for semana in semanas}
+    cache.set_many(marcas, settings.REPLICA_PEGADO_SEGUNDOS)
+    # Otra vez al confirmar: una lectura concurrente pudo cachear el estado
+    # previo, y la marca tiene que durar desde que el cambio es visible.
+    transaction.on_commit(lambda: cache.set_many(marcas, settings.REPLICA_PEGADO_SEGUNDOS))
+
+
+def invalidar_turnos(turnos):
+    """Borra las semanas cacheadas afectadas por los turnos (antes y después del cambio)."""
+    semanas = set()
+    for turno in turnos:
+        original = turno.agenda_original
+        if original:
+            semanas.add((original['medico_id'], *semana_iso(original['fecha'])))
+        semanas.add((turno.medico_id, *semana_iso(turno.fecha)))
+    _borrar(semanas)
+
+
+def invalidar_paciente(paciente_id):
+    """Borra las semanas en las que el paciente tiene turnos (muestran su nombre)."""
+    _borrar({
+        (medico_id, *semana_iso(fecha))
+        for medico_id, fecha in Turno.objects.filter(paciente_id=paciente_id)
+        .values_list('medico_id', 'fecha')
+    })
+
+
+def _invalidar_medico(medico_id):
+    cache.set(_clave_version(medico_id), time_module.time_ns(), None)
+
+
+def invalidar_medico(medico_id):
+    """Cambia la versión del médico: ninguna de sus semanas cacheadas se vuelve a usar."""
+    _invalidar_medico(medico_id)
+    transaction.on_commit(lambda: _invalidar_medico(medico_id))
+
+
+def _armar(medico_id, año, semana):
+    global _plan
+    if _plan is None:
+        _plan = PlanLectura(TurnoSerializer)
+    lunes = date.fromisocalendar(año, semana, 1)
+    inicio = timezone.make_aware(datetime.combine(lunes, time.min))
+    fin = timezone.make_aware(datetime.combine(lunes + timedelta(days=7), time.min))
+    filas = (
+        Turno.objects
+        .filter(medico_id=medico_id, fecha__gte=inicio, fecha__lt=fin)
+        .exclude(estado='Cancelado')
+        .order_by('fecha', 'id')
+        .values(*_plan.columnas)
+    )
+    return {
+        'medico': medico_id,
+        'semana': f'{año}-W{semana:02d}',
+        'desde': lunes,
+        'hasta': lunes + timedelta(days=6),
+        'turnos': [_plan.armar(fila) for fila in filas],
+    }
+
+
+def agenda_semanal(medico_id, año, semana):
+    """
+    Turnos no cancelados de la semana, desde la caché (sin tocar la base) o
+    armados con una query. None si el médico no existe.
+    """
+    version = _versiones([medico_id])[medico_id]
+    clave = _clave(medico_id, año, semana, version)
+    data = cache.get(clave)
+    if data is None or data == INVALIDADA:
+        if not Medico.objects.filter(pk=medico_id).exists():
+            return None
+        data = _armar(medico_id, año, semana)
+        if not lee_de_replica():
+            cache.set(clave, data, TIMEOUT_RESPUESTAS)
+        elif not cambio_reciente([version]):
+            # add: no reemplaza la marca de una semana recién invalidada.
+            cache.add(clave, data, TIMEOUT_RESPUESTAS)
+    return data
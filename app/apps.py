@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401 (registra los receivers)
+        from .metrics import instalar_wrapper
+
+        connection_created.connect(instalar_wrapper)
@@ -0,0 +1,136 @@
+"""
+Resumen de asistencia: turnos por médico, día y estado (ResumenAsistencia).
+
+Cada alta, cambio de médico/fecha/estado o baja de un turno se traduce en
+deltas de +1/-1 sobre las filas afectadas, aplicados con un upsert
+(INSERT ... ON CONFLICT DO UPDATE SET cantidad = cantidad + delta): la suma
+es atómica en la base aunque haya requests concurrentes. Lo disparan las
+señales de Turno (app.signals) y, para los lotes, app.bulk.
+
+Los UPDATE masivos con QuerySet.update() no pasan por acá; después de uno
+hay que correr `manage.py reconstruir_asistencia`.
+
+El reporte lee sólo el resumen: su costo depende de médicos x días del rango
+consultado, no de la cantidad de turnos históricos.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Medico, ResumenAsistencia, Turno
+
+ESTADOS = [valor for valor, _ in Turno.ESTADO_CHOICES]
+
+
+def _clave(medico_id, fecha, estado):
+    return medico_id, timezone.localdate(fecha), estado
+
+
+def _claves(turno):
+    """(clave original, clave actual) del turno; None donde no existe."""
+    original = turno.agenda_original
+    antes = _clave(original['medico_id'], original['fecha'], original['estado']) if original else None
+    return antes, _clave(turno.medico_id, turno.fecha, turno.estado)
+
+
+def deltas(altas=(), cambios=(), bajas=()):
+    """Suma de +1/-1 por (medico_id, dia, estado) para los turnos dados."""
+    resultado = Counter()
+    for turno in altas:
+        resultado[_claves(turno)[1]] += 1
+    for turno in cambios:
+        antes, despues = _claves(turno)
+        if antes != despues:
+            if antes:
+                resultado[antes] -= 1
+            resultado[despues] += 1
+    for turno in bajas:
+        antes, despues = _claves(turno)
+        resultado[antes or despues] -= 1
+    return {clave: n for clave, n in resultado.items() if n}
+
+
+def aplicar(cambios):
+    """Aplica los deltas {(medico_id, dia, estado): n} con un upsert por lote."""
+    if not cambios:
+        return
+    filas = [(medico_id, dia, estado, n) for (medico_id, dia, estado), n in cambios.items()]
+    if connection.features.supports_update_conflicts_with_target:
+        tabla = connection.ops.quote_name(ResumenAsistencia._meta.db_table)
+        valores = ', '.join(['(%s, %s, %s, %s)'] * len(filas))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {tabla} (medico_id, dia, estado, cantidad) VALUES {valores} '
+                f'ON CONFLICT (medico_id, dia, estado) '
+                f'DO UPDATE SET cantidad = {tabla}.cantidad + EXCLUDED.cantidad',
+                [valor for fila in filas for valor in fila],
+            )
+        return
+    with transaction.atomic():
+        for medico_id, dia, estado, n in filas:
+            resumen, _ = ResumenAsistencia.objects.select_for_update().get_or_create(
+                medico_id=medico_id, dia=dia, estado=estado,
+            )
+            ResumenAsistencia.objects.filter(pk=resumen.pk).update(cantidad=F('cantidad') + n)
+
+
+def registrar(altas=(), cambios=(), bajas=()):
+    aplicar(deltas(altas, cambios, bajas))
+
+
+def reconstruir(lote=5000):
+    """Recalcula el resumen completo con un GROUP BY sobre turnos. Devuelve las filas creadas."""
+    agrupados = (
+        Turno.objects.order_by()
+        .annotate(dia=TruncDate('fecha'))
+        .values('medico_id', 'dia', 'estado')
+        .annotate(cantidad=Count('id'))
+    )
+    creadas = 0
+    with transaction.atomic():
+        ResumenAsistencia.objects.all().delete()
+        filas = []
+        for fila in agrupados.iterator(chunk_size=lote):
+            filas.append(ResumenAsistencia(**fila))
+            if len(filas) >= lote:
+                creadas += len(ResumenAsistencia.objects.bulk_create(filas))
+                filas = []
+        creadas += len(ResumenAsistencia.objects.bulk_create(filas))
+    return creadas
+
+
+def reporte(desde, hasta, medico=None):
+    """
+    Totales por médico y por día entre `desde` y `hasta` (inclusive), con un
+    conteo por estado y la tasa de asistencia (completados sobre turnos ya
+    resueltos: completados + cancelados). Dos queries.
+    """
+    filas = ResumenAsistencia.objects.filter(dia__range=(desde, hasta), cantidad__gt=0)
+    if medico is not None:
+        filas = filas.filter(medico_id=medico)
+    por_medico = defaultdict(lambda: defaultdict(Counter))
+    for medico_id, dia, estado, cantidad in filas.values_list('medico_id', 'dia', 'estado', 'cantidad'):
+        por_medico[medico_id][dia][estado] += cantidad
+    nombres = {m.pk: str(m) for m in Medico.objects.filter(pk__in=por_medico)}
+
+    resultados = []
+    for medico_id in sorted(por_medico, key=lambda pk: nombres.get(pk, '')):
+        totales = Counter()
+        dias = []
+        for dia in sorted(por_medico[medico_id]):
+            conteo = por_medico[medico_id][dia]
+            totales.update(conteo)
+            dias.append({'dia': dia, 'por_estado': {e: conteo[e] for e in ESTADOS}})
+        resueltos = totales['Completado'] + totales['Cancelado']
+        resultados.append({
+            'medico': medico_id,
+            'nombre': nombres.get(medico_id, ''),
+            'total': sum(totales.values()),
+            'por_estado': {e: totales[e] for e in ESTADOS},
+            'asistencia': round(totales['Completado'] / resueltos, 4) if resueltos else None,
+            'por_dia': dias,
+        })
+    return resultados
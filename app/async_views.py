@@ -0,0 +1,228 @@
+"""
+Endpoints de lectura asíncronos para servir bajo ASGI (ver tp/asgi.py).
+
+Las vistas de DRF son sincrónicas: bajo ASGI cada request ocupa un hilo del
+executor de Django. Estas vistas usan el ORM asíncrono (`aget`, `async for`)
+para las lecturas más frecuentes y devuelven exactamente las mismas filas que
+los endpoints de DRF (se arman con app.fast.PlanLectura a partir de los
+mismos serializers).
+
+Rutas (bajo /app/async/):
+    turnos/?medico=&paciente=&estado=&fecha__gte=&fecha__lt=&page_size=&cursor=
+    medicos/<id>/agenda/?desde=&hasta=
+    pacientes/<id>/   y   pacientes/?dni=
+"""
+import base64
+from functools import wraps
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .fast import PlanLectura
+from .models import Medico, Paciente, Turno
+from .pagination import KeysetPagination
+from .renderers import ORJSONRenderer
+from .serializers import PacienteSerializer, TurnoSerializer
+
+MAX_DIAS_AGENDA = 31
+
+_renderer = ORJSONRenderer()
+_plan_turnos = None
+_plan_pacientes = None
+
+
+class ParametroInvalido(Exception):
+    pass
+
+
+def _planes():
+    global _plan_turnos, _plan_pacientes
+    if _plan_turnos is None:
+        _plan_turnos = PlanLectura(TurnoSerializer)
+        _plan_pacientes = PlanLectura(PacienteSerializer)
+    return _plan_turnos, _plan_pacientes
+
+
+def _json(data, codigo=status.HTTP_200_OK):
+    return HttpResponse(_renderer.render(data), status=codigo,
+                        content_type='application/json')
+
+
+def _autenticar(request):
+    """Misma autenticación (y mismas validaciones) que los viewsets de DRF."""
+    drf_request = Request(request)
+    for clase in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        resultado = clase().authenticate(drf_request)
+        if resultado is not None:
+            return resultado[0]
+    return None
+
+
+def vista_async(funcion):
+    """Autentica, traduce errores a JSON y sólo admite GET."""
+    @wraps(funcion)
+    async def envoltura(request, *args, **kwargs):
+        if request.method != 'GET':
+            return _json({'detail': f'Método "{request.method}" no permitido.'},
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            usuario = await sync_to_async(_autenticar)(request)
+        except exceptions.APIException as e:
+            return _json({'detail': e.detail}, e.status_code)
+        if usuario is None or not usuario.is_authenticated:
+            return _json({'detail': 'Las credenciales de autenticación no se proveyeron.'},
+                         status.HTTP_401_UNAUTHORIZED)
+        request.user = usuario
+        try:
+            return await funcion(request, *args, **kwargs)
+        except ParametroInvalido as e:
+            return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+    return envoltura
+
+
+# --- Parámetros ---
+
+def _entero(params, nombre):
+    valor = params.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ParametroInvalido(f"'{nombre}' debe ser un entero.")
+
+
+def _fecha_hora(params, nombre):
+    valor = params.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        # Con formato válido pero fecha imposible (2025-02-30) lanzan ValueError.
+        fecha = parse_datetime(valor)
+        dia = parse_date(valor) if fecha is None else None
+    except ValueError:
+        fecha = dia = None
+    if fecha is None:
+        if dia is None:
+            raise ParametroInvalido(f"'{nombre}' debe ser una fecha ISO 8601.")
+        fecha = datetime.combine(dia, time.min)
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def _dia(params, nombre):
+    """Fecha ISO (AAAA-MM-DD) de `nombre`; None si falta."""
+    valor = params.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        dia = parse_date(valor)
+    except ValueError:
+        dia = None
+    if dia is None:
+        raise ParametroInvalido(f"'{nombre}' debe ser una fecha ISO (AAAA-MM-DD).")
+    return dia
+
+
+def _cursor(valor):
+    """Decodifica el cursor opaco 'fecha|id' de la página anterior."""
+    try:
+        fecha, pk = base64.urlsafe_b64decode(valor.encode()).decode().split('|')
+        fecha, pk = parse_datetime(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ParametroInvalido("Cursor inválido.")
+    if fecha is None:
+        raise ParametroInvalido("Cursor inválido.")
+    return fecha, pk
+
+
+def _codificar_cursor(fecha, pk):
+    return base64.urlsafe_b64encode(f'{fecha.isoformat()}|{pk}'.encode()).decode()
+
+
+# --- Vistas ---
+
+@vista_async
+async def turnos(request):
+    """Listado de turnos en orden (fecha, id) con paginación keyset."""
+    plan, _ = _planes()
+    params = request.GET
+    queryset = Turno.objects.all()
+    for campo in ('medico', 'paciente'):
+        valor = _entero(params, campo)
+        if valor is not None:
+            queryset = queryset.filter(**{f'{campo}_id': valor})
+    if params.get('estado'):
+        queryset = queryset.filter(estado=params['estado'])
+    for lookup in ('fecha__gte', 'fecha__lt'):
+        valor = _fecha_hora(params, lookup)
+        if valor is not None:
+            queryset = queryset.filter(**{lookup: valor})
+
+    page_size = _entero(params, 'page_size') or KeysetPagination.page_size
+    page_size = max(1, min(page_size, KeysetPagination.max_page_size))
+    if params.get('cursor'):
+        fecha, pk = _cursor(params['cursor'])
+        queryset = queryset.filter(fecha__gte=fecha).exclude(fecha=fecha, id__lte=pk)
+
+    filas = [
+        fila async for fila in
+        queryset.order_by('fecha', 'id').values(*plan.columnas)[:page_size + 1]
+    ]
+    siguiente = None
+    if len(filas) > page_size:
+        filas = filas[:page_size]
+        ultima = filas[-1]
+        query = params.copy()
+        query['cursor'] = _codificar_cursor(ultima['fecha'], ultima['id'])
+        siguiente = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return _json({'next': siguiente, 'results': [plan.armar(f) for f in filas]})
+
+
+@vista_async
+async def agenda_medico(request, pk):
+    """Turnos no cancelados de un médico en [desde, hasta] (por defecto, la semana actual)."""
+    plan, _ = _planes()
+    if not await Medico.objects.filter(pk=pk).aexists():
+        return _json({'detail': 'No encontrado.'}, status.HTTP_404_NOT_FOUND)
+
+    hoy = timezone.localdate()
+    desde = _dia(request.GET, 'desde') or hoy - timedelta(days=hoy.weekday())
+    hasta = _dia(request.GET, 'hasta') or desde + timedelta(days=6)
+    if hasta < desde or (hasta - desde).days >= MAX_DIAS_AGENDA:
+        raise ParametroInvalido(f"Rango inválido (máximo {MAX_DIAS_AGENDA} días).")
+
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    queryset = (
+        Turno.objects
+        .filter(medico_id=pk, fecha__gte=inicio, fecha__lt=fin)
+        .exclude(estado='Cancelado')
+        .order_by('fecha', 'id')
+        .values(*plan.columnas)
+    )
+    return _json([plan.armar(fila) async for fila in queryset])
+
+
+@vista_async
+async def paciente(request, pk=None):
+    """Detalle de paciente por id, o búsqueda exacta por ?dni=."""
+    _, plan = _planes()
+    queryset = Paciente.objects.values(*plan.columnas)
+    try:
+        if pk is not None:
+            fila = await queryset.aget(pk=pk)
+        elif request.GET.get('dni'):
+            fila = await queryset.aget(dni=request.GET['dni'])
+        else:
+            raise ParametroInvalido("Indicar el id del paciente o ?dni=.")
+    except Paciente.DoesNotExist:
+        return _json({'detail': 'No encontrado.'}, status.HTTP_404_NOT_FOUND)
+    return _json(plan.armar(fila))
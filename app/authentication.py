@@ -0,0 +1,65 @@
+"""
+Autenticación JWT sin query por request.
+
+`CachedJWTAuthentication` valida el token igual que JWTAuthentication (firma,
+vencimiento, tipo) y guarda el usuario en la caché compartida bajo su id,
+por JWT_USER_CACHE_TIMEOUT segundos. En cada request, con el usuario leído de
+la caché o de la base, se repiten los controles de SIMPLE_JWT que dependen
+de los claims del token: usuario activo (CHECK_USER_IS_ACTIVE) y contraseña
+sin cambios respecto del token (CHECK_REVOKE_TOKEN).
+
+Guardar o borrar el usuario borra la entrada (ver app.signals); los cambios
+que no pasan por save(), como un UPDATE masivo, tardan a lo sumo el timeout
+en verse. Los permisos y grupos no se cachean: has_perm los sigue leyendo de
+la base en cada request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def _clave(user_id):
+    return f'jwt-usuario:{user_id}'
+
+
+def invalidar_usuario(user_id):
+    """Borra el usuario cacheado ahora y otra vez al confirmar la transacción."""
+    clave = _clave(user_id)
+    cache.delete(clave)
+    transaction.on_commit(lambda: cache.delete(clave))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que resuelve el usuario desde la caché (ver el docstring del módulo)."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        clave = _clave(user_id)
+        user = cache.get(clave)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            cache.set(clave, user, settings.JWT_USER_CACHE_TIMEOUT)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        return user
@@ -0,0 +1,120 @@
+"""Utilidades compartidas por los comandos de benchmark (bench_*)."""
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+def medir(funcion, repeticiones=5):
+    """Ejecuta `funcion` varias veces y devuelve la lista de tiempos en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+@contextmanager
+def datos_descartables(using='default'):
+    """
+    Transacción que siempre se revierte: los benchmarks pueden generar datos
+    sintéticos sobre la base configurada sin dejar rastro.
+    """
+    with transaction.atomic(using=using):
+        yield
+        transaction.set_rollback(True, using=using)
+
+
+def usuario_bench():
+    """Usuario en memoria (no se guarda) para autenticar requests con force_authenticate."""
+    return get_user_model()(username='bench', is_active=True)
+
+
+def llamar_vista(viewset, accion, path, **params):
+    """
+    Invoca por GET la acción `accion` de un viewset con APIRequestFactory (sin
+    middleware ni HTTP) y devuelve la respuesta.
+    """
+    # 'localhost' está siempre permitido con DEBUG y ALLOWED_HOSTS vacío.
+    request = APIRequestFactory().get(path, params, HTTP_HOST='localhost')
+    force_authenticate(request, user=usuario_bench())
+    # Las @action guardan sus initkwargs (p. ej. renderer_classes) en `.kwargs`.
+    initkwargs = getattr(getattr(viewset, accion), 'kwargs', {})
+    return viewset.as_view({'get': accion}, **initkwargs)(request)
+
+
+def crear_turnos_sinteticos(cantidad, medicos=10, pacientes=100, lote=5000):
+    """Genera una especialidad, médicos, pacientes y `cantidad` turnos con bulk_create."""
+    from .models import Especialidad, Medico, Paciente, Turno
+
+    especialidad = Especialidad.objects.create(nombre='Bench')
+    lista_medicos = Medico.objects.bulk_create([
+        Medico(nombre=f'Médico{i}', apellido='Bench', especialidad=especialidad, mail=f'm{i}@bench')
+        for i in range(medicos)
+    ])
+    lista_pacientes = [
+        Paciente(dni=f'bench-{i}', nombre=f'Paciente{i}', apellido='Bench')
+        for i in range(pacientes)
+    ]
+    # bulk_create no pasa por save(): normalizamos a mano (ver app.search).
+    for paciente in lista_pacientes:
+        paciente.normalizar_nombre()
+    Paciente.objects.bulk_create(lista_pacientes)
+    base = timezone.now().replace(minute=0, second=0, microsecond=0)
+    for inicio in range(0, cantidad, lote):
+        Turno.objects.bulk_create([
+            Turno(
+                paciente=lista_pacientes[i % pacientes],
+                medico=lista_medicos[i % medicos],
+                fecha=base + timedelta(minutes=30 * (i // medicos)),
+                duracion=30,
+                recordatorio='24h',
+                motivo_consulta=f'Consulta de control número {i}',
+            )
+            for i in range(inicio, min(inicio + lote, cantidad))
+        ])
+    return lista_medicos, lista_pacientes
+
+
+@contextmanager
+def base_descartable():
+    """
+    Base SQLite temporal, migrada y vacía, para los benchmarks que necesitan
+    datos confirmados (varios hilos o conexiones): todos los alias apuntan a
+    un archivo que se borra al salir y la caché es local al proceso, así que
+    la base y la caché configuradas no se tocan.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        nombres = {alias: connections.settings[alias]['NAME'] for alias in connections}
+        connections.close_all()
+        for alias in nombres:
+            connections.settings[alias]['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+        try:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench',
+            }}):
+                call_command('migrate', verbosity=0, interactive=False)
+                yield
+        finally:
+            connections.close_all()
+            for alias, nombre in nombres.items():
+                connections.settings[alias]['NAME'] = nombre
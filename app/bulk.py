@@ -0,0 +1,182 @@
+"""
+Alta y edición masiva de turnos (POST/PATCH /app/turnos/bulk/).
+
+La validación de campos se hace item por item sin tocar la base; la
+existencia de médicos/pacientes y los choques de agenda se resuelven con una
+query por conjunto. Las escrituras van en una sola transacción: si algún item
+tiene errores no se escribe nada y se devuelve la lista de errores alineada
+con la entrada (un dict vacío para los items válidos).
+
+Los choques detectados acá son la respuesta amable; la garantía la dan las
+reservas de agenda (app.reservas), que se toman en la misma transacción y
+lanzan TurnoSuperpuesto si otro request ganó el horario entre tanto.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from . import agenda, asistencia, reservas, sync
+from .models import Medico, Paciente, Turno
+from .serializers import TurnoBulkSerializer
+from .slots import MARGEN_TURNOS, AgendaOcupada
+
+MAX_LOTE = 1000
+CAMPOS_AGENDA = ('medico', 'fecha', 'duracion', 'estado')
+# bulk_create/bulk_update no pasan por Turno.save(): el recordatorio se
+# reprograma a mano cuando cambia alguno de estos campos.
+CAMPOS_RECORDATORIO = ('fecha', 'recordatorio', 'estado')
+
+
+class LoteInvalido(Exception):
+    """El lote tiene errores; `errores` está alineado con los items recibidos."""
+
+    def __init__(self, errores):
+        super().__init__(errores)
+        self.errores = errores
+
+
+def _validar_forma(items):
+    if not isinstance(items, list):
+        raise LoteInvalido({'non_field_errors': ['Se esperaba una lista de turnos.']})
+    if not items:
+        raise LoteInvalido({'non_field_errors': ['El lote está vacío.']})
+    if len(items) > MAX_LOTE:
+        raise LoteInvalido({'non_field_errors': [f'El lote no puede superar {MAX_LOTE} turnos.']})
+
+
+def _resolver_relaciones(filas, errores):
+    """Reemplaza los ids de paciente/médico por instancias con una query por modelo."""
+    medico_ids = {f['medico'] for f in filas.values() if 'medico' in f}
+    paciente_ids = {f['paciente'] for f in filas.values() if 'paciente' in f}
+    medicos = Medico.objects.in_bulk(medico_ids)
+    pacientes = Paciente.objects.in_bulk(paciente_ids)
+    for i, fila in filas.items():
+        for campo, instancias in (('medico', medicos), ('paciente', pacientes)):
+            if campo not in fila:
+                continue
+            instancia = instancias.get(fila[campo])
+            if instancia is None:
+                errores[i].setdefault(campo, []).append(
+                    f'Clave primaria "{fila[campo]}" inválida - objeto no existe.'
+                )
+            else:
+                fila[campo] = instancia
+
+
+def _detectar_choques(turnos, errores, excluir=()):
+    """
+    Marca los turnos que se solapan con la agenda existente o con otro turno
+    del mismo lote. Una sola query trae los turnos activos de los médicos
+    involucrados en el rango cubierto por el lote.
+    """
+    activos = {i: t for i, t in turnos.items() if t.estado != 'Cancelado'}
+    if not activos:
+        return
+    inicio = min(t.fecha for t in activos.values()) - MARGEN_TURNOS
+    fin = max(t.fecha + timedelta(minutes=t.duracion) for t in activos.values())
+    existentes = (
+        Turno.objects
+        .filter(medico__in={t.medico_id for t in activos.values()}, fecha__gte=inicio, fecha__lt=fin)
+        .exclude(estado='Cancelado')
+        .exclude(pk__in=excluir)
+        .values_list('medico_id', 'fecha', 'duracion')
+    )
+    agenda = AgendaOcupada(existentes)
+    for i in sorted(activos, key=lambda i: activos[i].fecha):
+        turno = activos[i]
+        t_fin = turno.fecha + timedelta(minutes=turno.duracion)
+        if agenda.choca(turno.medico_id, turno.fecha, t_fin):
+            errores[i].setdefault('fecha', []).append(
+                'El médico ya tiene un turno que se solapa con este horario.'
+            )
+        else:
+            agenda.agregar(turno.medico_id, turno.fecha, t_fin)
+
+
+def crear_turnos(items):
+    """Valida y crea un lote de turnos. Devuelve la lista de turnos creados."""
+    _validar_forma(items)
+    errores = [{} for _ in items]
+    filas = {}
+    for i, item in enumerate(items):
+        serializer = TurnoBulkSerializer(data=item)
+        if serializer.is_valid():
+            filas[i] = dict(serializer.validated_data)
+        else:
+            errores[i] = dict(serializer.errors)
+
+    _resolver_relaciones(filas, errores)
+    turnos = {i: Turno(**fila) for i, fila in filas.items() if not errores[i]}
+    for turno in turnos.values():
+        turno.programar_recordatorio()
+    _detectar_choques(turnos, errores)
+    if any(errores):
+        raise LoteInvalido(errores)
+
+    with transaction.atomic():
+        creados = Turno.objects.bulk_create([turnos[i] for i in sorted(turnos)])
+        reservas.reclamar(creados)
+        asistencia.registrar(altas=creados)
+        agenda.invalidar_turnos(creados)
+        sync.registrar(Turno, [t.pk for t in creados])
+    return creados
+
+
+def actualizar_turnos(items):
+    """Valida y aplica un lote de ediciones parciales (cada item lleva su `id`)."""
+    _validar_forma(items)
+    errores = [{} for _ in items]
+    # El id puede llegar como cualquier valor JSON (lista, dict, bool...): lo
+    # que no es un entero cuenta como id ausente.
+    ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+    ids = [pk if isinstance(pk, int) and not isinstance(pk, bool) else None for pk in ids]
+    instancias = Turno.objects.select_related('paciente', 'medico').in_bulk(
+        [pk for pk in ids if pk is not None]
+    )
+
+    filas, vistos = {}, set()
+    for i, (item, pk) in enumerate(zip(items, ids)):
+        if pk not in instancias:
+            errores[i] = {'id': ['Turno inexistente o id ausente.']}
+            continue
+        if pk in vistos:
+            errores[i] = {'id': ['El turno aparece más de una vez en el lote.']}
+            continue
+        vistos.add(pk)
+        serializer = TurnoBulkSerializer(instancias[pk], data=item, partial=True)
+        if serializer.is_valid():
+            filas[i] = dict(serializer.validated_data)
+        else:
+            errores[i] = dict(serializer.errors)
+
+    _resolver_relaciones(filas, errores)
+    turnos, reubicados, campos = {}, {}, set()
+    for i, fila in filas.items():
+        if errores[i]:
+            continue
+        turno = instancias[ids[i]]
+        for campo, valor in fila.items():
+            setattr(turno, campo, valor)
+        campos.update(fila)
+        if any(campo in fila for campo in CAMPOS_RECORDATORIO):
+            turno.programar_recordatorio()
+            campos.update(('recordatorio_programado', 'recordatorio_enviado'))
+        if any(campo in fila for campo in CAMPOS_AGENDA):
+            turnos[i] = turno
+            # Un cambio entre estados activos no mueve el turno: no se vuelve
+            # a chequear ni a reservar (hay solapes heredados de antes de 0004).
+            if turno.reserva_modificada():
+                reubicados[i] = turno
+    _detectar_choques(reubicados, errores, excluir=[t.pk for t in reubicados.values()])
+    if any(errores):
+        raise LoteInvalido(errores)
+
+    actualizados = [instancias[ids[i]] for i in sorted(filas)]
+    if campos:
+        with transaction.atomic():
+            Turno.objects.bulk_update(actualizados, sorted(campos))
+            reservas.sincronizar(list(reubicados.values()))
+            asistencia.registrar(cambios=list(turnos.values()))
+            agenda.invalidar_turnos(actualizados)
+            sync.registrar(Turno, [t.pk for t in actualizados])
+    return actualizados
@@ -0,0 +1,115 @@
+"""
+Caché de lectura para datos de referencia (especialidades, médicos).
+
+Cada tabla tiene un número de versión en la caché compartida; cualquier alta,
+modificación o baja lo cambia (ver app.signals y las rutas SQL de
+EspecialidadViewSet). Las respuestas se guardan bajo una clave que incluye las
+versiones de las tablas de las que dependen, así que invalidar es sólo
+cambiar la versión: las entradas viejas dejan de usarse y expiran solas.
+
+La versión es el instante del último cambio en nanosegundos. No se envía
+Last-Modified: tiene resolución de segundos, así que un cambio dentro del
+mismo segundo respondería 304 a un If-Modified-Since con datos viejos; la
+validación condicional se hace sólo con el ETag.
+
+Con réplicas (app.routers), una lectura hecha poco después de un cambio puede
+no verlo todavía. Si se guardara bajo la versión nueva, la serviría durante
+TIMEOUT_RESPUESTAS a todos, incluso al cliente que acaba de escribir y lee
+del primario. Por eso lo leído de una réplica menos de
+REPLICA_PEGADO_SEGUNDOS después del último cambio se responde sin guardarlo
+y sin ETag.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .routers import lee_de_replica
+
+TIMEOUT_RESPUESTAS = 60 * 60
+
+
+def _clave_version(modelo):
+    return f'version:{modelo._meta.db_table}'
+
+
+def versiones(modelos):
+    """Versiones actuales de las tablas de `modelos`, en una sola lectura de caché."""
+    claves = [_clave_version(m) for m in modelos]
+    actuales = cache.get_many(claves)
+    resultado = []
+    for clave in claves:
+        if clave not in actuales:
+            # Tabla sin versión registrada (caché nueva o expulsada): se inicializa.
+            cache.add(clave, time.time_ns(), None)
+            actuales[clave] = cache.get(clave)
+        resultado.append(actuales[clave])
+    return resultado
+
+
+def _invalidar(modelos):
+    cache.set_many({_clave_version(m): time.time_ns() for m in modelos}, None)
+
+
+def invalidar(*modelos):
+    """
+    Cambia la versión de las tablas de `modelos`. Se invalida en el momento y
+    otra vez al confirmar la transacción, para que una lectura concurrente no
+    vuelva a cachear los datos previos al commit.
+    """
+    _invalidar(modelos)
+    transaction.on_commit(lambda: _invalidar(modelos))
+
+
+def cambio_reciente(vigentes):
+    """True si alguna de las versiones `vigentes` es de hace menos de REPLICA_PEGADO_SEGUNDOS."""
+    return time.time_ns() - max(vigentes) < settings.REPLICA_PEGADO_SEGUNDOS * 10**9
+
+
+def respuesta_cacheada(request, modelos, construir, timeout=TIMEOUT_RESPUESTAS):
+    """
+    Devuelve 304 si el cliente ya tiene la versión vigente; si no, sirve los
+    datos desde la caché o los construye con `construir()` (que devuelve un
+    Response) y los guarda. Sólo se cachean respuestas 200.
+    """
+    vigentes = versiones(modelos)
+    firma = hashlib.md5(':'.join(map(str, vigentes)).encode()).hexdigest()
+    etag = quote_etag(firma)
+    encabezados = {'ETag': etag}
+
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        for nombre, valor in encabezados.items():
+            no_modificado[nombre] = valor
+        return no_modificado
+
+    clave = f'respuesta:{firma}:{request.get_full_path()}'
+    data = cache.get(clave)
+    if data is None:
+        response = construir()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        if lee_de_replica() and cambio_reciente(vigentes):
+            return response
+        data = response.data
+        cache.set(clave, data, timeout)
+    return Response(data, status=status.HTTP_200_OK, headers=encabezados)
+
+
+def cache_lectura(metodo):
+    """Decora list/retrieve de un viewset; sin `cache_models` no cachea."""
+    @wraps(metodo)
+    def envoltura(self, request, *args, **kwargs):
+        if not self.cache_models:
+            return metodo(self, request, *args, **kwargs)
+        return respuesta_cacheada(
+            request, self.cache_models, lambda: metodo(self, request, *args, **kwargs)
+        )
+    return envoltura
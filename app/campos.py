@@ -0,0 +1,120 @@
+"""
+Campos a pedido (?fields=) y expansión de relaciones (?expand=) en la API.
+
+?fields=id,fecha,estado deja en la respuesta sólo esos campos del serializer
+y, en list/retrieve, lee sólo sus columnas: `only()` en el camino normal y
+`values()` en el modo ?fast=1 (ver app.fast). ?expand=medico,paciente
+reemplaza el id de cada relación declarada en `Meta.expandibles` del
+serializer por el objeto relacionado completo, leído en el mismo JOIN
+(select_related). Los campos expandidos se incluyen aunque no figuren en
+?fields=.
+
+Sólo aplica a lecturas: las escrituras validan y responden con el serializer
+completo.
+"""
+from functools import cache
+
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+
+from .fast import campos_de_orden, plan_lectura
+
+
+def _lista(request, parametro):
+    return [n.strip() for n in request.query_params.get(parametro, '').split(',') if n.strip()]
+
+
+def pedidos(request, disponibles, expandibles=()):
+    """
+    (campos, expandir) del request, validados contra los nombres `disponibles`
+    y `expandibles`. `campos` es None si no se pidió ?fields=.
+    """
+    if request.method not in permissions.SAFE_METHODS:
+        return None, frozenset()
+    campos, expandir = _lista(request, 'fields'), _lista(request, 'expand')
+    errores = {}
+    desconocidos = [n for n in campos if n not in disponibles]
+    if desconocidos:
+        errores['fields'] = [f"Campos desconocidos: {', '.join(desconocidos)}. "
+                             f"Disponibles: {', '.join(disponibles)}."]
+    no_expandibles = [n for n in expandir if n not in expandibles]
+    if no_expandibles:
+        errores['expand'] = [f"No se puede expandir: {', '.join(no_expandibles)}. "
+                             f"Expandibles: {', '.join(expandibles) or 'ninguno'}."]
+    if errores:
+        raise ValidationError(errores)
+    expandir = frozenset(expandir)
+    return (frozenset(campos) | expandir if campos else None), expandir
+
+
+@cache
+def _nombres(serializer_class):
+    return tuple(n for n, campo in serializer_class().fields.items() if not campo.write_only)
+
+
+def recortar(queryset, columnas):
+    """Lee sólo `columnas` (rutas de values()), con JOIN a las relaciones que recorren."""
+    relaciones = set()
+    for columna in columnas:
+        partes = columna.split('__')
+        relaciones.update('__'.join(partes[:i]) for i in range(1, len(partes)))
+    queryset = queryset.select_related(None)
+    if relaciones:
+        queryset = queryset.select_related(*sorted(relaciones))
+    # Una relación recorrida con select_related no puede quedar diferida.
+    return queryset.only(*dict.fromkeys([*columnas, *sorted(relaciones)]))
+
+
+class CamposSerializerMixin:
+    """
+    Para ModelSerializer: recorta y expande los campos según 'campos' y
+    'expandir' del contexto (ver `pedidos`). `Meta.expandibles` mapea el
+    nombre del campo de la relación al serializer con que se expande.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos is not None:
+            for nombre in [n for n in self.fields if n not in campos]:
+                del self.fields[nombre]
+        expandibles = getattr(self.Meta, 'expandibles', {})
+        for nombre in self.context.get('expandir', ()):
+            source = self.fields[nombre].source
+            # Mismo lugar en la salida; DRF no acepta source igual al nombre.
+            self.fields[nombre] = expandibles[nombre](
+                read_only=True, **({} if source == nombre else {'source': source})
+            )
+
+
+class CamposMixin:
+    """
+    Agrega ?fields= y ?expand= a un ModelViewSet cuyo serializer usa
+    CamposSerializerMixin. Va antes de FastReadMixin en las bases, así el
+    modo rápido arma sus filas con los mismos campos.
+    """
+
+    def campos_pedidos(self):
+        if not hasattr(self, '_campos_pedidos'):
+            serializer_class = self.get_serializer_class()
+            self._campos_pedidos = pedidos(
+                self.request, _nombres(serializer_class),
+                tuple(getattr(serializer_class.Meta, 'expandibles', {})),
+            )
+        return self._campos_pedidos
+
+    def get_serializer_context(self):
+        campos, expandir = self.campos_pedidos()
+        return {**super().get_serializer_context(), 'campos': campos, 'expandir': expandir}
+
+    def get_plan_lectura(self):
+        return super().get_plan_lectura(*self.campos_pedidos())
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        campos, expandir = self.campos_pedidos()
+        if self.action not in ('list', 'retrieve') or (campos is None and not expandir):
+            return queryset
+        plan = plan_lectura(self.get_serializer_class(), campos, expandir)
+        # La paginación por cursor lee su campo de orden de cada fila.
+        return recortar(queryset, plan.columnas + campos_de_orden(self.paginator))
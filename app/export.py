@@ -0,0 +1,88 @@
+"""
+Exportación en streaming (NDJSON / CSV) de los listados grandes.
+
+Las filas salen de `values()` recorridas con `iterator(chunk_size=...)`, sin
+instanciar modelos ni serializers, y se escriben al cliente por bloques: la
+memoria del worker no depende de la cantidad de filas exportadas.
+"""
+import csv
+from datetime import date, datetime, time
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.utils.encoders import JSONEncoder
+
+from .renderers import CSVRenderer, NDJSONRenderer
+
+FILAS_POR_BLOQUE = 500
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _en_bloques(lineas):
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def _texto_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (datetime, date, time)):
+        return JSONEncoder().default(valor)
+    return valor
+
+
+def lineas_ndjson(filas):
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for fila in filas:
+        yield encoder.encode(fila) + '\n'
+
+
+def lineas_csv(campos, filas):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(campos)
+    for fila in filas:
+        yield writer.writerow([_texto_csv(fila[campo]) for campo in campos])
+
+
+class ExportMixin:
+    """
+    Agrega GET /<recurso>/export/?format=ndjson|csv a un ModelViewSet.
+
+    `export_fields` son los nombres pasados a `values()`; se respetan los
+    filtros del viewset (por ejemplo ?fecha__gte= en turnos).
+    """
+    export_fields = ()
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        formato = request.accepted_renderer.format
+        filas = (
+            self.filter_queryset(self.get_queryset())
+            .order_by('pk')
+            .values(*self.export_fields)
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        if formato == 'csv':
+            lineas = lineas_csv(self.export_fields, filas)
+        else:
+            lineas = lineas_ndjson(filas)
+
+        response = StreamingHttpResponse(
+            _en_bloques(lineas), content_type=request.accepted_renderer.media_type
+        )
+        nombre = self.basename or 'export'
+        response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+        return response
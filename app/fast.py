@@ -0,0 +1,130 @@
+"""
+Modo de lectura rápida (?fast=1) para los listados.
+
+En lugar de instanciar modelos y pasar cada fila por el ModelSerializer, arma
+las filas directamente desde `values()` siguiendo el mismo orden y los mismos
+nombres de campo que el serializer del viewset, y las renderiza con orjson
+(ver app.renderers.ORJSONRenderer). La salida es idéntica byte a byte a la
+del listado normal.
+"""
+from functools import lru_cache
+
+from django.db.models import DateField, DateTimeField, TimeField
+from rest_framework import serializers
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from .models import Especialidad, Medico, Paciente
+from .renderers import ORJSONRenderer
+
+# Réplicas de __str__ para los StringRelatedField: columnas a leer y cómo
+# formatearlas. Deben mantenerse en sincronía con app.models (hay un test que
+# compara ambas salidas).
+REPRESENTACIONES = {
+    Especialidad: (('nombre',), lambda nombre: f'{nombre}'),
+    Medico: (('nombre', 'apellido'), lambda nombre, apellido: f'{nombre} {apellido}'),
+    Paciente: (
+        ('nombre', 'apellido', 'dni'),
+        lambda nombre, apellido, dni: f'{nombre} {apellido} (DNI: {dni})',
+    ),
+}
+
+
+class PlanLectura:
+    """
+    Columnas de `values()` y conversores para reproducir un serializer, con
+    los campos y expansiones de ?fields= y ?expand= (ver app.campos).
+    """
+
+    def __init__(self, serializer_class, campos=None, expandir=frozenset()):
+        self.columnas = []
+        serializer = serializer_class(context={'campos': campos, 'expandir': expandir})
+        self.salida = self._recorrer(serializer, '')
+
+    def _recorrer(self, serializer, prefijo):
+        model = serializer.Meta.model
+        salida = []
+        for nombre, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if isinstance(campo, serializers.BaseSerializer):
+                # Relación expandida: sus columnas salen del JOIN, con este prefijo.
+                clave = prefijo + campo.source
+                self.columnas.append(clave)
+                salida.append((nombre, self._anidado(clave, self._recorrer(campo, f'{clave}__'))))
+            elif isinstance(campo, serializers.StringRelatedField):
+                relacionado = model._meta.get_field(campo.source).related_model
+                atributos, formato = REPRESENTACIONES[relacionado]
+                claves = [f'{prefijo}{campo.source}__{a}' for a in atributos]
+                self.columnas += claves
+                salida.append((nombre, self._display(claves, formato)))
+            else:
+                self.columnas.append(prefijo + campo.source)
+                salida.append((nombre, self._valor(model, campo, prefijo)))
+        return salida
+
+    @staticmethod
+    def _anidado(clave, salida):
+        # FK nula: None, como el serializer anidado.
+        return lambda fila: None if fila[clave] is None else {
+            nombre: convertir(fila) for nombre, convertir in salida
+        }
+
+    @staticmethod
+    def _display(claves, formato):
+        return lambda fila: formato(*(fila[c] for c in claves))
+
+    @staticmethod
+    def _valor(model, campo, prefijo):
+        clave = prefijo + campo.source
+        model_field = model._meta.get_field(campo.source)
+        if isinstance(model_field, (DateTimeField, DateField, TimeField)):
+            # Mismo formato (zona horaria, 'Z') que el campo del serializer.
+            def convertir(fila):
+                valor = fila[clave]
+                return None if valor is None else campo.to_representation(valor)
+            return convertir
+        return lambda fila: fila[clave]
+
+    def armar(self, fila):
+        return {nombre: convertir(fila) for nombre, convertir in self.salida}
+
+
+# Un plan por serializer y combinación de ?fields=/?expand= pedida.
+@lru_cache(maxsize=256)
+def plan_lectura(serializer_class, campos=None, expandir=frozenset()):
+    return PlanLectura(serializer_class, campos, expandir)
+
+
+def campos_de_orden(paginator):
+    """Campos que la paginación por cursor lee de cada fila."""
+    ordering = getattr(paginator, 'ordering', None) or ()
+    return [c.lstrip('-') for c in ([ordering] if isinstance(ordering, str) else ordering)]
+
+
+class FastReadMixin:
+    """
+    Agrega ?fast=1 al `list` de un ModelViewSet. Respeta filtros y paginación
+    del viewset; el resto de las acciones no cambia.
+    """
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def fast_read_requested(self):
+        return self.request.query_params.get('fast') in ('1', 'true')
+
+    def get_plan_lectura(self, campos=None, expandir=frozenset()):
+        return plan_lectura(self.get_serializer_class(), campos, expandir)
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_read_requested():
+            return super().list(request, *args, **kwargs)
+
+        plan = self.get_plan_lectura()
+        # La paginación por cursor lee su campo de orden de cada fila.
+        columnas = list(dict.fromkeys(plan.columnas + campos_de_orden(self.paginator)))
+
+        filas = self.filter_queryset(self.get_queryset()).values(*columnas)
+        page = self.paginate_queryset(filas)
+        if page is not None:
+            return self.get_paginated_response([plan.armar(f) for f in page])
+        return Response([plan.armar(f) for f in filas])
@@ -0,0 +1,216 @@
+"""
+Búsqueda de texto completo sobre HistorialClinico.descripcion y
+Receta.descripcion (GET /app/busqueda/?q=).
+
+- SQLite: una tabla virtual FTS5 por modelo (rowid = pk del registro,
+  tokenizador unicode61 sin acentos), creada por la migración 0007. Se
+  mantiene al día desde app.signals en cada save/delete, y
+  `manage.py reindexar_busqueda` la reconstruye con un INSERT ... SELECT.
+  Los resultados se ordenan por bm25.
+- PostgreSQL: to_tsvector('spanish', ...) con índices GIN de expresión
+  (también en la migración), que la base mantiene sola; orden por ts_rank.
+- Otros motores: icontains por término, sin ranking.
+
+Cada término se busca como prefijo y todos tienen que aparecer.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import DateTimeField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import HistorialClinico, Receta
+from .routers import conexion_lectura
+
+# tipo -> (modelo, tabla FTS5, columna pk, ruta al médico)
+INDICES = {
+    'historial': (HistorialClinico, 'app_historialclinico_fts', 'turno_id', 'turno__medico_id'),
+    'receta': (Receta, 'app_receta_fts', 'id', 'medico_id'),
+}
+CONFIG_POSTGRES = 'spanish'
+LIMITE = 20
+
+
+def terminos(q):
+    """Palabras del texto buscado; descarta la sintaxis de FTS5 (comillas, NEAR, *)."""
+    return re.findall(r'\w+', q or '')
+
+
+def _expresion_fts5(palabras):
+    """Todas las palabras, cada una como prefijo: '"dolor"* "cabeza"*'."""
+    return ' '.join(f'"{p}"*' for p in palabras)
+
+
+def _tipo_de(modelo):
+    for tipo, (clase, *_) in INDICES.items():
+        if clase is modelo:
+            return tipo
+    return None
+
+
+def _usa_fts5():
+    return connection.vendor == 'sqlite'
+
+
+# --- Sincronización ---
+
+def indexar(instancia):
+    """Actualiza la entrada del registro en su tabla FTS5 (no-op fuera de SQLite)."""
+    tipo = _tipo_de(type(instancia))
+    if tipo is None or not _usa_fts5():
+        return
+    tabla = INDICES[tipo][1]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE rowid = %s', [instancia.pk])
+        if instancia.descripcion:
+            cursor.execute(f'INSERT INTO {tabla} (rowid, descripcion) VALUES (%s, %s)',
+                           [instancia.pk, instancia.descripcion])
+
+
+def desindexar(instancia):
+    tipo = _tipo_de(type(instancia))
+    if tipo is None or not _usa_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDICES[tipo][1]} WHERE rowid = %s', [instancia.pk])
+
+
+def reindexar(tipos=None):
+    """
+    Reconstruye las tablas FTS5 desde cero en una transacción por tabla.
+    Devuelve {tipo: filas indexadas}.
+    """
+    resultado = {}
+    if not _usa_fts5():
+        return resultado
+    for tipo in tipos or INDICES:
+        modelo, tabla, pk, _ = INDICES[tipo]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {tabla}')
+            cursor.execute(
+                f'INSERT INTO {tabla} (rowid, descripcion) '
+                f'SELECT {pk}, descripcion FROM {modelo._meta.db_table} '
+                f"WHERE descripcion IS NOT NULL AND descripcion <> ''"
+            )
+            resultado[tipo] = cursor.rowcount
+            cursor.execute(f"INSERT INTO {tabla} ({tabla}) VALUES ('optimize')")
+    return resultado
+
+
+# --- Búsqueda ---
+
+_SQL_FTS5 = {
+    'historial': (
+        "SELECT h.turno_id, h.paciente_id, t.medico_id, t.fecha, h.descripcion, "
+        "snippet(app_historialclinico_fts, 0, '[', ']', '…', 12), "
+        "bm25(app_historialclinico_fts) "
+        "FROM app_historialclinico_fts "
+        "JOIN app_historialclinico h ON h.turno_id = app_historialclinico_fts.rowid "
+        "JOIN app_turno t ON t.id = h.turno_id "
+        "WHERE app_historialclinico_fts MATCH %s"
+    ),
+    'receta': (
+        "SELECT r.id, r.paciente_id, r.medico_id, NULL, r.descripcion, "
+        "snippet(app_receta_fts, 0, '[', ']', '…', 12), "
+        "bm25(app_receta_fts) "
+        "FROM app_receta_fts "
+        "JOIN app_receta r ON r.id = app_receta_fts.rowid "
+        "WHERE app_receta_fts MATCH %s"
+    ),
+}
+_COLUMNAS_FILTRO = {
+    'historial': {'paciente': 'h.paciente_id', 'medico': 't.medico_id'},
+    'receta': {'paciente': 'r.paciente_id', 'medico': 'r.medico_id'},
+}
+
+
+def _buscar_fts5(tipo, palabras, filtros, limite):
+    sql = _SQL_FTS5[tipo]
+    parametros = [_expresion_fts5(palabras)]
+    for campo, valor in filtros.items():
+        sql += f' AND {_COLUMNAS_FILTRO[tipo][campo]} = %s'
+        parametros.append(valor)
+    sql += ' ORDER BY 7 LIMIT %s'
+    parametros.append(limite)
+    conexion = conexion_lectura(INDICES[tipo][0])
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        filas = cursor.fetchall()
+    # t.fecha llega como el texto que guarda SQLite: se convierte como lo hace
+    # el ORM, para que la respuesta sea igual a la de _buscar_orm.
+    convertir = conexion.ops.convert_datetimefield_value
+    # bm25 es negativo y "mejor" cuanto más chico; lo damos vuelta.
+    return [
+        (-puntaje, pk, paciente, medico, convertir(fecha, None, conexion), descripcion, fragmento)
+        for pk, paciente, medico, fecha, descripcion, fragmento, puntaje in filas
+    ]
+
+
+def _filtrar_orm(queryset, palabras):
+    """Filtro y `puntaje` para los motores sin FTS5."""
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector('descripcion', config=CONFIG_POSTGRES)
+        consulta = SearchQuery(' & '.join(f'{p}:*' for p in palabras),
+                               config=CONFIG_POSTGRES, search_type='raw')
+        return (queryset.annotate(vector=vector, puntaje=SearchRank(vector, consulta))
+                .filter(vector=consulta))
+    condicion = Q()
+    for palabra in palabras:
+        condicion &= Q(descripcion__icontains=palabra)
+    return queryset.filter(condicion).annotate(puntaje=Value(None, output_field=FloatField()))
+
+
+def _buscar_orm(tipo, palabras, filtros, limite):
+    modelo, _, pk, ruta_medico = INDICES[tipo]
+    queryset = modelo.objects.all()
+    if 'paciente' in filtros:
+        queryset = queryset.filter(paciente_id=filtros['paciente'])
+    if 'medico' in filtros:
+        queryset = queryset.filter(**{ruta_medico: filtros['medico']})
+    fecha = F('turno__fecha') if tipo == 'historial' else Value(None, output_field=DateTimeField())
+    filas = (
+        _filtrar_orm(queryset, palabras)
+        .annotate(_medico=F(ruta_medico), _fecha=fecha)
+        .order_by(F('puntaje').desc(nulls_last=True), f'-{pk}')
+        .values_list('puntaje', pk, 'paciente_id', '_medico', '_fecha', 'descripcion')[:limite]
+    )
+    return [(*fila, None) for fila in filas]
+
+
+def buscar(q, paciente=None, medico=None, tipos=None, limite=LIMITE):
+    """
+    Resultados ordenados por relevancia como dicts (tipo, id, paciente,
+    medico, fecha, descripcion, fragmento, puntaje). Una query por tipo.
+    """
+    palabras = terminos(q)
+    if not palabras:
+        return []
+    filtros = {k: v for k, v in (('paciente', paciente), ('medico', medico)) if v is not None}
+    buscar_tipo = _buscar_fts5 if _usa_fts5() else _buscar_orm
+    resultados = []
+    for tipo in tipos or INDICES:
+        for puntaje, pk, pac, med, fecha, descripcion, fragmento in buscar_tipo(
+            tipo, palabras, filtros, limite
+        ):
+            resultados.append({
+                'tipo': tipo, 'id': pk, 'paciente': pac, 'medico': med, 'fecha': fecha,
+                'descripcion': descripcion, 'fragmento': fragmento,
+                'puntaje': round(puntaje, 4) if puntaje is not None else None,
+            })
+    resultados.sort(key=lambda r: -(r['puntaje'] or 0))
+    return resultados[:limite]
+
+
+def filtrar(queryset, q):
+    """Restringe un queryset de HistorialClinico o Receta a los que coinciden con `q`."""
+    palabras = terminos(q)
+    if not palabras:
+        return queryset
+    if not _usa_fts5():
+        return _filtrar_orm(queryset, palabras)
+    tabla = INDICES[_tipo_de(queryset.model)][1]
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {tabla} WHERE {tabla} MATCH %s', [_expresion_fts5(palabras)]
+    ))
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app.bench import base_descartable, crear_turnos_sinteticos
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara requests/s concurrentes de los endpoints de lectura servidos por "
+        "tp.wsgi (vistas DRF) y tp.asgi (vistas DRF y vistas async), en proceso y "
+        "sin red. Los datos sintéticos van a una base temporal que se borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrencia', type=int, default=32)
+        parser.add_argument('--turnos', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        from tp.asgi import application as asgi_app
+        from tp.wsgi import application as wsgi_app
+
+        # Los requests corren en otros hilos y conexiones: necesitan datos
+        # confirmados, que no pueden ir a la base configurada.
+        with base_descartable():
+            medicos, pacientes = crear_turnos_sinteticos(options['turnos'])
+            usuario = get_user_model().objects.create_user('bench-asgi')
+            token = str(RefreshToken.for_user(usuario).access_token)
+            medico = medicos[0].pk
+            escenarios = [
+                ('turnos', f'/app/turnos/?medico={medico}&fast=1', f'/app/async/turnos/?medico={medico}'),
+                ('agenda', f'/app/turnos/?medico={medico}&fast=1&fecha__lt=2100-01-01',
+                 f'/app/async/medicos/{medico}/agenda/'),
+                ('paciente', f'/app/pacientes/{pacientes[0].pk}/',
+                 f'/app/async/pacientes/{pacientes[0].pk}/'),
+            ]
+            for nombre, ruta_drf, ruta_async in escenarios:
+                for servidor, ruta, correr in (
+                    ('WSGI drf', ruta_drf, lambda r: self.wsgi(wsgi_app, r, token, options)),
+                    ('ASGI drf', ruta_drf, lambda r: self.asgi(asgi_app, r, token, options)),
+                    ('ASGI async', ruta_async, lambda r: self.asgi(asgi_app, r, token, options)),
+                ):
+                    segundos, errores = correr(ruta)
+                    self.stdout.write(
+                        f"{nombre:>9} {servidor:>10}: {options['requests'] / segundos:8.0f} req/s "
+                        f"(concurrencia {options['concurrencia']}, {errores} errores)"
+                    )
+
+    def wsgi(self, app, ruta, token, options):
+        path, _, query = ruta.partition('?')
+
+        def pedir(_):
+            environ = {
+                'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET',
+                'HTTP_HOST': 'localhost', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': BytesIO(),
+            }
+            setup_testing_defaults(environ)
+            estado = []
+            cuerpo = app(environ, lambda s, h, *a: estado.append(s))
+            b''.join(cuerpo)
+            cuerpo.close()
+            return estado[0].startswith('200')
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrencia']) as pool:
+            resultados = list(pool.map(pedir, range(options['requests'])))
+        return time.perf_counter() - inicio, resultados.count(False)
+
+    def asgi(self, app, ruta, token, options):
+        path, _, query = ruta.partition('?')
+
+        async def pedir(semaforo):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+            }
+            mensajes = []
+            cuerpo_enviado = [False]
+            terminado = asyncio.Event()
+
+            async def receive():
+                if not cuerpo_enviado[0]:
+                    cuerpo_enviado[0] = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Django escucha la desconexión del cliente mientras responde.
+                await terminado.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(mensaje):
+                mensajes.append(mensaje)
+                if mensaje['type'] == 'http.response.body' and not mensaje.get('more_body'):
+                    terminado.set()
+
+            async with semaforo:
+                await app(scope, receive, send)
+            return mensajes[0].get('status') == 200
+
+        async def todos():
+            semaforo = asyncio.Semaphore(options['concurrencia'])
+            return await asyncio.gather(*(pedir(semaforo) for _ in range(options['requests'])))
+
+        inicio = time.perf_counter()
+        resultados = asyncio.run(todos())
+        return time.perf_counter() - inicio, resultados.count(False)
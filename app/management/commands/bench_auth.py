@@ -0,0 +1,55 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app.authentication import CachedJWTAuthentication, invalidar_usuario
+from app.bench import crear_turnos_sinteticos, datos_descartables, medir, percentil
+from app.views import EspecialidadViewSet, PacienteViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara requests/s con JWTAuthentication (una query por request para el "
+        "usuario) y con CachedJWTAuthentication, sobre la caché configurada en "
+        "CACHES. Datos sintéticos en una transacción revertida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"caché: {settings.CACHES['default']['BACKEND']}")
+        with datos_descartables():
+            _, pacientes = crear_turnos_sinteticos(10)
+            usuario = get_user_model().objects.create_user('bench-auth')
+            token = str(RefreshToken.for_user(usuario).access_token)
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST='localhost')
+            rutas = (
+                # Respuesta cacheada: la query del usuario era la única del request.
+                ('especialidades', '/app/especialidades/', EspecialidadViewSet),
+                ('paciente', f'/app/pacientes/{pacientes[0].pk}/', PacienteViewSet),
+            )
+            for nombre, ruta, viewset in rutas:
+                resultados = {}
+                for clase in (JWTAuthentication, CachedJWTAuthentication):
+                    with mock.patch.object(viewset, 'authentication_classes', [clase]):
+                        client.get(ruta)
+                        inicio = time.perf_counter()
+                        tiempos = medir(lambda: client.get(ruta), options['requests'])
+                        por_segundo = len(tiempos) / (time.perf_counter() - inicio)
+                    resultados[clase] = por_segundo
+                    self.stdout.write(
+                        f"{nombre:>14} {clase.__name__:>23}: {por_segundo:7.0f} req/s"
+                        f"  p50 {percentil(tiempos, 50) * 1000:6.3f} ms"
+                        f"  p99 {percentil(tiempos, 99) * 1000:6.3f} ms"
+                    )
+                mejora = resultados[CachedJWTAuthentication] / resultados[JWTAuthentication] - 1
+                self.stdout.write(f"{nombre:>14} diferencia: {mejora * 100:+.1f} %")
+            # El usuario desaparece con el rollback; su id puede reutilizarse.
+            invalidar_usuario(usuario.pk)
@@ -0,0 +1,169 @@
+import json
+import re
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app import metrics
+from app.bench import percentil
+from app.models import Turno
+from app.urls import router, urlpatterns
+
+# Parámetros de consulta por nombre de ruta; reciben las muestras de `_muestras`.
+PARAMETROS = {
+    'medico-slots': lambda m: {
+        'desde': m['hoy'], 'hasta': m['hoy'] + timedelta(days=6), 'duracion': 15,
+    },
+    'paciente-search': lambda m: {'q': 'gomez'},
+    'busqueda-list': lambda m: {'q': 'ibuprofeno'},
+    'reporte-asistencia-list': lambda m: {'desde': m['hoy'] - timedelta(days=30), 'hasta': m['hoy']},
+    'turno-export': lambda m: {'medico': m['medico']},
+    'async-turnos': lambda m: {'medico': m['medico']},
+    'async-paciente-dni': lambda m: {'dni': m['dni']},
+}
+# Modelo del `pk` de las rutas que no salen del router.
+MUESTRA_POR_RUTA = {'async-agenda-medico': 'medico', 'async-paciente': 'paciente'}
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def rutas(patrones):
+    """(nombre, patrón) de cada ruta GET de app.urls, sin los sufijos de formato."""
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            yield from rutas(patron.url_patterns)
+            continue
+        acciones = getattr(patron.callback, 'actions', None)
+        if acciones is not None and 'get' not in acciones:
+            continue
+        if patron.name and 'format' not in patron.pattern.regex.groupindex:
+            yield patron.name, patron
+
+
+def _muestras():
+    """Un turno completado reciente y los registros relacionados con él."""
+    turno = (
+        Turno.objects.filter(estado='Completado', historialclinico__isnull=False)
+        .select_related('paciente').order_by('-fecha').first()
+    )
+    if turno is None:
+        raise CommandError("No hay turnos completados: correr seed_clinic antes.")
+    muestras = {
+        'hoy': timezone.localdate(),
+        'turno': turno.pk,
+        'historialclinico': turno.pk,
+        'medico': turno.medico_id,
+        'paciente': turno.paciente_id,
+        'dni': turno.paciente.dni,
+    }
+    for _, viewset, basename in router.registry:
+        queryset = getattr(viewset, 'queryset', None)
+        modelo = getattr(viewset, 'model', None) or (queryset.model if queryset is not None else None)
+        if modelo is None:
+            continue
+        nombre = modelo._meta.model_name
+        if nombre not in muestras:
+            muestras[nombre] = modelo.objects.order_by('pk').values_list('pk', flat=True).first()
+        muestras[basename] = muestras[nombre]
+    return muestras
+
+
+def _url(nombre, patron, muestras):
+    kwargs = {}
+    if 'pk' in patron.pattern.regex.groupindex:
+        clave = MUESTRA_POR_RUTA.get(nombre, nombre.rsplit('-', 1)[0])
+        kwargs['pk'] = muestras[clave]
+    return reverse(f'app:{nombre}', kwargs=kwargs)
+
+
+def _pedir(client, url, params):
+    """Devuelve (segundos, código, bytes, queries); consume las respuestas en streaming."""
+    inicio = time.perf_counter()
+    response = client.get(url, params)
+    if response.streaming:
+        cuerpo = b''.join(response.streaming_content)
+    else:
+        cuerpo = response.content
+    segundos = time.perf_counter() - inicio
+    # Cantidad de queries del encabezado de app.metrics (si el middleware está activo).
+    coincidencia = _QUERIES.search(response.get('Server-Timing', ''))
+    return segundos, response.status_code, len(cuerpo), coincidencia and int(coincidencia[1])
+
+
+class Command(BaseCommand):
+    help = (
+        "Recorre por GET todas las rutas de app/urls.py contra los datos cargados "
+        "(ver seed_clinic) y reporta p50/p99 de latencia y queries por request. "
+        "--guardar y --comparar permiten contrastar dos commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument('--presupuesto', type=float, default=5.0,
+                            help="Segundos máximos por ruta (al menos una repetición).")
+        parser.add_argument('--filtro', default='', help="Solo rutas cuyo nombre lo contenga.")
+        parser.add_argument('--guardar', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--comparar', help="Resultados JSON previos contra los que comparar.")
+
+    def handle(self, *args, **options):
+        muestras = _muestras()
+        anteriores = {}
+        if options['comparar']:
+            with open(options['comparar']) as archivo:
+                anteriores = json.load(archivo)
+
+        usuario, _ = get_user_model().objects.get_or_create(username='bench-endpoints')
+        try:
+            token = str(RefreshToken.for_user(usuario).access_token)
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST='localhost')
+            resultados = {}
+            for nombre, patron in rutas(urlpatterns):
+                if options['filtro'] not in nombre:
+                    continue
+                url = _url(nombre, patron, muestras)
+                params = PARAMETROS.get(nombre, lambda m: {})(muestras)
+                # Primer request aparte: calienta cachés y planes.
+                _pedir(client, url, params)
+                tiempos, queries = [], []
+                limite = time.perf_counter() + options['presupuesto']
+                while len(tiempos) < options['repeticiones'] and (
+                    not tiempos or time.perf_counter() < limite
+                ):
+                    segundos, codigo, tamaño, cantidad = _pedir(client, url, params)
+                    tiempos.append(segundos)
+                    queries.append(cantidad)
+                resultado = resultados[nombre] = {
+                    'url': url,
+                    'codigo': codigo,
+                    'bytes': tamaño,
+                    'repeticiones': len(tiempos),
+                    'p50_ms': percentil(tiempos, 50) * 1000,
+                    'p99_ms': percentil(tiempos, 99) * 1000,
+                    'queries': None if None in queries else max(queries),
+                }
+                self._imprimir(nombre, resultado, anteriores.get(nombre))
+        finally:
+            usuario.delete()
+            metrics.registro.reiniciar()
+
+        if options['guardar']:
+            with open(options['guardar'], 'w') as archivo:
+                json.dump(resultados, archivo, indent=2)
+
+    def _imprimir(self, nombre, resultado, anterior):
+        queries = '-' if resultado['queries'] is None else resultado['queries']
+        linea = (
+            f"{nombre:<32} {resultado['codigo']} p50 {resultado['p50_ms']:8.2f} ms"
+            f"  p99 {resultado['p99_ms']:8.2f} ms  queries {queries:>3}"
+            f"  {resultado['bytes']:>9} B  n={resultado['repeticiones']}"
+        )
+        if anterior:
+            linea += f"  p50 {(resultado['p50_ms'] / anterior['p50_ms'] - 1) * 100:+6.1f} %"
+            if None not in (resultado['queries'], anterior['queries']):
+                linea += f"  queries {resultado['queries'] - anterior['queries']:+d}"
+        self.stdout.write(linea)
@@ -0,0 +1,43 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from app.bench import crear_turnos_sinteticos, datos_descartables, llamar_vista
+from app.views import TurnoViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide filas/s y memoria pico de /app/turnos/export/ sobre turnos sintéticos "
+        "(los datos se generan en una transacción que se revierte)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10000, 100000])
+
+    def exportar(self, formato):
+        response = llamar_vista(TurnoViewSet, 'export', '/app/turnos/export/', format=formato)
+        total = 0
+        for bloque in response.streaming_content:
+            total += len(bloque)
+        return total
+
+    def handle(self, *args, **options):
+        for filas in options['filas']:
+            with datos_descartables():
+                crear_turnos_sinteticos(filas)
+                for formato in ('ndjson', 'csv'):
+                    inicio = time.perf_counter()
+                    bytes_ = self.exportar(formato)
+                    segundos = time.perf_counter() - inicio
+
+                    tracemalloc.start()
+                    self.exportar(formato)
+                    _, pico = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+
+                    self.stdout.write(
+                        f"{filas:>9} filas {formato:>6}: {filas / segundos:>10.0f} filas/s, "
+                        f"{bytes_ / 1e6:.1f} MB generados, memoria pico {pico / 1e6:.2f} MB"
+                    )
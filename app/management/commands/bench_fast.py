@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from app.bench import crear_turnos_sinteticos, datos_descartables, llamar_vista, medir, percentil
+from app.views import PacienteViewSet, TurnoViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el costo por fila del listado normal (ModelSerializer + JSON stdlib) "
+        "contra ?fast=1 (values() + orjson). Datos sintéticos en una transacción revertida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turnos', type=int, default=20000)
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        with datos_descartables():
+            crear_turnos_sinteticos(options['turnos'], pacientes=page_size)
+            for nombre, viewset, path in (
+                ('turnos', TurnoViewSet, '/app/turnos/'),
+                ('pacientes', PacienteViewSet, '/app/pacientes/'),
+            ):
+                resultados = {}
+                for modo, extra in (('normal', {}), ('fast', {'fast': 1})):
+                    def pedir():
+                        response = llamar_vista(viewset, 'list', path, page_size=page_size, **extra)
+                        response.render()
+                        resultados[modo] = response.content
+
+                    tiempos = medir(pedir, options['repeticiones'])
+                    p50 = percentil(tiempos, 50)
+                    self.stdout.write(
+                        f"{nombre:>9} {modo:>6}: p50 {p50 * 1000:7.2f} ms por página de {page_size}"
+                        f" -> {p50 / page_size * 1e6:6.1f} µs/fila"
+                    )
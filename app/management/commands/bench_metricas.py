@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app import metrics
+from app.bench import crear_turnos_sinteticos, datos_descartables, medir, percentil
+from app.models import Paciente
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de app.metrics: requests completos (con todo el middleware) con y "
+        "sin MetricasMiddleware, y el costo por query del execute_wrapper. Datos sintéticos "
+        "en una transacción revertida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--queries', type=int, default=20000)
+        parser.add_argument('--turnos', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        sin_metricas = [m for m in settings.MIDDLEWARE if m != 'app.metrics.MetricasMiddleware']
+        with datos_descartables():
+            medicos, pacientes = crear_turnos_sinteticos(options['turnos'])
+            usuario = get_user_model().objects.create_user('bench-metricas')
+            token = str(RefreshToken.for_user(usuario).access_token)
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST='localhost')
+            rutas = (
+                ('paciente', f'/app/pacientes/{pacientes[0].pk}/'),
+                ('turnos', f'/app/turnos/?medico={medicos[0].pk}&page_size=50'),
+            )
+            for nombre, ruta in rutas:
+                resultados = {}
+                for modo, middleware in (('sin', sin_metricas), ('con', settings.MIDDLEWARE)):
+                    with override_settings(MIDDLEWARE=middleware):
+                        client.get(ruta)
+                        tiempos = medir(lambda: client.get(ruta), options['requests'])
+                    resultados[modo] = percentil(tiempos, 50)
+                    self.stdout.write(
+                        f"{nombre:>9} {modo} métricas: p50 {resultados[modo] * 1000:7.3f} ms"
+                        f"  p99 {percentil(tiempos, 99) * 1000:7.3f} ms"
+                    )
+                extra = resultados['con'] - resultados['sin']
+                self.stdout.write(
+                    f"{nombre:>9} costo: {extra * 1e6:+7.1f} µs/request "
+                    f"({extra / resultados['sin'] * 100:+.1f} %)"
+                )
+
+            # Costo del wrapper por query: sin instalar, instalado sin medición
+            # (requests fuera del middleware) e instalado midiendo.
+            connection.ensure_connection()
+            consulta = Paciente.objects.filter(pk=pacientes[0].pk)
+            lote = 500
+
+            def correr():
+                for _ in range(lote):
+                    consulta.exists()
+
+            wrappers = connection.execute_wrappers
+            for modo in ('sin wrapper', 'inactivo', 'midiendo'):
+                instalado = metrics.contar_queries in wrappers
+                if modo == 'sin wrapper' and instalado:
+                    wrappers.remove(metrics.contar_queries)
+                elif modo != 'sin wrapper' and not instalado:
+                    wrappers.insert(0, metrics.contar_queries)
+                contexto = metrics._medicion.set(metrics.MedicionSQL()) if modo == 'midiendo' else None
+                tiempos = medir(correr, max(1, options['queries'] // lote))
+                if contexto:
+                    metrics._medicion.reset(contexto)
+                self.stdout.write(
+                    f"  queries {modo:>11}: p50 {percentil(tiempos, 50) / lote * 1e6:6.2f} µs por query"
+                )
+            metrics.registro.reiniciar()
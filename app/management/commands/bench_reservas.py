@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from app.models import Especialidad, Medico, Paciente, Turno
+from app.reservas import TurnoSuperpuesto
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara reservas concurrentes desde varios hilos sobre la base configurada, "
+        "verifica que no haya turnos solapados y reporta reservas/s. "
+        "Los datos creados se borran al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--intentos', type=int, default=200, help="Intentos por hilo.")
+        parser.add_argument('--medicos', type=int, default=4)
+
+    def handle(self, *args, **options):
+        especialidad = Especialidad.objects.create(nombre='Bench reservas')
+        medicos = [
+            Medico.objects.create(nombre=f'Bench{i}', apellido='Reservas',
+                                  especialidad=especialidad, mail='bench@reservas')
+            for i in range(options['medicos'])
+        ]
+        paciente = Paciente.objects.create(nombre='Bench', apellido='Reservas')
+        base = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=365)
+        contadores = {'ok': 0, 'conflicto': 0, 'bloqueo': 0}
+        lock = threading.Lock()
+        barrera = threading.Barrier(options['hilos'])
+
+        def trabajar(semilla):
+            rnd = random.Random(semilla)
+            barrera.wait()
+            try:
+                for _ in range(options['intentos']):
+                    turno = Turno(
+                        paciente=paciente, medico=rnd.choice(medicos), duracion=30,
+                        recordatorio='24h',
+                        # Horarios en múltiplos de 10 minutos: muchos choques.
+                        fecha=base + timedelta(minutes=10 * rnd.randrange(6 * 24 * 7)),
+                    )
+                    try:
+                        with transaction.atomic():
+                            turno.save()
+                        resultado = 'ok'
+                    except TurnoSuperpuesto:
+                        resultado = 'conflicto'
+                    except OperationalError:
+                        resultado = 'bloqueo'
+                    with lock:
+                        contadores[resultado] += 1
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=trabajar, args=(i,)) for i in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+
+        try:
+            solapados = 0
+            for medico in medicos:
+                filas = list(medico.turnos_medico.order_by('fecha').values_list('fecha', 'duracion'))
+                solapados += sum(
+                    1 for (a, dur), (b, _) in zip(filas, filas[1:]) if a + timedelta(minutes=dur) > b
+                )
+            total = sum(contadores.values())
+            self.stdout.write(
+                f"{options['hilos']} hilos, {total} intentos en {segundos:.2f} s: "
+                f"{contadores['ok']} reservados, {contadores['conflicto']} rechazados por choque, "
+                f"{contadores['bloqueo']} errores de bloqueo | {total / segundos:.0f} intentos/s, "
+                f"{contadores['ok'] / segundos:.0f} reservas/s | turnos solapados: {solapados}"
+            )
+        finally:
+            Turno.objects.filter(medico__in=medicos).delete()
+            Medico.objects.filter(pk__in=[m.pk for m in medicos]).delete()
+            paciente.delete()
+            especialidad.delete()
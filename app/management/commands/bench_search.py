@@ -0,0 +1,57 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from app import search
+from app.bench import datos_descartables, medir, percentil
+from app.models import Paciente
+
+APELLIDOS = ['Gómez', 'Pérez', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'González',
+             'Sánchez', 'Díaz', 'Álvarez', 'Romero', 'Suárez', 'Benítez', 'Acosta', 'Núñez']
+NOMBRES = ['Juan', 'María', 'José', 'Ana', 'Lucía', 'Martín', 'Sofía', 'Diego', 'Valentina']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda de pacientes por prefijo indexado (app.search) contra "
+        "LIKE '%x%' del search_fields original. Datos sintéticos en una transacción revertida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, default=200000)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--lote', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        azar = random.Random(0)
+        with datos_descartables():
+            for inicio in range(0, options['pacientes'], options['lote']):
+                lote = []
+                for i in range(inicio, min(inicio + options['lote'], options['pacientes'])):
+                    paciente = Paciente(
+                        dni=f'{10000000 + i * 7919 % 90000000}',
+                        nombre=azar.choice(NOMBRES),
+                        apellido=f'{azar.choice(APELLIDOS)}{i % 1000:03d}',
+                    )
+                    paciente.normalizar_nombre()
+                    lote.append(paciente)
+                Paciente.objects.bulk_create(lote)
+
+            for q in ('3456', 'perez12', 'juan gomez1', 'Núñez 5'):
+                def indexada():
+                    list(search.buscar(Paciente.objects.all(), q))
+
+                def like():
+                    condicion = Q()
+                    for termino in q.split():
+                        condicion &= (Q(dni__icontains=termino) | Q(nombre__icontains=termino)
+                                      | Q(apellido__icontains=termino))
+                    list(Paciente.objects.filter(condicion).order_by('apellido', 'nombre')[:search.LIMITE])
+
+                for nombre, funcion in (('índice', indexada), ('like', like)):
+                    tiempos = medir(funcion, options['repeticiones'])
+                    self.stdout.write(
+                        f"{q!r:>14} {nombre:>6}: p50 {percentil(tiempos, 50) * 1000:8.2f} ms"
+                        f"  p99 {percentil(tiempos, 99) * 1000:8.2f} ms"
+                    )
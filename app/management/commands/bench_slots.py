@@ -0,0 +1,68 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.bench import medir, percentil
+from app.slots import expandir_ventanas, fusionar_intervalos, intervalos_ocupados, slots_libres
+
+
+class Command(BaseCommand):
+    help = "Mide el motor de slots libres sobre un año sintético de turnos (sin tocar la base)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ocupacion', type=float, default=0.7,
+                            help="Fracción de slots ocupados por turnos (0-1).")
+        parser.add_argument('--duracion', type=int, default=30)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        duracion = options['duracion']
+        desde = date(2025, 1, 1)
+        hasta = date(2025, 12, 31)
+
+        # Lunes a viernes 08-12 y 14-18, sábados 09-13.
+        disponibilidades = [(d, time(8), time(12)) for d in range(5)]
+        disponibilidades += [(d, time(14), time(18)) for d in range(5)]
+        disponibilidades.append((5, time(9), time(13)))
+
+        ventanas = fusionar_intervalos(expandir_ventanas(disponibilidades, desde, hasta))
+        turnos = []
+        paso = timedelta(minutes=duracion)
+        for inicio, fin in ventanas:
+            actual = inicio
+            while actual + paso <= fin:
+                if rnd.random() < options['ocupacion']:
+                    turnos.append((actual, duracion))
+                actual += paso
+        self.stdout.write(
+            f"Año sintético: {len(ventanas)} ventanas, {len(turnos)} turnos ocupados."
+        )
+
+        tz = timezone.get_current_timezone()
+        semana_inicio = timezone.make_aware(datetime(2025, 6, 2), tz)
+        semana_fin = semana_inicio + timedelta(days=7)
+        turnos_semana = [t for t in turnos if semana_inicio <= t[0] < semana_fin]
+
+        escenarios = [
+            ("año", desde, hasta, turnos),
+            ("semana", date(2025, 6, 2), date(2025, 6, 8), turnos_semana),
+        ]
+        for nombre, d, h, filas in escenarios:
+            resultado = {}
+
+            def correr():
+                v = fusionar_intervalos(expandir_ventanas(disponibilidades, d, h))
+                resultado['slots'] = sum(1 for _ in slots_libres(v, intervalos_ocupados(filas), duracion))
+
+            tiempos = medir(correr, options['repeticiones'])
+            elementos = resultado['slots'] + len(filas)
+            p50 = percentil(tiempos, 50)
+            self.stdout.write(
+                f"{nombre:>7}: {resultado['slots']} slots libres, {len(filas)} turnos | "
+                f"p50 {p50 * 1000:.2f} ms, p99 {percentil(tiempos, 99) * 1000:.2f} ms | "
+                f"{p50 / max(elementos, 1) * 1e6:.2f} µs por slot+turno"
+            )
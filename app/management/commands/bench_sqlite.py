@@ -0,0 +1,141 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from app.bench import percentil
+from app.bulk import crear_turnos
+from app.models import Especialidad, Medico, Paciente, Turno
+
+# (OPTIONS, CONN_MAX_AGE) de cada perfil; "configurado" es el de tp.settings.
+PERFILES = {
+    'por defecto': ({}, 0),
+    'configurado': (settings.DATABASES['default'].get('OPTIONS', {}),
+                    settings.DATABASES['default'].get('CONN_MAX_AGE', 0)),
+}
+
+
+def _usar_base(nombre, opciones, conn_max_age):
+    """Apunta la conexión default a otro archivo y perfil (en este proceso)."""
+    connection.close()
+    connection.settings_dict.update(
+        NAME=nombre, OPTIONS=dict(opciones), CONN_MAX_AGE=conn_max_age,
+    )
+
+
+def _trabajador(archivo, perfil, indice, escritor, hasta, resultados):
+    """
+    Simula requests de un worker hasta `hasta`: close_old_connections() al
+    empezar y terminar cada uno, como hacen las señales de request de Django.
+    Los escritores alternan crear un turno por app.bulk con confirmar el
+    último creado leyéndolo y guardándolo en la misma transacción, como hace
+    el admin (changeform_view corre dentro de atomic); los lectores leen la
+    agenda.
+    """
+    _usar_base(archivo, *PERFILES[perfil])
+    medico = Medico.objects.order_by('pk')[indice]
+    paciente_id = Paciente.objects.values_list('pk', flat=True).first()
+    fecha = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    hechas, bloqueos, tiempos = 0, 0, []
+    ultimo = None
+    while time.time() < hasta:
+        close_old_connections()
+        inicio = time.perf_counter()
+        try:
+            if escritor and ultimo is None:
+                ultimo, = crear_turnos([{'paciente': paciente_id, 'medico': medico.pk,
+                                         'fecha': fecha, 'duracion': 30, 'recordatorio': '24h'}])
+                fecha += timedelta(minutes=30)
+            elif escritor:
+                with transaction.atomic():
+                    turno = Turno.objects.get(pk=ultimo.pk)
+                    turno.estado = 'Confirmado'
+                    turno.save()
+                ultimo = None
+            else:
+                list(Turno.objects.filter(medico=medico).order_by('-fecha').values()[:50])
+        except OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            bloqueos += 1
+        else:
+            hechas += 1
+            tiempos.append(time.perf_counter() - inicio)
+        close_old_connections()
+    connection.close()
+    resultados.put((escritor, hechas, bloqueos, tiempos))
+
+
+class Command(BaseCommand):
+    help = (
+        "Escrituras concurrentes desde varios procesos sobre copias descartables de la "
+        "base: compara el SQLite por defecto de Django con el perfil de tp.settings "
+        "(WAL, PRAGMA, BEGIN IMMEDIATE, conexiones persistentes). Reporta escrituras/s, "
+        "lecturas/s y errores de lock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=8)
+        parser.add_argument('--lectores', type=int, default=4)
+        parser.add_argument('--segundos', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("bench_sqlite sólo tiene sentido con SQLite.")
+        procesos = options['escritores'] + options['lectores']
+        original = dict(connection.settings_dict)
+        directorio = Path(tempfile.mkdtemp(prefix='bench_sqlite_'))
+        try:
+            # Base migrada sin WAL; cada perfil trabaja sobre su propia copia.
+            base = directorio / 'base.sqlite3'
+            _usar_base(str(base), *PERFILES['por defecto'])
+            call_command('migrate', verbosity=0)
+            especialidad = Especialidad.objects.create(nombre='Bench')
+            Medico.objects.bulk_create([
+                Medico(nombre=f'Médico{i}', apellido='Bench', especialidad=especialidad, mail='-')
+                for i in range(procesos)
+            ])
+            Paciente.objects.create(dni='bench', nombre='Paciente', apellido='Bench')
+            connection.close()
+
+            contexto = multiprocessing.get_context('fork')
+            for perfil in PERFILES:
+                archivo = directorio / f'{perfil.replace(" ", "_")}.sqlite3'
+                shutil.copy(base, archivo)
+                resultados = contexto.Queue()
+                hasta = time.time() + options['segundos']
+                trabajadores = [
+                    contexto.Process(target=_trabajador, args=(
+                        str(archivo), perfil, i, i < options['escritores'], hasta, resultados,
+                    ))
+                    for i in range(procesos)
+                ]
+                for trabajador in trabajadores:
+                    trabajador.start()
+                datos = [resultados.get() for _ in trabajadores]
+                for trabajador in trabajadores:
+                    trabajador.join()
+                self._reportar(perfil, datos, options['segundos'])
+        finally:
+            _usar_base(original['NAME'], original['OPTIONS'], original['CONN_MAX_AGE'])
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def _reportar(self, perfil, datos, segundos):
+        for escritor, nombre in ((True, 'escrituras'), (False, 'lecturas')):
+            hechas = sum(d[1] for d in datos if d[0] == escritor)
+            bloqueos = sum(d[2] for d in datos if d[0] == escritor)
+            tiempos = [t for d in datos if d[0] == escritor for t in d[3]]
+            self.stdout.write(
+                f"{perfil:>12} {nombre:>10}: {hechas / segundos:8.1f}/s"
+                f"  p50 {percentil(tiempos, 50) * 1000:7.2f} ms"
+                f"  p99 {percentil(tiempos, 99) * 1000:7.2f} ms"
+                f"  errores de lock: {bloqueos}"
+            )
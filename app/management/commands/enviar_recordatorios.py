@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.recordatorios import despachar
+
+
+class Command(BaseCommand):
+    help = "Worker que envía por mail los recordatorios de turnos vencidos (ver app.recordatorios)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true',
+                            help="Hace una sola pasada y termina (útil desde cron).")
+        parser.add_argument('--intervalo', type=float, default=30,
+                            help="Segundos entre pasadas.")
+        parser.add_argument('--lote', type=int, default=500,
+                            help="Recordatorios por transacción y envío SMTP.")
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.perf_counter()
+            enviados = despachar(lote=options['lote'])
+            if enviados or options['verbosity'] > 1:
+                self.stdout.write(
+                    f"{enviados} recordatorios enviados en {time.perf_counter() - inicio:.2f} s"
+                )
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
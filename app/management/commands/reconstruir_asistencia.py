@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.asistencia import reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde cero el resumen de asistencia (turnos por médico, día y estado). "
+        "Necesario después de cargas o UPDATE masivos que no pasan por las señales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = reconstruir(lote=options['lote'])
+        self.stdout.write(f"{filas} filas de resumen en {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import fts
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los índices de texto completo de historiales y recetas (ver app.fts)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=sorted(fts.INDICES), action='append',
+                            help="Reindexar sólo este tipo (se puede repetir).")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = fts.reindexar(options['tipo'])
+        if not resultado:
+            self.stdout.write("El motor no usa FTS5: los índices los mantiene la base.")
+            return
+        for tipo, filas in resultado.items():
+            self.stdout.write(f"{tipo}: {filas} filas indexadas")
+        self.stdout.write(f"Listo en {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.seed import generar
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga datos sintéticos realistas (especialidades, médicos, disponibilidades, "
+        "pacientes, turnos, historiales y recetas) con bulk_create en lotes y reconstruye "
+        "lo derivado. Se suma a lo que haya en la base: para empezar de cero, usar flush."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turnos', type=int, default=100000)
+        parser.add_argument('--medicos', type=int, default=50)
+        parser.add_argument('--pacientes', type=int, default=20000)
+        parser.add_argument('--especialidades', type=int, default=12)
+        parser.add_argument('--dias-atras', type=int, default=365,
+                            help="Días antes de hoy en los que empiezan las agendas.")
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for nombre in ('medicos', 'pacientes', 'especialidades', 'lote'):
+            if options[nombre] < 1:
+                raise CommandError(f"--{nombre} tiene que ser al menos 1.")
+        inicio = time.perf_counter()
+
+        def avisar(mensaje):
+            self.stdout.write(f"[{time.perf_counter() - inicio:7.1f} s] {mensaje}")
+
+        creados = generar(
+            turnos=options['turnos'], medicos=options['medicos'],
+            pacientes=options['pacientes'], especialidades=options['especialidades'],
+            dias_atras=options['dias_atras'], lote=options['lote'],
+            semilla=options['semilla'], avisar=avisar,
+        )
+        avisar(', '.join(f"{cantidad} {nombre}" for nombre, cantidad in creados.items()))
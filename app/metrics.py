@@ -0,0 +1,256 @@
+"""
+Métricas por ruta: latencia, cantidad de queries y tiempo de SQL.
+
+`MetricasMiddleware` mide cada request y agrega el resultado a histogramas
+en memoria, etiquetados por vista (`resolver_match.view_name`, así la
+cardinalidad queda acotada a las rutas definidas), método (los de HTTP; el
+resto cuenta como OTRO) y clase de código de estado. Además responde con un encabezado `Server-Timing` que el
+navegador muestra en sus herramientas de red.
+
+Las queries se cuentan con un execute_wrapper que se instala una sola vez en
+cada conexión (señal connection_created) y lee la medición en curso de una
+ContextVar: funciona igual bajo WSGI y bajo ASGI, donde el ORM corre en
+hilos del executor que heredan el contexto del request. Sin medición en
+curso el wrapper no hace nada más que leer la ContextVar.
+
+Compartido entre workers: cada proceso vuelca su registro como JSON en
+METRICS_DIR/metricas-<pid>.json cada METRICS_INTERVALO segundos (escritura
+atómica con os.replace), y GET /metrics suma todos los archivos y devuelve
+formato de texto de Prometheus. Los archivos de procesos ya terminados se
+conservan para que los contadores no retrocedan; conviene vaciar el
+directorio al desplegar.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+# Límites superiores de los buckets (el último, +Inf, es implícito).
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BUCKETS_QUERIES = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAMAS = {
+    'http_request_duration_seconds': ('Latencia del request.', BUCKETS_SEGUNDOS),
+    'http_request_sql_queries': ('Queries SQL por request.', BUCKETS_QUERIES),
+    'http_request_sql_duration_seconds': ('Tiempo en SQL por request.', BUCKETS_SEGUNDOS),
+}
+
+# Un método inventado por el cliente no abre una serie nueva.
+METODOS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+_medicion = contextvars.ContextVar('medicion_sql', default=None)
+
+
+class MedicionSQL:
+    __slots__ = ('queries', 'segundos')
+
+    def __init__(self):
+        self.queries = 0
+        self.segundos = 0.0
+
+
+def contar_queries(execute, sql, params, many, context):
+    """execute_wrapper permanente: acumula en la medición del request, si hay una."""
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.queries += 1
+        medicion.segundos += time.perf_counter() - inicio
+
+
+def instalar_wrapper(sender, connection, **kwargs):
+    """Receptor de connection_created (registrado en AppConfig.ready)."""
+    if contar_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, contar_queries)
+
+
+# --- Registro en memoria ---
+
+class Registro:
+    """
+    Histogramas acumulados del proceso: {(métrica, etiquetas): [buckets..., +Inf, suma]}.
+    Los buckets son contadores no acumulativos; se acumulan al exportar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._ultimo_volcado = 0.0
+
+    def reiniciar(self):
+        with self._lock:
+            self._series = {}
+            self._ultimo_volcado = 0.0
+
+    def observar(self, etiquetas, valores):
+        """`valores`: {métrica: valor} de un request."""
+        with self._lock:
+            for metrica, valor in valores.items():
+                limites = HISTOGRAMAS[metrica][1]
+                serie = self._series.get((metrica, etiquetas))
+                if serie is None:
+                    serie = self._series[(metrica, etiquetas)] = [0] * (len(limites) + 2)
+                serie[bisect_left(limites, valor)] += 1
+                serie[-1] += valor
+
+    def series(self):
+        with self._lock:
+            return {clave: list(serie) for clave, serie in self._series.items()}
+
+    def volcar_si_corresponde(self):
+        """Escribe el archivo del proceso si pasó METRICS_INTERVALO desde el último."""
+        ahora = time.monotonic()
+        if ahora - self._ultimo_volcado < settings.METRICS_INTERVALO:
+            return
+        self._ultimo_volcado = ahora
+        self.volcar()
+
+    def volcar(self):
+        directorio = Path(settings.METRICS_DIR)
+        directorio.mkdir(parents=True, exist_ok=True)
+        datos = [[metrica, list(etiquetas), serie]
+                 for (metrica, etiquetas), serie in self.series().items()]
+        destino = directorio / f'metricas-{os.getpid()}.json'
+        temporal = destino.with_suffix(f'.{threading.get_ident()}.tmp')
+        temporal.write_text(json.dumps(datos))
+        os.replace(temporal, destino)
+
+
+registro = Registro()
+
+
+def combinar():
+    """Suma los archivos de todos los procesos (el propio, con los datos en memoria)."""
+    total = {}
+
+    def sumar(metrica, etiquetas, serie):
+        actual = total.setdefault((metrica, etiquetas), [0] * len(serie))
+        for i, valor in enumerate(serie):
+            actual[i] += valor
+
+    propio = f'metricas-{os.getpid()}.json'
+    directorio = Path(settings.METRICS_DIR)
+    for archivo in sorted(directorio.glob('metricas-*.json')) if directorio.exists() else ():
+        if archivo.name == propio:
+            continue
+        try:
+            datos = json.loads(archivo.read_text())
+        except (OSError, ValueError):
+            continue
+        for metrica, etiquetas, serie in datos:
+            if metrica in HISTOGRAMAS:
+                sumar(metrica, tuple(map(tuple, etiquetas)), serie)
+    for (metrica, etiquetas), serie in registro.series().items():
+        sumar(metrica, etiquetas, serie)
+    return total
+
+
+def _etiquetas_texto(etiquetas, extra=()):
+    pares = [*etiquetas, *extra]
+    return ','.join(
+        '{}="{}"'.format(clave, str(valor).replace('\\', r'\\').replace('"', r'\"'))
+        for clave, valor in pares
+    )
+
+
+def exposicion():
+    """Texto en formato de exposición de Prometheus (0.0.4)."""
+    por_metrica = {}
+    for (metrica, etiquetas), serie in combinar().items():
+        por_metrica.setdefault(metrica, []).append((etiquetas, serie))
+    lineas = []
+    for metrica, (ayuda, limites) in HISTOGRAMAS.items():
+        lineas += [f'# HELP {metrica} {ayuda}', f'# TYPE {metrica} histogram']
+        for etiquetas, serie in sorted(por_metrica.get(metrica, ())):
+            acumulado = 0
+            for limite, cantidad in zip([*map(str, limites), '+Inf'], serie[:-1]):
+                acumulado += cantidad
+                lineas.append(
+                    f'{metrica}_bucket{{{_etiquetas_texto(etiquetas, [("le", limite)])}}} {acumulado}'
+                )
+            lineas.append(f'{metrica}_sum{{{_etiquetas_texto(etiquetas)}}} {serie[-1]:.6f}')
+            lineas.append(f'{metrica}_count{{{_etiquetas_texto(etiquetas)}}} {acumulado}')
+    return '\n'.join(lineas) + '\n'
+
+
+def metrics_view(request):
+    """
+    GET /metrics. Exige `Authorization: Bearer <METRICS_TOKEN>`; sin token
+    configurado sólo responde con DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Middleware ---
+
+class MetricasMiddleware:
+    """Mide latencia y SQL de cada request (ver el docstring del módulo)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion, token, inicio = self._empezar()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._terminar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        medicion, token, inicio = self._empezar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._terminar(request, response, medicion, inicio)
+
+    @staticmethod
+    def _empezar():
+        medicion = MedicionSQL()
+        return medicion, _medicion.set(medicion), time.perf_counter()
+
+    @staticmethod
+    def _terminar(request, response, medicion, inicio):
+        duracion = time.perf_counter() - inicio
+        coincidencia = getattr(request, 'resolver_match', None)
+        etiquetas = (
+            ('vista', coincidencia.view_name if coincidencia else 'sin_ruta'),
+            ('metodo', request.method if request.method in METODOS else 'OTRO'),
+            ('codigo', f'{response.status_code // 100}xx'),
+        )
+        registro.observar(etiquetas, {
+            'http_request_duration_seconds': duracion,
+            'http_request_sql_queries': medicion.queries,
+            'http_request_sql_duration_seconds': medicion.segundos,
+        })
+        response['Server-Timing'] = (
+            f'total;dur={duracion * 1000:.1f}, '
+            f'sql;dur={medicion.segundos * 1000:.1f};desc="{medicion.queries} queries"'
+        )
+        registro.volcar_si_corresponde()
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha', 'id'], name='turno_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_turno_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['medico', 'fecha'], name='turno_medico_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['paciente', 'fecha'], name='turno_paciente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['estado', 'fecha'], name='turno_estado_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:08
+
+from datetime import datetime, timedelta, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def reservar_turnos_existentes(apps, schema_editor):
+    """
+    Crea las reservas de los turnos activos ya cargados. Los solapamientos
+    previos a esta migración se conservan (ignore_conflicts): sólo queda
+    reservado el primer turno de cada bloque.
+    """
+    Turno = apps.get_model('app', 'Turno')
+    ReservaSlot = apps.get_model('app', 'ReservaSlot')
+    bloque = timedelta(minutes=5)
+    epoca = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    lote = []
+    turnos = (
+        Turno.objects.exclude(estado='Cancelado')
+        .order_by('fecha', 'id')
+        .values_list('id', 'medico_id', 'fecha', 'duracion')
+        .iterator(chunk_size=2000)
+    )
+    for turno_id, medico_id, fecha, duracion in turnos:
+        inicio = epoca + ((fecha - epoca) // bloque) * bloque
+        fin = fecha + timedelta(minutes=duracion)
+        while inicio < fin:
+            lote.append(ReservaSlot(medico_id=medico_id, turno_id=turno_id, inicio=inicio))
+            inicio += bloque
+        if len(lote) >= 5000:
+            ReservaSlot.objects.bulk_create(lote, ignore_conflicts=True)
+            lote = []
+    ReservaSlot.objects.bulk_create(lote, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_turno_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField()),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app.medico')),
+                ('turno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app.turno')),
+            ],
+            options={
+                'verbose_name_plural': 'Reservas de Slots',
+                'constraints': [models.UniqueConstraint(fields=('medico', 'inicio'), name='reserva_medico_inicio_unica')],
+            },
+        ),
+        migrations.RunPython(reservar_turnos_existentes, migrations.RunPython.noop),
+    ]
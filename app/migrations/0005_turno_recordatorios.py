@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:13
+
+import re
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def programar_recordatorios(apps, schema_editor):
+    """
+    Programa los recordatorios de los turnos futuros ya cargados (misma regla
+    que app.recordatorios.anticipacion, copiada para no depender del código
+    actual). Los turnos pasados quedan sin programar.
+    """
+    Turno = apps.get_model('app', 'Turno')
+    unidades = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+    formato = re.compile(r'(\d+)\s*([mhd]?)')
+    lote = []
+    turnos = Turno.objects.filter(fecha__gt=timezone.now()).only('id', 'fecha', 'recordatorio')
+    for turno in turnos.iterator(chunk_size=2000):
+        coincidencia = formato.fullmatch((turno.recordatorio or '').strip().lower())
+        if not coincidencia or not int(coincidencia.group(1)):
+            continue
+        cantidad, unidad = coincidencia.groups()
+        adelanto = min(timedelta(**{unidades[unidad or 'h']: int(cantidad)}), timedelta(days=7))
+        turno.recordatorio_programado = turno.fecha - adelanto
+        lote.append(turno)
+        if len(lote) >= 2000:
+            Turno.objects.bulk_update(lote, ['recordatorio_programado'])
+            lote = []
+    Turno.objects.bulk_update(lote, ['recordatorio_programado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_reservaslot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turno',
+            name='recordatorio_enviado',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='turno',
+            name='recordatorio_programado',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(condition=models.Q(('recordatorio_enviado__isnull', True)), fields=['recordatorio_programado'], name='turno_recordatorio_pend_idx'),
+        ),
+        migrations.RunPython(programar_recordatorios, migrations.RunPython.noop),
+    ]
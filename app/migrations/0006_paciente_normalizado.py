@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:17
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).strip()
+
+
+def normalizar_pacientes(apps, schema_editor):
+    """Completa las columnas normalizadas de los pacientes ya cargados."""
+    Paciente = apps.get_model('app', 'Paciente')
+    lote = []
+    for paciente in Paciente.objects.only('id', 'nombre', 'apellido').iterator(chunk_size=2000):
+        paciente.apellido_normalizado = normalizar(paciente.apellido)
+        paciente.nombre_normalizado = normalizar(paciente.nombre)
+        lote.append(paciente)
+        if len(lote) >= 2000:
+            Paciente.objects.bulk_update(lote, ['apellido_normalizado', 'nombre_normalizado'])
+            lote = []
+    Paciente.objects.bulk_update(lote, ['apellido_normalizado', 'nombre_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_turno_recordatorios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='apellido_normalizado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='paciente',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['apellido_normalizado', 'nombre_normalizado'], name='paciente_apellido_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['nombre_normalizado', 'apellido_normalizado'], name='paciente_nombre_norm_idx'),
+        ),
+        migrations.RunPython(normalizar_pacientes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+TABLAS = (
+    ('app_historialclinico_fts', 'app_historialclinico', 'turno_id'),
+    ('app_receta_fts', 'app_receta', 'id'),
+)
+
+
+def crear_indices(apps, schema_editor):
+    """
+    SQLite: tablas FTS5 (ver app.fts) cargadas con los datos existentes.
+    PostgreSQL: índices GIN sobre la misma expresión que usa app.fts.
+    Otros motores: nada (app.fts cae en icontains).
+    """
+    vendor = schema_editor.connection.vendor
+    for tabla_fts, tabla, pk in TABLAS:
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {tabla_fts} USING fts5("
+                f"descripcion, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            schema_editor.execute(
+                f"INSERT INTO {tabla_fts} (rowid, descripcion) SELECT {pk}, descripcion "
+                f"FROM {tabla} WHERE descripcion IS NOT NULL AND descripcion <> ''"
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute(
+                f"CREATE INDEX {tabla}_descripcion_tsv ON {tabla} USING gin "
+                f"(to_tsvector('spanish'::regconfig, COALESCE(descripcion, '')))"
+            )
+
+
+def borrar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for tabla_fts, tabla, _ in TABLAS:
+        if vendor == 'sqlite':
+            schema_editor.execute(f"DROP TABLE IF EXISTS {tabla_fts}")
+        elif vendor == 'postgresql':
+            schema_editor.execute(f"DROP INDEX IF EXISTS {tabla}_descripcion_tsv")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_paciente_normalizado'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def resumir_turnos_existentes(apps, schema_editor):
+    """Carga el resumen con los turnos existentes (lo mismo que reconstruir_asistencia)."""
+    Turno = apps.get_model('app', 'Turno')
+    ResumenAsistencia = apps.get_model('app', 'ResumenAsistencia')
+    agrupados = (
+        Turno.objects.order_by()
+        .annotate(dia=TruncDate('fecha'))
+        .values('medico_id', 'dia', 'estado')
+        .annotate(cantidad=Count('id'))
+    )
+    ResumenAsistencia.objects.bulk_create(
+        (ResumenAsistencia(**fila) for fila in agrupados.iterator(chunk_size=5000)),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_busqueda_texto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('Confirmado', 'Confirmado'), ('Cancelado', 'Cancelado'), ('Completado', 'Completado')], max_length=50)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_asistencia', to='app.medico')),
+            ],
+            options={
+                'verbose_name': 'Resumen de asistencia',
+                'verbose_name_plural': 'Resumen de asistencia',
+                'indexes': [models.Index(fields=['dia'], name='resumen_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('medico', 'dia', 'estado'), name='resumen_medico_dia_estado_unico')],
+            },
+        ),
+        migrations.RunPython(resumir_turnos_existentes, migrations.RunPython.noop),
+    ]
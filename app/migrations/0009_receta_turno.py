@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_resumenasistencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receta',
+            name='turno',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recetas', to='app.turno'),
+        ),
+    ]
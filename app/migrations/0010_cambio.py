@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:04
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Lo mismo que app.sync.MODELOS, por nombre.
+SINCRONIZADOS = ('especialidad', 'medico', 'paciente', 'turno')
+
+
+def registrar_existentes(apps, schema_editor):
+    """Un cambio por cada objeto existente, para que el primer sync los traiga."""
+    Cambio = apps.get_model('app', 'Cambio')
+    ahora = timezone.now()
+    for nombre in SINCRONIZADOS:
+        ids = apps.get_model('app', nombre).objects.order_by('pk').values_list('pk', flat=True)
+        Cambio.objects.bulk_create(
+            (Cambio(modelo=nombre, objeto_id=pk, fecha=ahora) for pk in ids.iterator(chunk_size=5000)),
+            batch_size=5000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_receta_turno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=50)),
+                ('objeto_id', models.BigIntegerField()),
+                ('eliminado', models.BooleanField(default=False)),
+                ('fecha', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Cambios',
+                'constraints': [models.UniqueConstraint(fields=('modelo', 'objeto_id'), name='cambio_modelo_objeto_unico')],
+            },
+        ),
+        migrations.RunPython(registrar_existentes, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,22 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
 
-class Especialidad(models.Model):
+
+class GuardadoAtomico:
+    """
+    save() dentro de una transacción que incluye a las señales post_save
+    (registro de cambios de app.sync, reservas de agenda): si una falla, el
+    objeto tampoco queda guardado. Django sólo envuelve así el delete().
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+# ---
+
+class Especialidad(GuardadoAtomico, models.Model):
     """Representa las diferentes especialidades médicas."""
     nombre = models.CharField(max_length=255) # varchar
 
@@ -12,7 +28,7 @@ class Especialidad(models.Model):
 
 # ---
 
-class Medico(models.Model):
+class Medico(GuardadoAtomico, models.Model):
     """Representa a los médicos del sistema."""
     nombre = models.CharField(max_length=255) 
     apellido = models.CharField(max_length=255)
@@ -27,18 +43,41 @@ class Medico(models.Model):
 
 # ---
 
-class Paciente(models.Model):
+class Paciente(GuardadoAtomico, models.Model):
     """Representa a los pacientes del sistema."""
     dni = models.CharField(max_length=255, unique=True, blank=True, null=True)
     nombre = models.CharField(max_length=255, blank=True, null=True) 
     apellido = models.CharField(max_length=255, blank=True, null=True)
     mail = models.CharField(max_length=255, blank=True, null=True) 
+    # Copias normalizadas (sin acentos, minúsculas) para buscar por prefijo
+    # con índice; se mantienen en save() (ver app.search).
+    apellido_normalizado = models.CharField(max_length=255, blank=True, default='', editable=False)
+    nombre_normalizado = models.CharField(max_length=255, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.nombre} {self.apellido} (DNI: {self.dni})"
 
+    def normalizar_nombre(self):
+        from .search import normalizar
+
+        self.apellido_normalizado = normalizar(self.apellido)
+        self.nombre_normalizado = normalizar(self.nombre)
+
+    def save(self, *args, **kwargs):
+        self.normalizar_nombre()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'apellido', 'nombre'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'apellido_normalizado', 'nombre_normalizado'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name_plural = "Pacientes"
+        indexes = [
+            models.Index(fields=['apellido_normalizado', 'nombre_normalizado'],
+                         name='paciente_apellido_norm_idx'),
+            models.Index(fields=['nombre_normalizado', 'apellido_normalizado'],
+                         name='paciente_nombre_norm_idx'),
+        ]
 
 # ---
 
@@ -47,6 +86,9 @@ class Receta(models.Model):
     medico = models.ForeignKey(Medico, on_delete=models.PROTECT, related_name='recetas_emitidas')
     paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='recetas_recibidas') 
     descripcion = models.TextField(null=True, blank=True)
+    # Turno en el que se emitió (opcional: las recetas previas no lo tienen).
+    turno = models.ForeignKey('Turno', on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='recetas')
 
     def __str__(self):
         return f"Receta {self.pk} para {self.paciente}"
@@ -71,7 +113,7 @@ class DisponibilidadMedico(models.Model):
 
 # ---
 
-class Turno(models.Model):
+class Turno(GuardadoAtomico, models.Model):
     """Representa las citas o turnos programados."""
     ESTADO_CHOICES = [
         ('Pendiente', 'Pendiente'),
@@ -87,12 +129,97 @@ class Turno(models.Model):
     motivo_consulta = models.TextField(blank=True, null=True)
     duracion = models.IntegerField() 
     recordatorio = models.CharField(max_length=10)
+    # Calculados: cuándo corresponde enviar el recordatorio y cuándo se envió
+    # (ver app.recordatorios).
+    recordatorio_programado = models.DateTimeField(null=True, blank=True, editable=False)
+    recordatorio_enviado = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Turno {self.pk} de {self.paciente} con {self.medico} el {self.fecha.strftime('%d/%m/%Y %H:%M')}"
 
+    # Campos que definen el lugar del turno en la agenda del médico.
+    CAMPOS_AGENDA = ('medico_id', 'fecha', 'duracion', 'estado')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._agenda_original = instance._agenda_actual()
+        return instance
+
+    def _agenda_actual(self):
+        return {campo: self.__dict__.get(campo) for campo in self.CAMPOS_AGENDA}
+
+    @property
+    def agenda_original(self):
+        """Valores de agenda tal como estaban en la base (None si es nuevo)."""
+        return getattr(self, '_agenda_original', None)
+
+    def agenda_modificada(self):
+        return self.agenda_original != self._agenda_actual()
+
+    @staticmethod
+    def _lugar(agenda):
+        return (agenda['medico_id'], agenda['fecha'], agenda['duracion'],
+                agenda['estado'] == 'Cancelado')
+
+    def reserva_modificada(self):
+        """
+        True si cambió el lugar que ocupa en la agenda: médico, horario o si
+        está cancelado. Pasar entre estados activos no toca sus reservas.
+        """
+        original = self.agenda_original
+        return original is None or self._lugar(original) != self._lugar(self._agenda_actual())
+
+    def programar_recordatorio(self):
+        """
+        Recalcula `recordatorio_programado` a partir de `fecha`, `recordatorio`
+        y `estado`. Si el turno cambió de fecha, el recordatorio se vuelve a
+        enviar; un turno cancelado o completado no tiene recordatorio, así no
+        queda en el índice de pendientes.
+        """
+        from .recordatorios import ESTADOS_ACTIVOS, anticipacion
+
+        original = self.agenda_original
+        if original is not None and original['fecha'] != self.fecha:
+            self.recordatorio_enviado = None
+        adelanto = anticipacion(self.recordatorio) if self.estado in ESTADOS_ACTIVOS else None
+        self.recordatorio_programado = None if adelanto is None else self.fecha - adelanto
+
+    def clean(self):
+        # El mismo control que hace la reserva al guardar (app.reservas), como
+        # error del campo para el admin y los formularios.
+        from .reservas import ocupado
+
+        if (self.medico_id and self.fecha and self.duracion and self.reserva_modificada()
+                and ocupado(self)):
+            raise ValidationError(
+                {'fecha': 'El médico ya tiene un turno que se solapa con este horario.'}
+            )
+
+    def save(self, *args, **kwargs):
+        self.programar_recordatorio()
+        # Si la reserva de agenda (señal post_save) lanza TurnoSuperpuesto, el
+        # turno tampoco queda guardado (ver GuardadoAtomico). Las señales ven
+        # todavía los valores originales.
+        super().save(*args, **kwargs)
+        self._agenda_original = self._agenda_actual()
+
     class Meta:
         verbose_name_plural = "Turnos"
+        # Índices para las consultas de agenda: filtran por médico, paciente o
+        # estado y ordenan/acotan por fecha.
+        indexes = [
+            models.Index(fields=['medico', 'fecha'], name='turno_medico_fecha_idx'),
+            models.Index(fields=['paciente', 'fecha'], name='turno_paciente_fecha_idx'),
+            models.Index(fields=['estado', 'fecha'], name='turno_estado_fecha_idx'),
+            # Listados sin filtro ordenados por fecha (API cronológica, admin).
+            models.Index(fields=['fecha', 'id'], name='turno_fecha_id_idx'),
+            # Sólo los recordatorios pendientes: el worker lee un rango chico.
+            models.Index(
+                fields=['recordatorio_programado'], name='turno_recordatorio_pend_idx',
+                condition=models.Q(recordatorio_enviado__isnull=True),
+            ),
+        ]
 
 # ---
 
@@ -103,7 +230,77 @@ class HistorialClinico(models.Model):
     descripcion = models.TextField(null=True, blank=True) # text
 
     def __str__(self):
-        return f"Historial para {self.paciente} (Turno: {self.turno.pk})"
+        return f"Historial para {self.paciente} (Turno: {self.turno_id})"
 
     class Meta:
         verbose_name_plural = "Historiales Clínicos"
+
+# ---
+
+class ReservaSlot(models.Model):
+    """
+    Bloque de agenda ocupado por un turno activo. La restricción única sobre
+    (medico, inicio) hace que dos turnos solapados no puedan reservarse
+    nunca, aun con requests concurrentes (ver app.reservas).
+    """
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='reservas')
+    turno = models.ForeignKey(Turno, on_delete=models.CASCADE, related_name='reservas')
+    inicio = models.DateTimeField()
+
+    def __str__(self):
+        return f"Reserva de {self.medico_id} a las {self.inicio.strftime('%d/%m/%Y %H:%M')}"
+
+    class Meta:
+        verbose_name_plural = "Reservas de Slots"
+        constraints = [
+            models.UniqueConstraint(fields=['medico', 'inicio'], name='reserva_medico_inicio_unica'),
+        ]
+
+# ---
+
+class ResumenAsistencia(models.Model):
+    """
+    Cantidad de turnos por médico, día y estado. Se mantiene en forma
+    incremental (ver app.asistencia) para que el reporte no recorra turnos.
+    """
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='resumen_asistencia')
+    dia = models.DateField()
+    estado = models.CharField(max_length=50, choices=Turno.ESTADO_CHOICES)
+    cantidad = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.medico_id} {self.dia} {self.estado}: {self.cantidad}"
+
+    class Meta:
+        verbose_name = "Resumen de asistencia"
+        verbose_name_plural = "Resumen de asistencia"
+        constraints = [
+            models.UniqueConstraint(fields=['medico', 'dia', 'estado'],
+                                    name='resumen_medico_dia_estado_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['dia'], name='resumen_dia_idx'),
+        ]
+
+# ---
+
+class Cambio(models.Model):
+    """
+    Último cambio de cada objeto que sincronizan los clientes (ver app.sync).
+    Cada escritura reemplaza la fila del objeto por una con un id mayor a
+    todos los anteriores: el id es el cursor de /app/sync/. Las bajas quedan
+    como lápidas (`eliminado`).
+    """
+    modelo = models.CharField(max_length=50)
+    objeto_id = models.BigIntegerField()
+    eliminado = models.BooleanField(default=False)
+    fecha = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.pk}: {self.modelo} {self.objeto_id}{' (eliminado)' if self.eliminado else ''}"
+
+    class Meta:
+        verbose_name_plural = "Cambios"
+        constraints = [
+            models.UniqueConstraint(fields=['modelo', 'objeto_id'], name='cambio_modelo_objeto_unico'),
+        ]
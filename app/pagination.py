@@ -0,0 +1,81 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset): cada página filtra a partir de la última
+    posición vista en lugar de usar OFFSET, así que una página profunda cuesta
+    lo mismo que la primera.
+
+    El tamaño de página se ajusta por viewset con los atributos `page_size` y
+    `max_page_size`, y por request con ?page_size= (acotado por `max_page_size`).
+    """
+    ordering = 'pk'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = getattr(view, 'page_size', self.page_size)
+        self.max_page_size = getattr(view, 'max_page_size', self.max_page_size)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class TurnoPagination(KeysetPagination):
+    """Turnos en orden cronológico; `id` desempata turnos con la misma fecha."""
+    ordering = ('fecha', 'id')
+
+
+class TimelinePagination(KeysetPagination):
+    """Historia del paciente: lo más reciente primero."""
+    ordering = ('-fecha', '-id')
+    page_size = 20
+
+
+class TimelineRecetasPagination(KeysetPagination):
+    """Recetas sin turno al final de la historia, las últimas emitidas primero."""
+    ordering = '-id'
+    page_size = 20
+
+
+# ---
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator para los changelists del admin sobre tablas grandes: nunca
+    cuenta más de `limite_exacto` filas. Si el resultado es más chico el
+    total es exacto; si no, se usa la estimación de filas de la base
+    (sqlite_stat1 tras ANALYZE, pg_class.reltuples en PostgreSQL) cuando el
+    listado no está filtrado, o el propio límite como cota.
+    """
+    limite_exacto = 10000
+
+    @cached_property
+    def count(self):
+        contadas = self.object_list[:self.limite_exacto + 1].count()
+        if contadas <= self.limite_exacto:
+            return contadas
+        if not self.object_list.query.where:
+            estimado = self._estimacion(self.object_list.model._meta.db_table)
+            if estimado:
+                return max(estimado, contadas)
+        return contadas
+
+    def _estimacion(self, tabla):
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite':
+                    cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla])
+                    fila = cursor.fetchone()
+                    return int(fila[0].split()[0]) if fila else None
+                if connection.vendor == 'postgresql':
+                    cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                                   [tabla])
+                    fila = cursor.fetchone()
+                    return fila[0] if fila and fila[0] > 0 else None
+        except DatabaseError:
+            return None
+        return None
@@ -0,0 +1,212 @@
+"""
+ViewSet genérico de CRUD en SQL puro.
+
+Cada operación ejecuta exactamente una query, sin instanciar modelos: las
+lecturas devuelven dicts armados desde el cursor y las escrituras usan
+`cursor.rowcount` (o RETURNING) para detectar el 404. Las escrituras de
+modelos sincronizables suman el REPLACE de su registro de cambios (app.sync),
+en la misma transacción. Sirve para recursos simples donde el overhead del
+ORM no se justifica. Las lecturas van a la
+conexión que elige el router (réplica o primario) y las escrituras al
+primario (ver app.routers). Las lecturas aceptan ?fields= (ver app.campos).
+"""
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.http import Http404
+from rest_framework import permissions, status, viewsets
+from rest_framework.response import Response
+
+from . import sync
+from .cache import cache_lectura, invalidar
+from .campos import pedidos
+from .routers import conexion_escritura, conexion_lectura
+
+
+class RawSQLViewSet(viewsets.ViewSet):
+    """
+    Subclases declaran `model`, `serializer_class` (para validar la entrada),
+    `raw_fields` (campos editables, además de la pk) y opcionalmente
+    `raw_ordering` y `cache_models` (ver app.cache).
+    """
+    model = None
+    serializer_class = None
+    raw_fields = ()
+    raw_ordering = None
+    cache_models = ()
+
+    # --- Metadatos de la tabla ---
+
+    def _pk(self):
+        return self.model._meta.pk
+
+    def _campos(self, nombres=None):
+        return [self.model._meta.get_field(n) for n in (nombres or self.raw_fields)]
+
+    def _nombres_pedidos(self):
+        """pk y `raw_fields`, o sólo los pedidos con ?fields=."""
+        nombres = [self._pk().name, *self.raw_fields]
+        campos, _ = pedidos(self.request, nombres)
+        return nombres if campos is None else [n for n in nombres if n in campos]
+
+    def _conexion(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return conexion_lectura(self.model)
+        return conexion_escritura(self.model)
+
+    def _select(self, conexion, nombres):
+        columnas = self._campos(nombres)
+        sql = ', '.join(conexion.ops.quote_name(c.column) for c in columnas)
+        return f'SELECT {sql} FROM {conexion.ops.quote_name(self.model._meta.db_table)}'
+
+    def _pk_valor(self, pk):
+        try:
+            return self._pk().to_python(pk)
+        except ValidationError:
+            raise Http404
+
+    def _fila(self, nombres, valores):
+        return dict(zip(nombres, valores))
+
+    def _parametros(self, validated_data, conexion):
+        """Nombres de columna y valores ya preparados para la base."""
+        campos = [c for c in self._campos() if c.name in validated_data]
+        valores = []
+        for campo in campos:
+            valor = validated_data[campo.name]
+            if campo.is_relation and valor is not None:
+                valor = valor.pk
+            valores.append(campo.get_db_prep_save(valor, conexion))
+        return [conexion.ops.quote_name(c.column) for c in campos], valores
+
+    def _validar(self, data, partial=False):
+        serializer = self.serializer_class(data=data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def _salida(self, pk, validated_data):
+        """Representación de la fila escrita, con las FKs como ids."""
+        salida = {self._pk().name: pk}
+        for campo, valor in validated_data.items():
+            salida[campo] = valor.pk if hasattr(valor, 'pk') else valor
+        return salida
+
+    def _ejecutar(self, conexion, sql, params):
+        with conexion.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount, cursor.fetchall() if cursor.description else None
+
+    def _error(self, operacion, error):
+        return Response({'detail': f'Error SQL al {operacion}: {error}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    def _escribio(self, pk, eliminado=False):
+        # El SQL crudo no dispara señales: se invalida la caché y se anota el
+        # cambio para /app/sync/ explícitamente.
+        invalidar(self.model)
+        if self.model in sync.MODELOS:
+            sync.registrar(self.model, [pk], eliminado=eliminado)
+
+    # ----------------------------------------------------
+    # LISTAR (GET /<recurso>/) -> 200 OK
+    # ----------------------------------------------------
+    @cache_lectura
+    def list(self, request):
+        conexion = self._conexion()
+        nombres = self._nombres_pedidos()
+        sql = self._select(conexion, nombres)
+        if self.raw_ordering:
+            columna = self.model._meta.get_field(self.raw_ordering).column
+            sql += f' ORDER BY {conexion.ops.quote_name(columna)} ASC'
+        _, filas = self._ejecutar(conexion, sql, [])
+        return Response([self._fila(nombres, f) for f in filas], status=status.HTTP_200_OK)
+
+    # ----------------------------------------------------
+    # DETALLE (GET /<recurso>/{id}/) -> 200 OK o 404
+    # ----------------------------------------------------
+    @cache_lectura
+    def retrieve(self, request, pk=None):
+        conexion = self._conexion()
+        nombres = self._nombres_pedidos()
+        columna = conexion.ops.quote_name(self._pk().column)
+        _, filas = self._ejecutar(
+            conexion, f'{self._select(conexion, nombres)} WHERE {columna} = %s',
+            [self._pk_valor(pk)],
+        )
+        if not filas:
+            raise Http404
+        return Response(self._fila(nombres, filas[0]), status=status.HTTP_200_OK)
+
+    # ----------------------------------------------------
+    # CREAR (POST /<recurso>/) -> 201 Created
+    # ----------------------------------------------------
+    def create(self, request):
+        validated_data = self._validar(request.data)
+        conexion = self._conexion()
+        columnas, valores = self._parametros(validated_data, conexion)
+        tabla = conexion.ops.quote_name(self.model._meta.db_table)
+        pk = conexion.ops.quote_name(self._pk().column)
+        marcadores = ', '.join(['%s'] * len(valores))
+        try:
+            with transaction.atomic(using=conexion.alias):
+                _, filas = self._ejecutar(
+                    conexion,
+                    f'INSERT INTO {tabla} ({", ".join(columnas)}) VALUES ({marcadores}) RETURNING {pk}',
+                    valores,
+                )
+                self._escribio(filas[0][0])
+        except DatabaseError as e:
+            return self._error('crear', e)
+        return Response(self._salida(filas[0][0], validated_data), status=status.HTTP_201_CREATED)
+
+    # ----------------------------------------------------
+    # ACTUALIZAR (PUT / PATCH /<recurso>/{id}/) -> 200 OK o 404
+    # ----------------------------------------------------
+    def update(self, request, pk=None, partial=False):
+        validated_data = self._validar(request.data, partial=partial)
+        conexion = self._conexion()
+        columnas, valores = self._parametros(validated_data, conexion)
+        if not columnas:
+            return self.retrieve(request, pk=pk)
+        tabla = conexion.ops.quote_name(self.model._meta.db_table)
+        asignaciones = ', '.join(f'{c} = %s' for c in columnas)
+        columna_pk = conexion.ops.quote_name(self._pk().column)
+        try:
+            with transaction.atomic(using=conexion.alias):
+                filas_afectadas, _ = self._ejecutar(
+                    conexion,
+                    f'UPDATE {tabla} SET {asignaciones} WHERE {columna_pk} = %s',
+                    valores + [self._pk_valor(pk)],
+                )
+                if filas_afectadas:
+                    self._escribio(self._pk_valor(pk))
+        except DatabaseError as e:
+            return self._error('actualizar', e)
+        if filas_afectadas == 0:
+            raise Http404
+        return Response(self._salida(self._pk_valor(pk), validated_data),
+                        status=status.HTTP_200_OK)
+
+    def partial_update(self, request, pk=None):
+        return self.update(request, pk=pk, partial=True)
+
+    # ----------------------------------------------------
+    # ELIMINAR (DELETE /<recurso>/{id}/) -> 204 No Content o 404
+    # ----------------------------------------------------
+    def destroy(self, request, pk=None):
+        conexion = self._conexion()
+        tabla = conexion.ops.quote_name(self.model._meta.db_table)
+        columna_pk = conexion.ops.quote_name(self._pk().column)
+        try:
+            with transaction.atomic(using=conexion.alias):
+                filas_afectadas, _ = self._ejecutar(
+                    conexion,
+                    f'DELETE FROM {tabla} WHERE {columna_pk} = %s', [self._pk_valor(pk)]
+                )
+                if filas_afectadas:
+                    self._escribio(self._pk_valor(pk), eliminado=True)
+        except DatabaseError as e:
+            # Por ejemplo, integridad referencial (médicos que usan la especialidad)
+            return self._error('eliminar', e)
+        if filas_afectadas == 0:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
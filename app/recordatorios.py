@@ -0,0 +1,118 @@
+"""
+Envío de recordatorios de turnos.
+
+`Turno.recordatorio` indica con cuánta anticipación avisar ('24h', '30m',
+'2d'; un número solo se toma en horas). Al guardar un turno se calcula
+`recordatorio_programado`; el worker (`manage.py enviar_recordatorios`) lee
+por el índice parcial de recordatorios pendientes sólo los que vencieron en
+los últimos MAX_ANTICIPACION (uno más viejo es de un turno que ya pasó), los
+envía por lotes sobre una única conexión SMTP y los marca con
+`recordatorio_enviado`. Así cada pasada lee un rango acotado aunque queden
+en el índice recordatorios que nunca se enviaron (pacientes sin mail).
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+MAX_ANTICIPACION = timedelta(days=7)
+ESTADOS_ACTIVOS = ('Pendiente', 'Confirmado')
+_UNIDADES = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+_FORMATO = re.compile(r'(\d+)\s*([mhd]?)')
+
+
+def anticipacion(recordatorio):
+    """Anticipación del recordatorio como timedelta, o None si no corresponde enviarlo."""
+    coincidencia = _FORMATO.fullmatch((recordatorio or '').strip().lower())
+    if not coincidencia:
+        return None
+    cantidad, unidad = coincidencia.groups()
+    adelanto = timedelta(**{_UNIDADES[unidad or 'h']: int(cantidad)})
+    if not adelanto:
+        return None
+    return min(adelanto, MAX_ANTICIPACION)
+
+
+def pendientes(ahora):
+    from .models import Turno
+
+    return (
+        Turno.objects
+        .filter(
+            recordatorio_enviado__isnull=True,
+            # fecha > ahora implica programado > ahora - MAX_ANTICIPACION; la
+            # cota explícita deja que la base lea sólo ese rango del índice.
+            recordatorio_programado__gt=ahora - MAX_ANTICIPACION,
+            recordatorio_programado__lte=ahora,
+            fecha__gt=ahora,
+        )
+        # Como exclusión y no como estado IN (...): con la igualdad sobre estado
+        # SQLite prefiere turno_estado_fecha_idx, que recorre todos los turnos
+        # futuros activos y los ordena, en lugar del rango del índice parcial.
+        .exclude(estado__in=[e for e, _ in Turno.ESTADO_CHOICES if e not in ESTADOS_ACTIVOS])
+        .exclude(paciente__mail__isnull=True)
+        .exclude(paciente__mail='')
+        .select_related('paciente', 'medico')
+        .order_by('recordatorio_programado')
+    )
+
+
+def armar_mensaje(turno, conexion):
+    fecha = timezone.localtime(turno.fecha).strftime('%d/%m/%Y a las %H:%M')
+    return EmailMessage(
+        subject=f'Recordatorio de turno: {fecha}',
+        body=(
+            f'Hola {turno.paciente.nombre or ""},\n\n'
+            f'Le recordamos su turno con {turno.medico} el {fecha} '
+            f'({turno.duracion} minutos).\n'
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[turno.paciente.mail],
+        connection=conexion,
+    )
+
+
+def despachar(ahora=None, lote=500):
+    """
+    Envía todos los recordatorios vencidos. Cada lote se reclama en una
+    transacción corta: se leen (con SKIP LOCKED donde la base lo soporta,
+    para poder correr varios workers) y se marcan. El envío por la conexión
+    SMTP compartida va fuera de la transacción, para no retener el lock de
+    escritura de SQLite mientras se habla con el servidor; si falla, se
+    desmarca el lote y se reintenta en la próxima pasada.
+    Devuelve la cantidad de recordatorios enviados.
+    """
+    from . import sync
+    from .models import Turno
+
+    ahora = ahora or timezone.now()
+    enviados = 0
+    with get_connection() as conexion:
+        while True:
+            with transaction.atomic():
+                turnos = list(
+                    pendientes(ahora).select_for_update(skip_locked=True, of=('self',))[:lote]
+                )
+                if not turnos:
+                    break
+                ids = [t.pk for t in turnos]
+                marcados = Turno.objects.filter(
+                    pk__in=ids, recordatorio_enviado__isnull=True,
+                ).update(recordatorio_enviado=ahora)
+                # update() no dispara señales (ver app.sync).
+                sync.registrar(Turno, ids)
+            try:
+                conexion.send_messages([armar_mensaje(t, conexion) for t in turnos])
+            except Exception:
+                with transaction.atomic():
+                    Turno.objects.filter(pk__in=ids, recordatorio_enviado=ahora).update(
+                        recordatorio_enviado=None)
+                    sync.registrar(Turno, ids)
+                raise
+            enviados += marcados
+            if len(turnos) < lote:
+                break
+    return enviados
@@ -0,0 +1,51 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Habilita ?format=ndjson en la negociación de contenido. Las vistas que lo
+    usan devuelven un StreamingHttpResponse ya serializado (ver app.export).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class CSVRenderer(BaseRenderer):
+    """Habilita ?format=csv; ver NDJSONRenderer."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que serializa con orjson cuando está instalado (varias veces
+    más rápido que el encoder de la stdlib) y produce la misma salida compacta.
+    Sin orjson se comporta exactamente como JSONRenderer.
+
+    Los tipos que orjson no resuelve igual que DRF (datetime con 'Z', Decimal,
+    strings perezosos, ...) se delegan al encoder de DRF.
+    """
+    opciones = 0
+    if orjson is not None:
+        opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        opciones = self.opciones
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=self.encoder_class().default, option=opciones)
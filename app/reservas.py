@@ -0,0 +1,84 @@
+"""
+Reserva atómica de agenda.
+
+Cada turno activo (no cancelado) ocupa bloques de BLOQUE minutos en
+ReservaSlot. La restricción única (medico, inicio) hace que el segundo de dos
+turnos solapados falle en su INSERT, sin lecturas previas ni locks globales:
+es la base la que decide, aun con requests concurrentes en varios workers.
+
+Los turnos que no arrancan o terminan en un múltiplo de BLOQUE ocupan el
+bloque completo, así que dos turnos que comparten un bloque parcial también
+se consideran solapados. La API sólo acepta turnos sobre la grilla (ver
+serializers.AgendaEnBloquesMixin), donde ese caso no se da.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+
+from .models import ReservaSlot
+
+BLOQUE = timedelta(minutes=5)
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class TurnoSuperpuesto(Exception):
+    """El médico ya tiene un turno activo que se solapa con el pedido."""
+
+
+def en_grilla(fecha):
+    """True si `fecha` es el inicio de un bloque."""
+    return (fecha - _EPOCA) % BLOQUE == timedelta(0)
+
+
+def bloques(fecha, duracion):
+    """Inicios de los bloques que cubren [fecha, fecha + duracion)."""
+    inicio = _EPOCA + ((fecha - _EPOCA) // BLOQUE) * BLOQUE
+    fin = fecha + timedelta(minutes=duracion)
+    while inicio < fin:
+        yield inicio
+        inicio += BLOQUE
+
+
+def ocupado(turno):
+    """True si algún bloque del turno ya está reservado por otro turno."""
+    if turno.estado == 'Cancelado':
+        return False
+    return (
+        ReservaSlot.objects
+        .filter(medico_id=turno.medico_id, inicio__in=list(bloques(turno.fecha, turno.duracion)))
+        .exclude(turno_id=turno.pk)
+        .exists()
+    )
+
+
+def reclamar(turnos):
+    """
+    Inserta en un solo INSERT los bloques de los turnos activos. Si alguno ya
+    está ocupado no se inserta ninguno y se lanza TurnoSuperpuesto.
+    """
+    reservas = [
+        ReservaSlot(medico_id=turno.medico_id, turno_id=turno.pk, inicio=inicio)
+        for turno in turnos
+        if turno.estado != 'Cancelado'
+        for inicio in bloques(turno.fecha, turno.duracion)
+    ]
+    if not reservas:
+        return
+    try:
+        with transaction.atomic():
+            ReservaSlot.objects.bulk_create(reservas, batch_size=2000)
+    except IntegrityError as e:
+        raise TurnoSuperpuesto(
+            'El médico ya tiene un turno que se solapa con este horario.'
+        ) from e
+
+
+def liberar(turnos):
+    ReservaSlot.objects.filter(turno__in=[t.pk for t in turnos]).delete()
+
+
+def sincronizar(turnos, nuevos=False):
+    """Vuelve a reservar los bloques de turnos creados o movidos."""
+    if not nuevos:
+        liberar(turnos)
+    reclamar(turnos)
@@ -0,0 +1,134 @@
+"""
+Lecturas en réplicas, escrituras en el primario.
+
+`ReplicaRouter` manda las lecturas de los modelos de `app` a uno de los alias
+de DATABASE_REPLICAS y todas las escrituras a 'default'. Sólo se lee de las
+réplicas dentro de un request para el que `ReplicasMiddleware` eligió una
+(al azar, la misma para todo el request, así sus lecturas son coherentes
+entre sí); fuera de un request (comandos, workers) todo va al primario,
+porque la réplica puede estar atrasada y esos procesos suelen leer para
+escribir.
+
+Un request lee del primario si:
+- usa un método que escribe (POST, PUT, PATCH, DELETE): los viewsets leen y
+  validan contra lo mismo que después modifican;
+- es del admin;
+- el cliente escribió hace menos de REPLICA_PEGADO_SEGUNDOS: después de una
+  escritura exitosa se responde con la cookie COOKIE_PRIMARIO, así el cliente
+  ve lo que acaba de escribir aunque la réplica todavía no lo tenga.
+
+La decisión vive en una ContextVar, así que vale igual bajo WSGI y ASGI. Las
+consultas en SQL crudo eligen su conexión con `conexion_lectura` y
+`conexion_escritura`.
+"""
+import contextvars
+import random
+from functools import cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.urls import reverse
+
+APPS_RUTEADAS = {'app'}
+COOKIE_PRIMARIO = 'leer_primario'
+METODOS_SEGUROS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Alias del que lee el request en curso; None es el primario.
+_replica = contextvars.ContextVar('replica', default=None)
+
+
+@cache
+def _prefijo_admin():
+    return reverse('admin:index')
+
+
+def lee_de_replica():
+    """True si el request en curso lee de una réplica."""
+    return _replica.get() is not None
+
+
+def conexion_lectura(modelo):
+    return connections[router.db_for_read(modelo)]
+
+
+def conexion_escritura(modelo):
+    return connections[router.db_for_write(modelo)]
+
+
+class ReplicaRouter:
+    """Router de DATABASE_ROUTERS (ver el docstring del módulo)."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label not in APPS_RUTEADAS:
+            return None
+        # Las relaciones de una instancia se leen de donde salió la instancia.
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db:
+            return instancia._state.db
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in APPS_RUTEADAS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas son copias del primario: se migran con él.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicasMiddleware:
+    """Elige la réplica del request (o el primario) y fija la cookie tras escribir."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _replica.set(self._elegir(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        return self._terminar(request, response)
+
+    async def __acall__(self, request):
+        token = _replica.set(self._elegir(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+        return self._terminar(request, response)
+
+    @staticmethod
+    def _elegir(request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in METODOS_SEGUROS
+            or request.path.startswith(_prefijo_admin())
+            or COOKIE_PRIMARIO in request.COOKIES
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    @staticmethod
+    def _terminar(request, response):
+        if request.method not in METODOS_SEGUROS and response.status_code < 400:
+            response.set_cookie(
+                COOKIE_PRIMARIO, '1', max_age=settings.REPLICA_PEGADO_SEGUNDOS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,65 @@
+"""
+Búsqueda de pacientes por DNI o nombre (GET /app/pacientes/search/?q= y el
+buscador del admin).
+
+Nada de LIKE '%x%': todas las condiciones son rangos de prefijo
+(campo >= p AND campo < p') sobre columnas indexadas, así que cada término
+es un recorrido corto de índice aunque la tabla tenga millones de filas.
+Para que "perez" encuentre "Pérez", el modelo guarda el apellido y el nombre
+normalizados (sin acentos y en minúsculas) en columnas propias.
+
+- Sólo dígitos: prefijo de DNI.
+- Texto: prefijo de apellido o de nombre completos ("perez nu", "maria jo")
+  o, con dos o más palabras, apellido y nombre en cualquier orden
+  ("gomez ju", "juan gom").
+"""
+import unicodedata
+
+from django.db.models import Q
+
+LIMITE = 20
+MAX_LIMITE = 50
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos, para comparar y ordenar por prefijo."""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).strip()
+
+
+def rango_prefijo(campo, prefijo):
+    """Condición equivalente a `campo LIKE 'prefijo%'` que sí usa el índice."""
+    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+    return Q(**{f'{campo}__gte': prefijo, f'{campo}__lt': siguiente})
+
+
+def filtro(q):
+    """Q para el texto buscado, o None si no hay nada que buscar."""
+    terminos = normalizar(q).replace(',', ' ').split()
+    if not terminos:
+        return None
+    if all(t.isdigit() for t in terminos):
+        return rango_prefijo('dni', ''.join(terminos))
+    frase = ' '.join(terminos)
+    condicion = (rango_prefijo('apellido_normalizado', frase)
+                 | rango_prefijo('nombre_normalizado', frase))
+    if len(terminos) > 1:
+        primero, resto = terminos[0], ' '.join(terminos[1:])
+        condicion |= (
+            (rango_prefijo('apellido_normalizado', primero) & rango_prefijo('nombre_normalizado', resto))
+            | (rango_prefijo('nombre_normalizado', primero) & rango_prefijo('apellido_normalizado', resto))
+        )
+    return condicion
+
+
+def buscar(queryset, q, limite=LIMITE):
+    """Los primeros `limite` pacientes que coinciden, ordenados por apellido y nombre."""
+    condicion = filtro(q)
+    if condicion is None:
+        return queryset.none()
+    limite = max(1, min(limite, MAX_LIMITE))
+    return queryset.filter(condicion).order_by(
+        'apellido_normalizado', 'nombre_normalizado', 'id'
+    )[:limite]
@@ -1,32 +1,58 @@
+import re
+from datetime import date
+
 from rest_framework import serializers
+from . import reservas
+from .campos import CamposSerializerMixin
 from .models import (
     Especialidad, Medico, Paciente, Receta,
     DisponibilidadMedico, Turno, HistorialClinico
 )
 
-class EspecialidadSerializer(serializers.ModelSerializer):
+class EspecialidadSerializer(CamposSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Especialidad
         fields = '__all__' # Incluye todos los campos
 
-class MedicoSerializer(serializers.ModelSerializer):
+class MedicoSerializer(CamposSerializerMixin, serializers.ModelSerializer):
     especialidad_nombre = serializers.StringRelatedField(source='especialidad')
 
     class Meta:
         model = Medico
         fields = '__all__'
+        # ?expand= (ver app.campos)
+        expandibles = {'especialidad': EspecialidadSerializer}
 
-class PacienteSerializer(serializers.ModelSerializer):
+class PacienteSerializer(CamposSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Paciente
-        fields = '__all__'
+        exclude = ('apellido_normalizado', 'nombre_normalizado')
 
-class DisponibilidadMedicoSerializer(serializers.ModelSerializer):
+class DisponibilidadMedicoSerializer(CamposSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DisponibilidadMedico
         exclude = ('medico',)
 
-class TurnoSerializer(serializers.ModelSerializer):
+class AgendaEnBloquesMixin:
+    """
+    Turnos sobre la grilla de bloques de app.reservas: así el solapamiento por
+    intervalos exactos (app.slots) coincide con el de la reserva por bloques.
+    """
+    MINUTOS_BLOQUE = int(reservas.BLOQUE.total_seconds() // 60)
+
+    def validate_fecha(self, valor):
+        if not reservas.en_grilla(valor):
+            raise serializers.ValidationError(
+                f'Debe empezar en un múltiplo de {self.MINUTOS_BLOQUE} minutos.')
+        return valor
+
+    def validate_duracion(self, valor):
+        if valor % self.MINUTOS_BLOQUE:
+            raise serializers.ValidationError(
+                f'Debe ser un múltiplo de {self.MINUTOS_BLOQUE} minutos.')
+        return valor
+
+class TurnoSerializer(AgendaEnBloquesMixin, CamposSerializerMixin, serializers.ModelSerializer):
     # Para mostrar el nombre completo del paciente y médico
     paciente_nombre_completo = serializers.StringRelatedField(source='paciente')
     medico_nombre_completo = serializers.StringRelatedField(source='medico')
@@ -34,17 +60,137 @@ class TurnoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Turno
         fields = '__all__'
+        expandibles = {'paciente': PacienteSerializer, 'medico': MedicoSerializer}
 
-class RecetaSerializer(serializers.ModelSerializer):
+class RecetaSerializer(CamposSerializerMixin, serializers.ModelSerializer):
     medico_nombre = serializers.StringRelatedField(source='medico')
     paciente_nombre = serializers.StringRelatedField(source='paciente')
     
     class Meta:
         model = Receta
         fields = '__all__'
+        expandibles = {'medico': MedicoSerializer, 'paciente': PacienteSerializer,
+                       'turno': TurnoSerializer}
 
-class HistorialClinicoSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        turno = attrs.get('turno', getattr(self.instance, 'turno', None))
+        paciente = attrs.get('paciente', getattr(self.instance, 'paciente', None))
+        if turno is not None and paciente is not None and turno.paciente_id != paciente.pk:
+            raise serializers.ValidationError({'turno': 'El turno es de otro paciente.'})
+        return attrs
+
+class HistorialClinicoSerializer(CamposSerializerMixin, serializers.ModelSerializer):
     turno_id = serializers.PrimaryKeyRelatedField(source='turno', read_only=True)
     class Meta:
         model = HistorialClinico
         fields = ('turno_id', 'paciente', 'descripcion')
+        expandibles = {'paciente': PacienteSerializer}
+
+class TimelineRecetaSerializer(serializers.ModelSerializer):
+    medico_nombre = serializers.StringRelatedField(source='medico')
+
+    class Meta:
+        model = Receta
+        fields = ('id', 'medico', 'medico_nombre', 'descripcion')
+
+class TimelineRecetaSueltaSerializer(TimelineRecetaSerializer):
+    """Entrada de /pacientes/{id}/timeline/ para una receta sin turno."""
+    tipo = serializers.SerializerMethodField()
+
+    class Meta(TimelineRecetaSerializer.Meta):
+        fields = ('tipo',) + TimelineRecetaSerializer.Meta.fields
+
+    def get_tipo(self, obj):
+        return 'receta'
+
+class TimelineTurnoSerializer(serializers.ModelSerializer):
+    """
+    Entrada de /pacientes/{id}/timeline/: el turno con su historial clínico y
+    sus recetas. Espera el queryset armado en PacienteViewSet.timeline
+    (select_related + prefetch), así que no hace queries por fila.
+    """
+    tipo = serializers.SerializerMethodField()
+    medico_nombre_completo = serializers.StringRelatedField(source='medico')
+    historial = serializers.CharField(source='historialclinico.descripcion', allow_null=True,
+                                      read_only=True)
+    recetas = TimelineRecetaSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Turno
+        fields = ('tipo', 'id', 'fecha', 'estado', 'duracion', 'motivo_consulta', 'medico',
+                  'medico_nombre_completo', 'historial', 'recetas')
+
+    def get_tipo(self, obj):
+        return 'turno'
+
+class SlotsQuerySerializer(serializers.Serializer):
+    """Valida los parámetros de /medicos/{id}/slots/."""
+    MAX_DIAS = 92
+
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    duracion = serializers.IntegerField(min_value=5, max_value=480, default=30)
+
+    def validate(self, attrs):
+        if attrs['hasta'] < attrs['desde']:
+            raise serializers.ValidationError("'hasta' debe ser posterior o igual a 'desde'.")
+        if (attrs['hasta'] - attrs['desde']).days >= self.MAX_DIAS:
+            raise serializers.ValidationError(f"El rango no puede superar {self.MAX_DIAS} días.")
+        return attrs
+
+class AgendaQuerySerializer(serializers.Serializer):
+    """Valida ?semana= de /medicos/{id}/agenda/: semana ISO ('2025-W23') o una fecha de esa semana."""
+    semana = serializers.CharField(required=False)
+
+    def validate_semana(self, valor):
+        coincidencia = re.fullmatch(r'(\d{4})-?[Ww](\d{1,2})', valor.strip())
+        try:
+            if coincidencia:
+                año, semana = map(int, coincidencia.groups())
+                date.fromisocalendar(año, semana, 1)
+                return año, semana
+            dia = date.fromisoformat(valor.strip())
+        except ValueError:
+            raise serializers.ValidationError("Usar una semana ISO (2025-W23) o una fecha (2025-06-04).")
+        return dia.isocalendar()[:2]
+
+class ReporteAsistenciaQuerySerializer(serializers.Serializer):
+    """Valida los parámetros de /reportes/asistencia/."""
+    MAX_DIAS = 366
+
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    medico = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs['hasta'] < attrs['desde']:
+            raise serializers.ValidationError("'hasta' debe ser posterior o igual a 'desde'.")
+        if (attrs['hasta'] - attrs['desde']).days >= self.MAX_DIAS:
+            raise serializers.ValidationError(f"El rango no puede superar {self.MAX_DIAS} días.")
+        return attrs
+
+class BusquedaQuerySerializer(serializers.Serializer):
+    """Valida los parámetros de /busqueda/."""
+    q = serializers.CharField()
+    paciente = serializers.IntegerField(required=False)
+    medico = serializers.IntegerField(required=False)
+    tipo = serializers.ChoiceField(choices=['historial', 'receta'], required=False)
+    limite = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class SyncQuerySerializer(serializers.Serializer):
+    """Valida los parámetros de /sync/; sin ?since= se empieza desde el principio."""
+    since = serializers.IntegerField(min_value=0, default=0)
+    limite = serializers.IntegerField(min_value=1, max_value=5000, default=1000)
+
+class TurnoBulkSerializer(AgendaEnBloquesMixin, serializers.ModelSerializer):
+    """
+    Item de alta/edición masiva de turnos. Las FKs llegan como ids planos para
+    no hacer una query por item; su existencia se valida en bloque (ver app.bulk).
+    """
+    paciente = serializers.IntegerField()
+    medico = serializers.IntegerField()
+
+    class Meta:
+        model = Turno
+        fields = ('id', 'paciente', 'medico', 'fecha', 'estado',
+                  'motivo_consulta', 'duracion', 'recordatorio')
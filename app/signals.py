@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import agenda, asistencia, fts, reservas, sync
+from .authentication import invalidar_usuario
+from .cache import invalidar
+from .models import Especialidad, HistorialClinico, Medico, Paciente, Receta, Turno
+
+
+@receiver([post_save, post_delete], sender=Especialidad)
+@receiver([post_save, post_delete], sender=Medico)
+@receiver([post_save, post_delete], sender=Paciente)
+def invalidar_datos_de_referencia(sender, **kwargs):
+    invalidar(sender)
+
+
+@receiver(post_save, sender=Medico)
+def invalidar_agenda_del_medico(sender, instance, created, **kwargs):
+    if not created:
+        agenda.invalidar_medico(instance.pk)
+
+
+@receiver(post_save, sender=Paciente)
+def invalidar_agenda_del_paciente(sender, instance, created, **kwargs):
+    if not created:
+        agenda.invalidar_paciente(instance.pk)
+
+
+@receiver(post_save, sender=Turno)
+def reservar_agenda(sender, instance, created, raw=False, **kwargs):
+    """Mantiene las ReservaSlot del turno; lanza TurnoSuperpuesto si hay choque."""
+    if raw:
+        return
+    if created:
+        reservas.sincronizar([instance], nuevos=True)
+    elif instance.reserva_modificada():
+        reservas.sincronizar([instance])
+
+
+@receiver(post_save, sender=Turno)
+def resumir_alta_o_cambio(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        asistencia.registrar(altas=[instance])
+    elif instance.agenda_modificada():
+        asistencia.registrar(cambios=[instance])
+
+
+@receiver(post_delete, sender=Turno)
+def resumir_baja(sender, instance, **kwargs):
+    asistencia.registrar(bajas=[instance])
+
+
+@receiver([post_save, post_delete], sender=Turno)
+def invalidar_agenda(sender, instance, raw=False, **kwargs):
+    agenda.invalidar_turnos([instance])
+
+
+@receiver(post_save, sender=HistorialClinico)
+@receiver(post_save, sender=Receta)
+def indexar_descripcion(sender, instance, **kwargs):
+    fts.indexar(instance)
+
+
+@receiver(post_delete, sender=HistorialClinico)
+@receiver(post_delete, sender=Receta)
+def desindexar_descripcion(sender, instance, **kwargs):
+    fts.desindexar(instance)
+
+
+@receiver(post_save, sender=Especialidad)
+@receiver(post_save, sender=Medico)
+@receiver(post_save, sender=Paciente)
+@receiver(post_save, sender=Turno)
+def registrar_cambio(sender, instance, **kwargs):
+    sync.registrar(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Especialidad)
+@receiver(post_delete, sender=Medico)
+@receiver(post_delete, sender=Paciente)
+@receiver(post_delete, sender=Turno)
+def registrar_baja(sender, instance, **kwargs):
+    sync.registrar(sender, [instance.pk], eliminado=True)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidar_usuario_jwt(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
@@ -0,0 +1,126 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+# Margen hacia atrás para capturar turnos que empiezan antes del rango
+# consultado pero todavía lo ocupan.
+MARGEN_TURNOS = timedelta(hours=24)
+
+
+def fusionar_intervalos(intervalos):
+    """
+    Fusiona intervalos (inicio, fin) ordenados por inicio en una lista de
+    intervalos disjuntos. Recorre la entrada una sola vez: O(n).
+    """
+    fusionados = []
+    for inicio, fin in intervalos:
+        if fusionados and inicio <= fusionados[-1][1]:
+            if fin > fusionados[-1][1]:
+                fusionados[-1] = (fusionados[-1][0], fin)
+        else:
+            fusionados.append((inicio, fin))
+    return fusionados
+
+
+def expandir_ventanas(disponibilidades, desde, hasta, tz=None):
+    """
+    Expande las ventanas semanales (dia_semana, hora_inicio, hora_fin) en
+    intervalos concretos entre las fechas `desde` y `hasta` (inclusive).
+
+    `dia_semana` sigue la convención de `date.weekday()`: 0 = lunes ... 6 = domingo.
+    Los intervalos se generan ordenados por inicio.
+    """
+    tz = tz or timezone.get_current_timezone()
+    por_dia = defaultdict(list)
+    for dia_semana, hora_inicio, hora_fin in disponibilidades:
+        if dia_semana is None or hora_inicio is None or hora_fin is None:
+            continue
+        if hora_fin <= hora_inicio:
+            continue
+        por_dia[dia_semana].append((hora_inicio, hora_fin))
+    for ventanas in por_dia.values():
+        ventanas.sort()
+
+    dia = desde
+    while dia <= hasta:
+        for hora_inicio, hora_fin in por_dia.get(dia.weekday(), ()):
+            yield (
+                timezone.make_aware(datetime.combine(dia, hora_inicio), tz),
+                timezone.make_aware(datetime.combine(dia, hora_fin), tz),
+            )
+        dia += timedelta(days=1)
+
+
+def slots_libres(ventanas, ocupados, duracion):
+    """
+    Barrido sobre ventanas y ocupados (ambos disjuntos y ordenados) que genera
+    los slots (inicio, fin) de `duracion` minutos que no se solapan con ningún
+    intervalo ocupado.
+
+    Los slots quedan alineados a la grilla que parte del inicio de cada
+    ventana. Al encontrar un conflicto se salta directamente al primer slot
+    de la grilla posterior al fin del ocupado, así que el costo es
+    O(slots + ocupados) y no depende del largo de cada ventana.
+    """
+    paso = timedelta(minutes=duracion)
+    i, n = 0, len(ocupados)
+    for ventana_inicio, ventana_fin in ventanas:
+        inicio = ventana_inicio
+        while inicio + paso <= ventana_fin:
+            fin = inicio + paso
+            while i < n and ocupados[i][1] <= inicio:
+                i += 1
+            if i < n and ocupados[i][0] < fin:
+                # Primer paso de la grilla que empieza en o después del fin del ocupado.
+                pasos = -((ventana_inicio - ocupados[i][1]) // paso)
+                inicio = ventana_inicio + pasos * paso
+                continue
+            yield inicio, fin
+            inicio = fin
+
+
+def intervalos_ocupados(turnos):
+    """Convierte filas (fecha, duracion) ordenadas por fecha en intervalos fusionados."""
+    return fusionar_intervalos(
+        (fecha, fecha + timedelta(minutes=duracion)) for fecha, duracion in turnos
+    )
+
+
+class AgendaOcupada:
+    """
+    Índice de intervalos ocupados por médico para detectar solapamientos en
+    O(log n) por consulta. Se construye a partir de filas (medico_id, fecha,
+    duracion) de una sola query y admite agregar intervalos nuevos, así que
+    sirve también para detectar choques dentro de un mismo lote.
+    """
+
+    def __init__(self, filas=()):
+        por_medico = defaultdict(list)
+        for medico_id, fecha, duracion in filas:
+            por_medico[medico_id].append((fecha, fecha + timedelta(minutes=duracion)))
+        self._inicios = {}
+        self._fines = {}
+        for medico_id, intervalos in por_medico.items():
+            intervalos.sort()
+            fusionados = fusionar_intervalos(intervalos)
+            self._inicios[medico_id] = [i for i, _ in fusionados]
+            self._fines[medico_id] = [f for _, f in fusionados]
+
+    def choca(self, medico_id, inicio, fin):
+        inicios = self._inicios.get(medico_id)
+        if not inicios:
+            return False
+        # Último intervalo que empieza antes de `fin`; al ser disjuntos, es el
+        # único candidato a solaparse.
+        idx = bisect_left(inicios, fin) - 1
+        return idx >= 0 and self._fines[medico_id][idx] > inicio
+
+    def agregar(self, medico_id, inicio, fin):
+        """Agrega un intervalo que no choca con los existentes."""
+        inicios = self._inicios.setdefault(medico_id, [])
+        fines = self._fines.setdefault(medico_id, [])
+        idx = bisect_left(inicios, inicio)
+        inicios.insert(idx, inicio)
+        fines.insert(idx, fin)
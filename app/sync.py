@@ -0,0 +1,143 @@
+"""
+Sincronización incremental (GET /app/sync/?since=<cursor>&limite=).
+
+Cada alta, modificación o baja de un objeto sincronizable reemplaza su fila
+de Cambio por una nueva (en SQLite, un REPLACE: una sola sentencia). El id
+de Cambio es AUTOINCREMENT y SQLite serializa las escrituras, así que una
+fila confirmada después de que un cliente leyó el cursor N siempre tiene id
+mayor que N: el cursor es monótono aunque haya workers escribiendo en
+paralelo, cosa que una columna updated_at no garantiza (la hora se toma
+antes de obtener el lock y los relojes de los workers difieren). En
+PostgreSQL los ids de una secuencia no salen en orden de commit, así que
+`registrar` toma primero un lock de la tabla Cambio que dura hasta el commit
+y serializa a quienes registran cambios, como SQLite. Con otros motores el
+chequeo app.E001 (`revisar_motor`) frena manage.py check, migrate y
+runserver.
+
+El feed lee los cambios con id mayor al cursor por la clave primaria y las
+filas actuales de esos objetos con una query por recurso: el costo depende
+de la cantidad de cambios, no del tamaño de las tablas. Las filas salen con
+el mismo formato que los listados (app.fast.PlanLectura), salvo los nombres
+de objetos relacionados (paciente_nombre_completo, especialidad_nombre...):
+renombrar un paciente no genera un Cambio de sus turnos, así que el cliente
+los arma con las filas de los otros recursos, que sí le llegan. Si un objeto
+cambia entre la lectura de Cambio y la de su tabla, el cliente recibe la
+versión nueva y la vuelve a recibir en el próximo sync; las bajas llegan
+como ids en `eliminados`.
+
+Lo mantienen las señales (app.signals) y, donde no hay señales, app.bulk,
+app.raw, app.recordatorios y app.seed, siempre en la misma transacción que
+la escritura (los modelos sincronizables guardan con models.GuardadoAtomico):
+si el registro falla, el objeto tampoco queda guardado. Un QuerySet.update()
+o un bulk_create nuevo sobre estos modelos tiene que llamar a `registrar`.
+"""
+from functools import cache
+
+from django.core.checks import Error, register
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.relations import StringRelatedField
+
+from .fast import plan_lectura
+from .models import Cambio, Especialidad, Medico, Paciente, Turno
+from .serializers import (
+    EspecialidadSerializer, MedicoSerializer, PacienteSerializer, TurnoSerializer,
+)
+
+# Recurso de la respuesta -> (modelo, serializer del listado).
+RECURSOS = {
+    'especialidades': (Especialidad, EspecialidadSerializer),
+    'medicos': (Medico, MedicoSerializer),
+    'pacientes': (Paciente, PacienteSerializer),
+    'turnos': (Turno, TurnoSerializer),
+}
+MODELOS = {modelo for modelo, _ in RECURSOS.values()}
+_RECURSO = {modelo._meta.model_name: recurso for recurso, (modelo, _) in RECURSOS.items()}
+FILAS_POR_SENTENCIA = 500
+
+
+@cache
+def _plan(serializer_class):
+    """Plan del listado sin los campos que muestran otro objeto (StringRelatedField)."""
+    campos = frozenset(
+        nombre for nombre, campo in serializer_class().fields.items()
+        if not campo.write_only and not isinstance(campo, StringRelatedField)
+    )
+    return plan_lectura(serializer_class, campos)
+
+
+@register()
+def revisar_motor(app_configs, **kwargs):
+    """El cursor de /app/sync/ sólo es monótono en SQLite y PostgreSQL."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return []
+    return [Error(
+        f'app.sync no garantiza un cursor monótono en {connection.vendor}.',
+        hint='Usar SQLite o PostgreSQL como base de datos principal.',
+        id='app.E001',
+    )]
+
+
+def registrar(modelo, ids, eliminado=False):
+    """Anota el alta/modificación (o la baja) de los objetos `ids` de `modelo`."""
+    nombre = modelo._meta.model_name
+    ahora = timezone.now()
+    ids = list(ids)
+    tabla = connection.ops.quote_name(Cambio._meta.db_table)
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Modo que choca consigo mismo pero no con las lecturas: el próximo
+            # id lo obtiene quien registre después de este commit.
+            cursor.execute(f'LOCK TABLE {tabla} IN SHARE ROW EXCLUSIVE MODE')
+            Cambio.objects.filter(modelo=nombre, objeto_id__in=ids).delete()
+            Cambio.objects.bulk_create([
+                Cambio(modelo=nombre, objeto_id=pk, eliminado=eliminado, fecha=ahora) for pk in ids
+            ], batch_size=FILAS_POR_SENTENCIA)
+        return
+    # REPLACE borra la fila anterior del objeto (restricción única) e inserta
+    # una nueva, con el próximo id.
+    fecha = connection.ops.adapt_datetimefield_value(ahora)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), FILAS_POR_SENTENCIA):
+            lote = ids[inicio:inicio + FILAS_POR_SENTENCIA]
+            cursor.execute(
+                f'REPLACE INTO {tabla} (modelo, objeto_id, eliminado, fecha) VALUES '
+                + ', '.join(['(%s, %s, %s, %s)'] * len(lote)),
+                [valor for pk in lote for valor in (nombre, pk, eliminado, fecha)],
+            )
+
+
+def cambios(desde, limite):
+    """
+    Hasta `limite` cambios posteriores al cursor `desde`, agrupados por
+    recurso, con el cursor para pedir los siguientes.
+    """
+    filas = list(
+        Cambio.objects.filter(pk__gt=desde).order_by('pk')
+        .values_list('pk', 'modelo', 'objeto_id', 'eliminado')[:limite + 1]
+    )
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    vigentes = {recurso: [] for recurso in RECURSOS}
+    eliminados = {recurso: [] for recurso in RECURSOS}
+    for _, nombre, objeto_id, eliminado in filas:
+        (eliminados if eliminado else vigentes)[_RECURSO[nombre]].append(objeto_id)
+
+    datos = {}
+    for recurso, ids in vigentes.items():
+        datos[recurso] = []
+        if not ids:
+            continue
+        modelo, serializer_class = RECURSOS[recurso]
+        plan = _plan(serializer_class)
+        datos[recurso] = [
+            plan.armar(fila)
+            for fila in modelo.objects.filter(pk__in=ids).order_by('pk').values(*plan.columnas)
+        ]
+    return {
+        'cursor': filas[-1][0] if filas else desde,
+        'hay_mas': hay_mas,
+        'cambios': datos,
+        'eliminados': eliminados,
+    }
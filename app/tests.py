@@ -1,3 +1,1818 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin import AdminSite
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import (
+    Especialidad, Medico, Paciente, Receta, DisponibilidadMedico, Turno, HistorialClinico,
+    ReservaSlot, ResumenAsistencia, Cambio
+)
+from . import asistencia, fts, metrics, seed, sync
+from .admin import RecetaAdmin
+from .management.commands.bench_endpoints import rutas
+from .pagination import EstimatedCountPaginator
+from .recordatorios import anticipacion, despachar, pendientes
+from .reservas import TurnoSuperpuesto, bloques, reclamar
+from .search import filtro, normalizar
+from .slots import expandir_ventanas, fusionar_intervalos, intervalos_ocupados, slots_libres
+from .urls import urlpatterns
+from .views import TurnoViewSet
+
+
+CACHES_TESTS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class APITestMixin:
+    """Cliente autenticado y datos mínimos para probar los endpoints."""
+
+    def assertMaxQueries(self, maximo, funcion):
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = funcion()
+        self.assertLessEqual(
+            len(ctx.captured_queries), maximo,
+            "\n".join(q['sql'] for q in ctx.captured_queries),
+        )
+        return resultado
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(CACHES=CACHES_TESTS))
+        cache.clear()
+        self.user = get_user_model().objects.create_user('tester', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.especialidad = Especialidad.objects.create(nombre='Clínica')
+        self.medico = Medico.objects.create(
+            nombre='Ana', apellido='Pérez', especialidad=self.especialidad, mail='ana@x.com'
+        )
+        self.paciente = Paciente.objects.create(dni='30111222', nombre='Juan', apellido='Gómez')
+
+
+# ---
+
+class SlotsEngineTests(TestCase):
+
+    def test_fusionar_intervalos(self):
+        self.assertEqual(
+            fusionar_intervalos([(1, 3), (2, 5), (5, 6), (8, 9)]),
+            [(1, 6), (8, 9)],
+        )
+
+    def test_expandir_ventanas_usa_weekday(self):
+        # 2025-06-02 es lunes (weekday 0).
+        ventanas = list(expandir_ventanas(
+            [(0, time(9), time(10)), (2, time(9), time(10)), (None, time(9), time(10))],
+            date(2025, 6, 2), date(2025, 6, 8),
+        ))
+        self.assertEqual([v[0].date() for v in ventanas], [date(2025, 6, 2), date(2025, 6, 4)])
+
+    def test_slots_libres_descuenta_ocupados(self):
+        ventanas = [(aware(2025, 6, 2, 9), aware(2025, 6, 2, 11))]
+        ocupados = intervalos_ocupados([(aware(2025, 6, 2, 9, 15), 30)])
+        slots = [s[0].time() for s in slots_libres(ventanas, ocupados, 30)]
+        # 09:00 y 09:30 chocan con 09:15-09:45; se salta al slot de las 10:00.
+        self.assertEqual(slots, [time(10), time(10, 30)])
+
+
+class SlotsEndpointTests(APITestMixin, TestCase):
+
+    def test_slots_excluye_turnos_no_cancelados(self):
+        DisponibilidadMedico.objects.create(
+            medico=self.medico, dia_semana=0, hora_inicio=time(9), hora_fin=time(11)
+        )
+        Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                             fecha=aware(2025, 6, 2, 9), duracion=30, recordatorio='24h')
+        Turno.objects.create(paciente=self.paciente, medico=self.medico, estado='Cancelado',
+                             fecha=aware(2025, 6, 2, 10), duracion=30, recordatorio='24h')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f'/app/medicos/{self.medico.pk}/slots/',
+                {'desde': '2025-06-02', 'hasta': '2025-06-08', 'duracion': 30},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [s['inicio'] for s in response.json()],
+            ['2025-06-02T09:30:00Z', '2025-06-02T10:00:00Z', '2025-06-02T10:30:00Z'],
+        )
+
+    def test_slots_valida_rango(self):
+        response = self.client.get(
+            f'/app/medicos/{self.medico.pk}/slots/',
+            {'desde': '2025-06-08', 'hasta': '2025-06-02'},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryBudgetTests(APITestMixin, TestCase):
+    """Presupuesto de queries de los listados: constante sin importar la cantidad de filas."""
+    ESCALAS = (10, 1000, 10000)
+    PRESUPUESTO = 1
+
+    def crecer(self, modelo, crear, hasta):
+        faltan = hasta - modelo.objects.count()
+        modelo.objects.bulk_create([crear(i) for i in range(faltan)], batch_size=1000)
+
+    def nuevo_medico(self, i):
+        return Medico(nombre=f'M{i}', apellido='X', especialidad=self.especialidad, mail='m@x.com')
+
+    def nuevo_turno(self, i):
+        return Turno(paciente=self.paciente, medico=self.medico,
+                     fecha=aware(2025, 1, 1) + timedelta(minutes=30 * i),
+                     duracion=30, recordatorio='24h')
+
+    def nueva_receta(self, i):
+        return Receta(paciente=self.paciente, medico=self.medico, descripcion=f'Receta {i}')
+
+    def verificar(self, url, modelo, crear):
+        for escala in self.ESCALAS:
+            with self.subTest(escala=escala):
+                self.crecer(modelo, crear, escala)
+                cache.clear()  # bulk_create no dispara señales de invalidación
+                response = self.assertMaxQueries(self.PRESUPUESTO, lambda: self.client.get(url))
+                self.assertEqual(response.status_code, 200)
+
+    def test_turnos(self):
+        self.verificar('/app/turnos/', Turno, self.nuevo_turno)
+
+    def test_recetas(self):
+        self.verificar('/app/recetas/', Receta, self.nueva_receta)
+
+    def test_medicos(self):
+        self.verificar('/app/medicos/', Medico, self.nuevo_medico)
+
+
+class KeysetPaginationTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        base = aware(2025, 1, 1)
+        # Dos turnos por fecha para ejercitar el desempate por id.
+        Turno.objects.bulk_create([
+            Turno(paciente=self.paciente, medico=self.medico, fecha=base + timedelta(hours=i // 2),
+                  duracion=30, recordatorio='24h')
+            for i in range(25)
+        ])
+
+    def recorrer(self, url):
+        ids, paginas = [], 0
+        while url:
+            response = self.assertMaxQueries(1, lambda: self.client.get(url))
+            self.assertEqual(response.status_code, 200)
+            ids += [t['id'] for t in response.data['results']]
+            url = response.data['next']
+            paginas += 1
+        return ids, paginas
+
+    def test_turnos_recorre_en_orden_fecha_id(self):
+        ids, paginas = self.recorrer('/app/turnos/?page_size=4')
+        esperado = list(Turno.objects.order_by('fecha', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+        self.assertEqual(paginas, 7)
+
+    def test_page_size_acotado_por_viewset(self):
+        with mock.patch.object(TurnoViewSet, 'max_page_size', 10, create=True):
+            response = self.client.get('/app/turnos/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_pacientes_paginados_por_id(self):
+        Paciente.objects.bulk_create([Paciente(dni=str(i)) for i in range(5)])
+        ids, _ = self.recorrer('/app/pacientes/?page_size=2')
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), Paciente.objects.count())
+
+
+class TurnoFiltrosTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.otro_medico = Medico.objects.create(
+            nombre='Luis', apellido='Díaz', especialidad=self.especialidad, mail='l@x.com'
+        )
+        for dia in range(1, 6):
+            for medico in (self.medico, self.otro_medico):
+                Turno.objects.create(paciente=self.paciente, medico=medico,
+                                     fecha=aware(2025, 6, dia, 10), duracion=30, recordatorio='24h')
+
+    def test_filtra_por_medico_y_rango_de_fechas(self):
+        response = self.client.get('/app/turnos/', {
+            'medico': self.medico.pk,
+            'fecha__gte': '2025-06-02T00:00:00Z',
+            'fecha__lt': '2025-06-04T00:00:00Z',
+        })
+        self.assertEqual(response.status_code, 200)
+        resultados = response.data['results']
+        self.assertEqual(len(resultados), 2)
+        self.assertTrue(all(t['medico'] == self.medico.pk for t in resultados))
+
+    def test_filtra_por_estado(self):
+        Turno.objects.filter(fecha__day=1).update(estado='Cancelado')
+        response = self.client.get('/app/turnos/', {'estado': 'Cancelado'})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_consultas_de_agenda_usan_indices_compuestos(self):
+        desde, hasta = aware(2025, 6, 1), aware(2025, 6, 8)
+        consultas = {
+            'turno_medico_fecha_idx': Turno.objects.filter(medico=self.medico),
+            'turno_paciente_fecha_idx': Turno.objects.filter(paciente=self.paciente),
+            'turno_estado_fecha_idx': Turno.objects.filter(estado='Pendiente'),
+        }
+        for indice, queryset in consultas.items():
+            with self.subTest(indice=indice):
+                plan = (
+                    queryset.filter(fecha__gte=desde, fecha__lt=hasta)
+                    .order_by('fecha', 'id')
+                    .explain()
+                )
+                self.assertIn(indice, plan)
+
+
+class TurnoBulkTests(APITestMixin, TestCase):
+
+    def item(self, hora, **extra):
+        return {'paciente': self.paciente.pk, 'medico': self.medico.pk,
+                'fecha': f'2025-06-02T{hora}:00Z', 'duracion': 30, 'recordatorio': '24h', **extra}
+
+    def test_crea_lote_con_queries_constantes(self):
+        items = [self.item(f'{h:02d}:{m:02d}') for h in range(8, 18) for m in (0, 30)]
+        # paciente + medico + choques + INSERT de turnos + INSERT de reservas +
+        # upsert del resumen de asistencia + registro de cambios (app.sync), más
+        # los savepoints de la transacción.
+        response = self.assertMaxQueries(
+            11, lambda: self.client.post('/app/turnos/bulk/', items, format='json')
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(Turno.objects.count(), 20)
+        self.assertEqual(response.data[0]['medico_nombre_completo'], 'Ana Pérez')
+
+    def test_errores_por_item_y_nada_se_escribe(self):
+        Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                             fecha=aware(2025, 6, 2, 9), duracion=30, recordatorio='24h')
+        items = [
+            self.item('10:00'),
+            self.item('09:15'),                 # choca con el turno existente
+            self.item('10:15'),                 # choca con el primer item del lote
+            self.item('11:00', medico=99999),   # médico inexistente
+            self.item('12:00', duracion='x'),   # campo inválido
+        ]
+        response = self.client.post('/app/turnos/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        errores = response.data
+        self.assertEqual(errores[0], {})
+        self.assertIn('fecha', errores[1])
+        self.assertIn('fecha', errores[2])
+        self.assertIn('medico', errores[3])
+        self.assertIn('duracion', errores[4])
+        self.assertEqual(Turno.objects.count(), 1)
+
+    def test_rechaza_turnos_fuera_de_la_grilla(self):
+        # 10:00+7 y 10:07+23 no se solapan, pero comparten el bloque de las
+        # 10:05: se rechazan antes de llegar a la reserva.
+        items = [self.item('10:00', duracion=7), self.item('10:07', duracion=23)]
+        response = self.client.post('/app/turnos/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('duracion', response.data[0])
+        self.assertIn('fecha', response.data[1])
+        self.assertEqual(Turno.objects.count(), 0)
+
+    def test_cancelados_no_ocupan_agenda(self):
+        items = [self.item('10:00'), self.item('10:00', estado='Cancelado')]
+        response = self.client.post('/app/turnos/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_actualiza_lote(self):
+        a = Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                                 fecha=aware(2025, 6, 2, 9), duracion=30, recordatorio='24h')
+        b = Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                                 fecha=aware(2025, 6, 2, 10), duracion=30, recordatorio='24h')
+        # Intercambiar horarios no es un choque: ambos se mueven en el mismo lote.
+        cambios = [
+            {'id': a.pk, 'fecha': '2025-06-02T10:00:00Z'},
+            {'id': b.pk, 'fecha': '2025-06-02T09:00:00Z', 'estado': 'Confirmado'},
+        ]
+        response = self.client.patch('/app/turnos/bulk/', cambios, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual(a.fecha, aware(2025, 6, 2, 10))
+        self.assertEqual((b.fecha, b.estado), (aware(2025, 6, 2, 9), 'Confirmado'))
+
+    def test_actualiza_lote_rechaza_ids_invalidos(self):
+        response = self.client.patch('/app/turnos/bulk/', [
+            {'id': 12345, 'estado': 'Cancelado'}, {'id': [1], 'estado': 'Cancelado'},
+            {'id': {'a': 1}}, {'id': '1'}, {'id': True},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        for error in response.data:
+            self.assertIn('id', error)
+
+    def test_rechaza_entrada_que_no_es_lista(self):
+        response = self.client.post('/app/turnos/bulk/', self.item('10:00'), format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Turno.objects.bulk_create([
+            Turno(paciente=self.paciente, medico=self.medico, fecha=aware(2025, 6, 2, 9 + i),
+                  duracion=30, recordatorio='24h', motivo_consulta='Control, "anual"')
+            for i in range(3)
+        ])
+
+    def exportar(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, contenido = self.exportar('/app/turnos/export/?format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0]['fecha'], '2025-06-02T09:00:00Z')
+        self.assertEqual(filas[0]['medico'], self.medico.pk)
+
+    def test_csv_respeta_filtros(self):
+        _, contenido = self.exportar(
+            '/app/turnos/export/?format=csv&fecha__gte=2025-06-02T10:00:00Z'
+        )
+        filas = list(csv.DictReader(io.StringIO(contenido)))
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[0]['motivo_consulta'], 'Control, "anual"')
+
+    def test_recetas_e_historiales(self):
+        Receta.objects.create(paciente=self.paciente, medico=self.medico, descripcion='Ibuprofeno')
+        _, contenido = self.exportar('/app/recetas/export/')
+        self.assertEqual(json.loads(contenido)['descripcion'], 'Ibuprofeno')
+        _, contenido = self.exportar('/app/historiales/export/?format=csv')
+        self.assertEqual(contenido.splitlines(), ['turno_id,paciente,descripcion'])
+
+
+class ReferenceCacheTests(APITestMixin, TestCase):
+
+    def test_lecturas_repetidas_no_tocan_la_base(self):
+        primera = self.client.get('/app/medicos/')
+        self.assertEqual(primera.status_code, 200)
+        with self.assertNumQueries(0):
+            segunda = self.client.get('/app/medicos/')
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+
+    def test_304_con_if_none_match(self):
+        etag = self.client.get('/app/especialidades/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/app/especialidades/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_sin_last_modified(self):
+        # Un cambio dentro del mismo segundo no puede esconderse tras un 304
+        # por fecha: sólo valida el ETag.
+        response = self.client.get('/app/medicos/')
+        self.assertNotIn('Last-Modified', response)
+        Medico.objects.create(nombre='Luis', apellido='Díaz',
+                              especialidad=self.especialidad, mail='l@x.com')
+        response = self.client.get('/app/medicos/',
+                                   HTTP_IF_MODIFIED_SINCE='Wed, 21 Oct 2037 07:28:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_orm_invalida_medicos(self):
+        etag = self.client.get('/app/medicos/')['ETag']
+        Medico.objects.create(nombre='Luis', apellido='Díaz',
+                              especialidad=self.especialidad, mail='l@x.com')
+        response = self.client.get('/app/medicos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_sql_crudo_de_especialidades_invalida(self):
+        self.client.get('/app/especialidades/')
+        self.client.get('/app/medicos/')
+        self.client.put(f'/app/especialidades/{self.especialidad.pk}/', {'nombre': 'Cardiología'},
+                        format='json')
+        self.assertEqual(self.client.get('/app/especialidades/').json()[0]['nombre'], 'Cardiología')
+        medico = self.client.get('/app/medicos/').json()[0]
+        self.assertEqual(medico['especialidad_nombre'], 'Cardiología')
+
+        self.client.post('/app/especialidades/', {'nombre': 'Pediatría'}, format='json')
+        self.assertEqual(len(self.client.get('/app/especialidades/').json()), 2)
+
+
+class RawSQLViewSetTests(APITestMixin, TestCase):
+
+    def url(self, pk=None):
+        return f'/app/especialidades/{pk}/' if pk else '/app/especialidades/'
+
+    def test_detalle_en_una_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url(self.especialidad.pk))
+        self.assertEqual(response.json(), {'id': self.especialidad.pk, 'nombre': 'Clínica'})
+
+    def test_cada_escritura_es_una_query_mas_su_cambio(self):
+        # La escritura y el REPLACE del registro de cambios (app.sync) dentro
+        # de su savepoint.
+        with self.assertNumQueries(4):
+            response = self.client.post(self.url(), {'nombre': 'Pediatría'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        pk = response.json()['id']
+        with self.assertNumQueries(4):
+            response = self.client.patch(self.url(pk), {'nombre': 'Neonatología'}, format='json')
+        self.assertEqual(response.json(), {'id': pk, 'nombre': 'Neonatología'})
+        with self.assertNumQueries(4):
+            response = self.client.delete(self.url(pk))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Especialidad.objects.filter(pk=pk).exists())
+
+    def test_404_por_rowcount(self):
+        self.assertEqual(self.client.get(self.url(999)).status_code, 404)
+        self.assertEqual(self.client.get(self.url('abc')).status_code, 404)
+        self.assertEqual(
+            self.client.put(self.url(999), {'nombre': 'X'}, format='json').status_code, 404
+        )
+        self.assertEqual(self.client.delete(self.url(999)).status_code, 404)
+
+    def test_valida_entrada(self):
+        response = self.client.post(self.url(), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('nombre', response.json())
+
+
+class FastReadTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        sin_datos = Paciente.objects.create(dni=None, nombre=None, apellido='Ñandú')
+        for i, paciente in enumerate((self.paciente, sin_datos)):
+            turno = Turno.objects.create(paciente=paciente, medico=self.medico,
+                                         fecha=aware(2025, 6, 2, 9 + i, i, 0, 123456), duracion=30,
+                                         recordatorio='24h', motivo_consulta=None if i else 'Control')
+            Receta.objects.create(paciente=paciente, medico=self.medico, descripcion='Ibuprofeno')
+            HistorialClinico.objects.create(paciente=paciente, turno=turno, descripcion='Sano')
+        DisponibilidadMedico.objects.create(medico=self.medico, dia_semana=0,
+                                            hora_inicio=time(9), hora_fin=time(12, 30))
+
+    def test_salida_identica_byte_a_byte(self):
+        for url in ('/app/turnos/', '/app/recetas/', '/app/medicos/', '/app/pacientes/',
+                    '/app/disponibilidad/', '/app/historiales/', '/app/turnos/?page_size=1'):
+            with self.subTest(url=url):
+                cache.clear()
+                normal = self.client.get(url)
+                separador = '&' if '?' in url else '?'
+                cache.clear()
+                rapido = self.client.get(f'{url}{separador}fast=1')
+                self.assertEqual(normal.status_code, 200)
+                # Los enlaces "next"/"previous" incluyen fast=1 sólo en la versión rápida.
+                contenido = rapido.content.replace(b'&fast=1', b'').replace(b'fast=1&', b'')
+                self.assertEqual(normal.content, contenido)
+
+    def test_respeta_filtros(self):
+        # django-filter valida que el paciente exista: 1 query + el listado.
+        response = self.assertMaxQueries(
+            2, lambda: self.client.get('/app/turnos/', {'fast': 1, 'paciente': self.paciente.pk})
+        )
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(response.json()['results'][0]['paciente_nombre_completo'],
+                         'Juan Gómez (DNI: 30111222)')
+
+
+class CamposTests(APITestMixin, TestCase):
+    """?fields= y ?expand= (ver app.campos)."""
+
+    def setUp(self):
+        super().setUp()
+        self.turnos = [
+            Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                                 fecha=aware(2025, 6, 2, 9 + i), duracion=30, recordatorio='24h',
+                                 motivo_consulta='Control ' * 50)
+            for i in range(3)
+        ]
+        Receta.objects.create(paciente=self.paciente, medico=self.medico, descripcion='Ibuprofeno',
+                              turno=self.turnos[0])
+        Receta.objects.create(paciente=self.paciente, medico=self.medico, descripcion='Sin turno')
+
+    def pedir(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [q['sql'] for q in ctx.captured_queries]
+
+    def test_fields_recorta_salida_y_columnas(self):
+        data, queries = self.pedir('/app/turnos/?fields=id,fecha,estado')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(list(data['results'][0]), ['id', 'fecha', 'estado'])
+        self.assertNotIn('motivo_consulta', queries[0])
+        self.assertNotIn('JOIN', queries[0])
+
+    def test_paginacion_con_orden_fuera_de_fields(self):
+        estados, url = [], '/app/turnos/?fields=estado&page_size=2'
+        while url:
+            data, queries = self.pedir(url)
+            self.assertEqual(len(queries), 1)
+            self.assertEqual([list(t) for t in data['results']], [['estado']] * len(data['results']))
+            estados += [t['estado'] for t in data['results']]
+            url = data['next']
+        self.assertEqual(len(estados), 3)
+
+    def test_expand_anida_en_la_misma_query(self):
+        data, queries = self.pedir('/app/turnos/?fields=id&expand=medico,paciente')
+        self.assertEqual(len(queries), 1)
+        turno = data['results'][0]
+        self.assertEqual(list(turno), ['id', 'paciente', 'medico'])
+        self.assertEqual(turno['medico'], {
+            'id': self.medico.pk, 'especialidad_nombre': 'Clínica', 'nombre': 'Ana',
+            'apellido': 'Pérez', 'mail': 'ana@x.com', 'especialidad': self.especialidad.pk,
+        })
+        self.assertEqual(turno['paciente']['dni'], '30111222')
+
+    def test_expand_de_relacion_nula(self):
+        data, queries = self.pedir('/app/recetas/?fields=descripcion&expand=turno')
+        self.assertEqual(len(queries), 1)
+        por_descripcion = {r['descripcion']: r['turno'] for r in data}
+        self.assertIsNone(por_descripcion['Sin turno'])
+        self.assertEqual(por_descripcion['Ibuprofeno']['paciente_nombre_completo'],
+                         'Juan Gómez (DNI: 30111222)')
+
+    def test_modo_rapido_identico(self):
+        for url in ('/app/turnos/?fields=id,fecha,medico_nombre_completo',
+                    '/app/turnos/?expand=medico,paciente',
+                    '/app/recetas/?fields=id&expand=turno,medico',
+                    '/app/historiales/?expand=paciente', '/app/medicos/?expand=especialidad'):
+            with self.subTest(url=url):
+                cache.clear()
+                normal = self.client.get(url)
+                cache.clear()
+                rapido = self.client.get(f'{url}&fast=1')
+                self.assertEqual(normal.status_code, 200)
+                contenido = rapido.content.replace(b'&fast=1', b'').replace(b'fast=1&', b'')
+                self.assertEqual(normal.content, contenido)
+
+    def test_detalle(self):
+        data, _ = self.pedir(f'/app/medicos/{self.medico.pk}/?fields=apellido')
+        self.assertEqual(data, {'apellido': 'Pérez'})
+
+    def test_sql_crudo(self):
+        data, queries = self.pedir('/app/especialidades/?fields=nombre')
+        self.assertEqual(data, [{'nombre': 'Clínica'}])
+        self.assertNotIn('"id"', queries[0])
+
+    def test_nombres_invalidos(self):
+        response = self.client.get('/app/turnos/?fields=id,nada&expand=estado')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'fields', 'expand'})
+        response = self.client.get('/app/especialidades/?expand=medicos')
+        self.assertEqual(response.status_code, 400)
+
+    def test_escrituras_usan_el_serializer_completo(self):
+        response = self.client.post('/app/turnos/?fields=id', {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha': aware(2025, 6, 3, 9), 'duracion': 30, 'recordatorio': '24h',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('motivo_consulta', response.json())
+
+
+class ReservaAgendaTests(APITestMixin, TestCase):
+
+    def crear(self, hora, **extra):
+        return self.client.post('/app/turnos/', {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha': f'2025-06-02T{hora}:00Z', 'duracion': 30, 'recordatorio': '24h', **extra,
+        }, format='json')
+
+    def test_rechaza_solapamiento_con_409(self):
+        self.assertEqual(self.crear('09:00').status_code, 201)
+        response = self.crear('09:20')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Turno.objects.count(), 1)
+        self.assertEqual(self.crear('09:30').status_code, 201)
+
+    def test_mover_y_cancelar_liberan_la_agenda(self):
+        turno = self.crear('09:00').json()
+        self.client.patch(f"/app/turnos/{turno['id']}/", {'fecha': '2025-06-02T11:00:00Z'},
+                          format='json')
+        self.assertEqual(self.crear('09:00').status_code, 201)
+        self.client.patch(f"/app/turnos/{turno['id']}/", {'estado': 'Cancelado'}, format='json')
+        self.assertEqual(self.crear('11:00').status_code, 201)
+        self.assertEqual(ReservaSlot.objects.filter(turno_id=turno['id']).count(), 0)
+
+    def test_editar_otros_campos_no_toca_reservas(self):
+        turno = self.crear('09:00').json()
+        # SELECT + UPDATE del turno y su registro de cambios (app.sync) dentro de
+        # su savepoint; ninguna query de reservas.
+        with self.assertNumQueries(5):
+            self.client.patch(f"/app/turnos/{turno['id']}/", {'motivo_consulta': 'Control'},
+                              format='json')
+
+    def test_cambio_de_estado_no_reserva_de_nuevo(self):
+        # Solape heredado de antes de 0004: el segundo turno quedó sin reservas.
+        primero, segundo = Turno.objects.bulk_create([
+            Turno(paciente=self.paciente, medico=self.medico, duracion=30,
+                  recordatorio='24h', fecha=aware(2025, 6, 2, 9, minuto))
+            for minuto in (0, 15)
+        ])
+        reclamar([primero])
+        response = self.client.patch(f'/app/turnos/{segundo.pk}/', {'estado': 'Confirmado'},
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch('/app/turnos/bulk/', [
+            {'id': segundo.pk, 'estado': 'Completado'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.patch(f'/app/turnos/{segundo.pk}/', {'estado': 'Cancelado'}, format='json')
+        response = self.client.patch(f'/app/turnos/{segundo.pk}/', {'estado': 'Pendiente'},
+                                     format='json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_rechaza_turnos_fuera_de_la_grilla(self):
+        self.assertIn('duracion', self.crear('09:00', duracion=7).data)
+        self.assertIn('fecha', self.crear('09:07').data)
+        self.assertEqual(Turno.objects.count(), 0)
+
+    def test_create_fuera_de_la_api_no_deja_el_turno(self):
+        self.assertEqual(self.crear('09:00').status_code, 201)
+        with self.assertRaises(TurnoSuperpuesto):
+            Turno.objects.create(paciente=self.paciente, medico=self.medico, duracion=30,
+                                 recordatorio='24h', fecha=aware(2025, 6, 2, 9, 15))
+        self.assertEqual(Turno.objects.count(), 1)
+        self.assertEqual(ReservaSlot.objects.count(), 6)
+
+    def test_admin_muestra_el_solapamiento_como_error(self):
+        self.assertEqual(self.crear('09:00').status_code, 201)
+        admin = get_user_model().objects.create_superuser('admin', password='x')
+        cliente = Client()
+        cliente.force_login(admin)
+        response = cliente.post(reverse('admin:app_turno_add'), {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha_0': '2025-06-02', 'fecha_1': '09:15:00', 'estado': 'Pendiente',
+            'duracion': 30, 'recordatorio': '24h',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('fecha', response.context['adminform'].form.errors)
+        self.assertEqual(Turno.objects.count(), 1)
+
+    def test_bloques_parciales(self):
+        inicio = aware(2025, 6, 2, 9, 3)
+        self.assertEqual(
+            [b.time() for b in bloques(inicio, 10)],
+            [time(9), time(9, 5), time(9, 10)],
+        )
+
+
+class ReservaConcurrenteTests(TransactionTestCase):
+    """Varios hilos intentan reservar los mismos horarios a la vez."""
+    HILOS = 8
+    HORARIOS = 10
+
+    def setUp(self):
+        especialidad = Especialidad.objects.create(nombre='Clínica')
+        self.medico = Medico.objects.create(nombre='Ana', apellido='Pérez',
+                                            especialidad=especialidad, mail='a@x.com')
+        self.paciente = Paciente.objects.create(dni='1')
+
+    def reservar(self, numero, barrera, resultados):
+        # Semilla fija por hilo: los desplazamientos se repiten en cada corrida.
+        azar = random.Random(numero)
+        barrera.wait()
+        for h in range(self.HORARIOS):
+            # Cada hilo desplaza su turno unos minutos: todos se solapan entre sí.
+            turno = Turno(paciente=self.paciente, medico=self.medico, duracion=30,
+                          recordatorio='24h',
+                          fecha=aware(2025, 6, 2, 8) + timedelta(hours=h, minutes=azar.randint(0, 20)))
+            for _ in range(50):
+                try:
+                    with transaction.atomic():
+                        turno.pk = None
+                        turno.save()
+                    resultados.append('ok')
+                    break
+                except TurnoSuperpuesto:
+                    resultados.append('conflicto')
+                    break
+                except OperationalError:
+                    # SQLite en memoria de los tests: tabla bloqueada por otro hilo.
+                    time_module.sleep(0.005)
+            else:
+                resultados.append(f'hilo {numero}, horario {h}: reintentos agotados')
+        connections.close_all()
+
+    def test_un_solo_turno_por_horario(self):
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+        hilos = [threading.Thread(target=self.reservar, args=(n, barrera, resultados))
+                 for n in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual([r for r in resultados if r not in ('ok', 'conflicto')], [])
+        self.assertEqual(resultados.count('ok'), self.HORARIOS)
+        self.assertEqual(len(resultados), self.HILOS * self.HORARIOS)
+        turnos = list(Turno.objects.order_by('fecha').values_list('fecha', 'duracion'))
+        for (a, dur), (b, _) in zip(turnos, turnos[1:]):
+            self.assertLessEqual(a + timedelta(minutes=dur), b)
+
+
+class AsyncReadTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        for h in range(5):
+            Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                                 fecha=aware(2025, 6, 2, 9 + h), duracion=30, recordatorio='24h')
+
+    def test_requiere_autenticacion(self):
+        self.assertEqual(self.client.get('/app/async/turnos/').status_code, 401)
+        response = Client().get('/app/async/turnos/', HTTP_AUTHORIZATION='Bearer x')
+        self.assertEqual(response.status_code, 401)
+
+    def test_turnos_iguales_al_endpoint_drf_y_paginados(self):
+        client = Client()
+        response = client.get('/app/async/turnos/', {'page_size': 2, 'medico': self.medico.pk},
+                              **self.auth)
+        self.assertEqual(response.status_code, 200)
+        filas, url = [], '/app/async/turnos/?page_size=2'
+        while url:
+            data = client.get(url, **self.auth).json()
+            filas += data['results']
+            url = data['next']
+        self.assertEqual(filas, self.client.get('/app/turnos/').json()['results'])
+
+    def test_agenda_medico(self):
+        Turno.objects.filter(fecha=aware(2025, 6, 2, 9)).update(estado='Cancelado')
+        response = Client().get(f'/app/async/medicos/{self.medico.pk}/agenda/',
+                                {'desde': '2025-06-02', 'hasta': '2025-06-08'}, **self.auth)
+        self.assertEqual(len(response.json()), 4)
+        response = Client().get('/app/async/medicos/999/agenda/', **self.auth)
+        self.assertEqual(response.status_code, 404)
+
+    def test_parametros_invalidos_dan_400(self):
+        cursor = base64.urlsafe_b64encode(b'xx|1').decode()
+        casos = [
+            ('/app/async/turnos/', {'fecha__gte': '2025-02-30'}),
+            ('/app/async/turnos/', {'fecha__gte': '2025-02-30T10:00:00'}),
+            ('/app/async/turnos/', {'fecha__lt': 'ayer'}),
+            ('/app/async/turnos/', {'cursor': cursor}),
+            (f'/app/async/medicos/{self.medico.pk}/agenda/', {'desde': '2025-02-30'}),
+            (f'/app/async/medicos/{self.medico.pk}/agenda/', {'hasta': '2025-13-01'}),
+            (f'/app/async/medicos/{self.medico.pk}/agenda/', {'desde': 'lunes'}),
+            (f'/app/async/medicos/{self.medico.pk}/agenda/', {'hasta': '02/06/2025'}),
+        ]
+        for url, params in casos:
+            with self.subTest(params=params):
+                self.assertEqual(Client().get(url, params, **self.auth).status_code, 400)
+
+    def test_paciente_por_id_y_dni(self):
+        esperado = self.client.get(f'/app/pacientes/{self.paciente.pk}/').json()
+        por_id = Client().get(f'/app/async/pacientes/{self.paciente.pk}/', **self.auth)
+        por_dni = Client().get('/app/async/pacientes/', {'dni': '30111222'}, **self.auth)
+        self.assertEqual(por_id.json(), esperado)
+        self.assertEqual(por_dni.json(), esperado)
+        self.assertEqual(
+            Client().get('/app/async/pacientes/', {'dni': '0'}, **self.auth).status_code, 404
+        )
+
+
+# ---
+
+class RecordatoriosTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.paciente.mail = 'juan@x.com'
+        self.paciente.save()
+        self.ahora = aware(2025, 6, 1, 12)
+
+    def crear(self, dia, hora, paciente=None, **extra):
+        extra.setdefault('recordatorio', '24h')
+        return Turno.objects.create(paciente=paciente or self.paciente, medico=self.medico,
+                                    fecha=aware(2025, 6, dia, hora), duracion=30, **extra)
+
+    def test_anticipacion(self):
+        self.assertEqual(anticipacion('24h'), timedelta(hours=24))
+        self.assertEqual(anticipacion('30m'), timedelta(minutes=30))
+        self.assertEqual(anticipacion(' 2D '), timedelta(days=2))
+        self.assertEqual(anticipacion('3'), timedelta(hours=3))
+        for invalido in ('', None, 'no', '0h', '-1h'):
+            self.assertIsNone(anticipacion(invalido))
+
+    def test_programa_y_reprograma_al_mover(self):
+        turno = self.crear(2, 9)
+        self.assertEqual(turno.recordatorio_programado, aware(2025, 6, 1, 9))
+        Turno.objects.filter(pk=turno.pk).update(recordatorio_enviado=self.ahora)
+        turno = Turno.objects.get(pk=turno.pk)
+        turno.motivo_consulta = 'Control'
+        turno.save()
+        self.assertIsNotNone(turno.recordatorio_enviado)
+        turno.fecha = aware(2025, 6, 3, 9)
+        turno.save()
+        self.assertIsNone(turno.recordatorio_enviado)
+        self.assertEqual(turno.recordatorio_programado, aware(2025, 6, 2, 9))
+
+    def test_envia_solo_los_vencidos_una_vez(self):
+        vencido = self.crear(2, 9)
+        self.crear(3, 9)                                    # todavía no corresponde
+        self.crear(2, 10, estado='Cancelado')
+        self.crear(2, 11, recordatorio='no')
+        sin_mail = Paciente.objects.create(dni='1', nombre='Sin', apellido='Mail')
+        self.crear(2, 12, paciente=sin_mail)
+
+        self.assertEqual(despachar(ahora=self.ahora), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['juan@x.com'])
+        vencido.refresh_from_db()
+        self.assertEqual(vencido.recordatorio_enviado, self.ahora)
+
+        self.assertEqual(despachar(ahora=self.ahora), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_cancelados_salen_de_los_pendientes(self):
+        turno = self.crear(2, 9)
+        turno.estado = 'Cancelado'
+        turno.save()
+        self.assertIsNone(turno.recordatorio_programado)
+        turno.estado = 'Confirmado'
+        turno.save()
+        self.assertEqual(turno.recordatorio_programado, aware(2025, 6, 1, 9))
+        self.client.patch('/app/turnos/bulk/', [{'id': turno.pk, 'estado': 'Cancelado'}],
+                          format='json')
+        turno.refresh_from_db()
+        self.assertIsNone(turno.recordatorio_programado)
+
+    def test_lee_un_rango_acotado_del_indice_parcial(self):
+        plan = pendientes(self.ahora).explain()
+        self.assertIn('turno_recordatorio_pend_idx (recordatorio_programado>? AND '
+                      'recordatorio_programado<?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_envia_fuera_de_la_transaccion_y_desmarca_si_falla(self):
+        turno = self.crear(2, 9)
+        savepoints = len(connection.savepoint_ids)
+        durante = []
+
+        def fallar(mensajes):
+            durante.append(len(connection.savepoint_ids))
+            raise OSError('SMTP caído')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=fallar), self.assertRaises(OSError):
+            despachar(ahora=self.ahora)
+        self.assertEqual(durante, [savepoints])
+        turno.refresh_from_db()
+        self.assertIsNone(turno.recordatorio_enviado)
+        self.assertEqual(despachar(ahora=self.ahora), 1)
+
+    def test_lotes_con_una_conexion_y_queries_constantes(self):
+        for h in range(6):
+            self.crear(2, 6 + h)
+        with mock.patch('app.recordatorios.get_connection', wraps=mail.get_connection) as conexion:
+            # Por lote: SELECT de pendientes + UPDATE + registro de cambios
+            # (app.sync) entre SAVEPOINT/RELEASE, sin N+1; la última pasada
+            # vuelve vacía.
+            enviados = self.assertMaxQueries(3 * 5 + 3, lambda: despachar(ahora=self.ahora, lote=2))
+        self.assertEqual(enviados, 6)
+        self.assertEqual(conexion.call_count, 1)
+        self.assertEqual(len(mail.outbox), 6)
+
+    def test_bulk_programa_recordatorios(self):
+        response = self.client.post('/app/turnos/bulk/', [{
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha': '2025-06-02T09:00:00Z', 'duracion': 30, 'recordatorio': '2h',
+        }], format='json')
+        self.assertEqual(response.status_code, 201)
+        turno = Turno.objects.get()
+        self.assertEqual(turno.recordatorio_programado, aware(2025, 6, 2, 7))
+        self.client.patch('/app/turnos/bulk/', [{'id': turno.pk, 'recordatorio': '1d'}],
+                          format='json')
+        turno.refresh_from_db()
+        self.assertEqual(turno.recordatorio_programado, aware(2025, 6, 1, 9))
+
+
+# ---
+
+class PacienteSearchTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Paciente.objects.create(dni='30999000', nombre='María José', apellido='Pérez Núñez')
+        Paciente.objects.create(dni='40111222', nombre='Pedro', apellido='Gómez')
+        Paciente.objects.create(dni='30111333', nombre='Ana', apellido='Juárez')
+
+    def buscar(self, q, **extra):
+        response = self.client.get('/app/pacientes/search/', {'q': q, **extra})
+        self.assertEqual(response.status_code, 200)
+        return [p['dni'] for p in response.json()]
+
+    def test_normalizar(self):
+        self.assertEqual(normalizar(' Núñez Ç '), 'nunez c')
+        self.assertEqual(normalizar(None), '')
+
+    def test_busca_por_prefijo_de_dni(self):
+        self.assertEqual(self.buscar('30111'), ['30111222', '30111333'])
+        self.assertEqual(self.buscar('5'), [])
+
+    def test_busca_sin_acentos_ni_mayusculas(self):
+        self.assertEqual(self.buscar('PEREZ'), ['30999000'])
+        self.assertEqual(self.buscar('gom'), ['30111222', '40111222'])
+        self.assertEqual(self.buscar('juan gómez'), ['30111222'])
+        self.assertEqual(self.buscar('gomez, juan'), ['30111222'])
+        self.assertEqual(self.buscar('maria jose'), ['30999000'])
+        self.assertEqual(self.buscar(''), [])
+
+    def test_limite(self):
+        self.assertEqual(len(self.buscar('gom', limite=1)), 1)
+        response = self.client.get('/app/pacientes/search/', {'q': 'x', 'limite': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_mantiene_normalizado_al_editar(self):
+        self.client.patch(f'/app/pacientes/{self.paciente.pk}/', {'apellido': 'Álvarez'},
+                          format='json')
+        self.assertEqual(self.buscar('alv'), ['30111222'])
+        self.assertNotIn('apellido_normalizado', self.client.get('/app/pacientes/').json()['results'][0])
+
+    def test_usa_indices_y_no_like(self):
+        for q, indice in (('30111', 'dni'), ('gomez', 'paciente_apellido_norm_idx'),
+                          ('juan gomez', 'paciente_nombre_norm_idx')):
+            with self.subTest(q=q):
+                queryset = Paciente.objects.filter(filtro(q))
+                self.assertNotIn('LIKE', str(queryset.query))
+                plan = queryset.explain()
+                self.assertIn(indice, plan)
+                self.assertNotIn('SCAN app_paciente', plan)
+
+    def test_admin_usa_la_misma_busqueda(self):
+        get_user_model().objects.create_superuser('admin', password='x')
+        client = Client()
+        client.login(username='admin', password='x')
+        response = client.get('/admin/app/paciente/', {'q': 'perez'})
+        self.assertEqual([p.dni for p in response.context['cl'].result_list], ['30999000'])
+
+
+# ---
+
+class BusquedaTextoTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.otro_medico = Medico.objects.create(
+            nombre='Luis', apellido='Díaz', especialidad=self.especialidad, mail='l@x.com'
+        )
+        self.otro_paciente = Paciente.objects.create(dni='1', nombre='Pedro', apellido='Ruiz')
+        turnos = [
+            Turno.objects.create(paciente=paciente, medico=medico, fecha=aware(2025, 6, 2, 9 + i),
+                                 duracion=30, recordatorio='24h')
+            for i, (paciente, medico) in enumerate([
+                (self.paciente, self.medico), (self.paciente, self.otro_medico),
+                (self.otro_paciente, self.medico),
+            ])
+        ]
+        self.historiales = [
+            HistorialClinico.objects.create(turno=turnos[0], paciente=self.paciente,
+                                            descripcion='Cefalea tensional. Dolor de cabeza leve.'),
+            HistorialClinico.objects.create(turno=turnos[1], paciente=self.paciente,
+                                            descripcion='Control de presión arterial.'),
+            HistorialClinico.objects.create(turno=turnos[2], paciente=self.otro_paciente,
+                                            descripcion='Dolor lumbar, dolor al caminar.'),
+        ]
+        self.receta = Receta.objects.create(medico=self.medico, paciente=self.paciente,
+                                            descripcion='Ibuprofeno 400 mg si hay dolor.')
+
+    def buscar(self, **params):
+        response = self.client.get('/app/busqueda/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(r['tipo'], r['id']) for r in response.json()]
+
+    def test_busca_por_prefijo_sin_acentos_y_ordena_por_relevancia(self):
+        resultados = self.buscar(q='dolor')
+        self.assertEqual(len(resultados), 3)
+        # "dolor" aparece dos veces en un texto corto: es el más relevante.
+        self.assertEqual(resultados[0], ('historial', self.historiales[2].pk))
+        self.assertEqual(self.buscar(q='presion art'), [('historial', self.historiales[1].pk)])
+        # La sintaxis de FTS5 del usuario se ignora en vez de romper la query.
+        self.assertEqual(self.buscar(q='"cabeza* (NEAR'), [])
+        self.assertEqual(self.buscar(q='"cabeza*'), [('historial', self.historiales[0].pk)])
+
+    def test_filtra_por_paciente_medico_y_tipo(self):
+        self.assertEqual(
+            sorted(self.buscar(q='dolor', paciente=self.paciente.pk)),
+            [('historial', self.historiales[0].pk), ('receta', self.receta.pk)],
+        )
+        self.assertEqual(self.buscar(q='dolor', medico=self.otro_medico.pk), [])
+        self.assertEqual(self.buscar(q='dolor', tipo='receta'), [('receta', self.receta.pk)])
+        self.assertEqual(self.client.get('/app/busqueda/').status_code, 400)
+
+    def test_se_mantiene_al_editar_y_borrar(self):
+        self.receta.descripcion = 'Paracetamol 1 g'
+        self.receta.save()
+        self.assertEqual(self.buscar(q='ibuprofeno'), [])
+        self.assertEqual(self.buscar(q='paracetamol'), [('receta', self.receta.pk)])
+        self.historiales[2].delete()
+        self.assertEqual(len(self.buscar(q='dolor')), 1)
+
+    def test_reindexar_y_una_query_por_tipo(self):
+        # Un UPDATE masivo no dispara señales; el comando reconstruye el índice.
+        Receta.objects.update(descripcion='Amoxicilina 500 mg')
+        self.assertEqual(self.buscar(q='amoxicilina'), [])
+        self.assertEqual(fts.reindexar(), {'historial': 3, 'receta': 1})
+        self.assertEqual(self.buscar(q='amoxicilina'), [('receta', self.receta.pk)])
+        self.assertMaxQueries(2, lambda: fts.buscar('dolor'))
+
+    def test_admin_busca_en_el_indice(self):
+        get_user_model().objects.create_superuser('admin', password='x')
+        client = Client()
+        client.login(username='admin', password='x')
+        response = client.get('/admin/app/historialclinico/', {'q': 'cefalea'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.historiales[0]])
+
+    def test_admin_busca_tambien_en_las_relaciones(self):
+        get_user_model().objects.create_superuser('admin', password='x')
+        client = Client()
+        client.login(username='admin', password='x')
+
+        def resultados(url, q):
+            return list(client.get(url, {'q': q}).context['cl'].result_list)
+
+        historiales = '/admin/app/historialclinico/'
+        self.assertEqual(resultados(historiales, 'Pedro'), [self.historiales[2]])
+        self.assertEqual(resultados(historiales, 'pedro lumbar'), [self.historiales[2]])
+        self.assertEqual(resultados(historiales, 'Pedro cefalea'), [])
+        recetas = '/admin/app/receta/'
+        self.assertEqual(resultados(recetas, 'Ana ibuprofeno'), [self.receta])
+        self.assertEqual(resultados(recetas, 'Luis'), [])
+
+    def test_admin_lee_las_recetas_por_indice(self):
+        admin = RecetaAdmin(Receta, AdminSite())
+        queryset, _ = admin.get_search_results(None, Receta.objects.all(), 'Pedro lumbar')
+        # El índice FTS (app_receta_fts) sí se recorre; la tabla, nunca.
+        self.assertNotRegex(queryset.explain(), r'SCAN app_receta\b')
+
+    def test_fecha_con_el_formato_de_la_api(self):
+        resultado, = self.client.get('/app/busqueda/', {'q': 'cefalea'}).json()
+        self.assertEqual(resultado['fecha'], '2025-06-02T09:00:00Z')
+
+
+# ---
+
+class AdminChangelistTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        get_user_model().objects.create_superuser('admin', password='x')
+        self.admin = Client()
+        self.admin.login(username='admin', password='x')
+        pacientes = Paciente.objects.bulk_create([
+            Paciente(dni=str(i), nombre=f'P{i}', apellido='Test') for i in range(30)
+        ])
+        for i, paciente in enumerate(pacientes):
+            turno = Turno.objects.create(paciente=paciente, medico=self.medico,
+                                         fecha=aware(2025, 6, 2 + i // 8, 9 + i % 8),
+                                         duracion=30, recordatorio='24h')
+            HistorialClinico.objects.create(turno=turno, paciente=paciente, descripcion='Control')
+            Receta.objects.create(medico=self.medico, paciente=paciente, descripcion='Reposo')
+
+    def test_queries_por_pagina_acotadas(self):
+        # Sesión + usuario + COUNT acotado + página (+ el filtro elegido); nada por fila.
+        for url in ('/admin/app/turno/', '/admin/app/receta/', '/admin/app/historialclinico/',
+                    '/admin/app/paciente/'):
+            with self.subTest(url=url):
+                response = self.assertMaxQueries(5, lambda: self.admin.get(url))
+                self.assertEqual(response.status_code, 200)
+        url = f'/admin/app/turno/?paciente__id__exact={self.paciente.pk}&estado__exact=Pendiente'
+        response = self.assertMaxQueries(6, lambda: self.admin.get(url))
+        self.assertContains(response, 'Juan Gómez')
+
+    def test_filtro_no_lista_toda_la_tabla(self):
+        response = self.admin.get('/admin/app/historialclinico/')
+        barra = response.content.decode().split('id="changelist-filter"')[1]
+        self.assertNotIn('P17 Test', barra)
+        self.assertIn('name="paciente__id__exact"', barra)
+
+    def test_paginador_no_cuenta_mas_del_limite(self):
+        with mock.patch.object(EstimatedCountPaginator, 'limite_exacto', 10):
+            paginador = EstimatedCountPaginator(Turno.objects.order_by('pk'), 5)
+            self.assertEqual(paginador.count, 11)
+            paginador = EstimatedCountPaginator(Turno.objects.filter(pk__lte=4).order_by('pk'), 5)
+            self.assertEqual(paginador.count, 4)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with mock.patch.object(EstimatedCountPaginator, 'limite_exacto', 10):
+            self.assertEqual(EstimatedCountPaginator(Turno.objects.order_by('pk'), 5).count, 30)
+
+
+# ---
+
+class ResumenAsistenciaTests(APITestMixin, TestCase):
+
+    def resumen(self):
+        return {
+            (r.medico_id, r.dia.isoformat(), r.estado): r.cantidad
+            for r in ResumenAsistencia.objects.filter(cantidad__gt=0)
+        }
+
+    def crear(self, dia, hora, **extra):
+        response = self.client.post('/app/turnos/', {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha': f'2025-06-{dia:02d}T{hora:02d}:00:00Z', 'duracion': 30,
+            'recordatorio': '24h', **extra,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def assertIgualAReconstruido(self):
+        incremental = self.resumen()
+        asistencia.reconstruir()
+        self.assertEqual(incremental, self.resumen())
+
+    def test_altas_cambios_y_bajas(self):
+        m = self.medico.pk
+        primero = self.crear(2, 9)
+        self.crear(2, 10)
+        self.assertEqual(self.resumen(), {(m, '2025-06-02', 'Pendiente'): 2})
+
+        self.client.patch(f'/app/turnos/{primero}/', {'estado': 'Completado'}, format='json')
+        self.client.patch(f'/app/turnos/{primero}/', {'motivo_consulta': 'x'}, format='json')
+        self.assertEqual(self.resumen(), {
+            (m, '2025-06-02', 'Pendiente'): 1, (m, '2025-06-02', 'Completado'): 1,
+        })
+        self.client.patch(f'/app/turnos/{primero}/', {'fecha': '2025-06-03T09:00:00Z'},
+                          format='json')
+        self.assertEqual(self.resumen(), {
+            (m, '2025-06-02', 'Pendiente'): 1, (m, '2025-06-03', 'Completado'): 1,
+        })
+        self.client.delete(f'/app/turnos/{primero}/')
+        self.assertEqual(self.resumen(), {(m, '2025-06-02', 'Pendiente'): 1})
+        self.assertIgualAReconstruido()
+
+    def test_lotes(self):
+        response = self.client.post('/app/turnos/bulk/', [
+            {'paciente': self.paciente.pk, 'medico': self.medico.pk,
+             'fecha': f'2025-06-02T{9 + i:02d}:00:00Z', 'duracion': 30, 'recordatorio': '24h'}
+            for i in range(3)
+        ], format='json')
+        ids = [t['id'] for t in response.json()]
+        self.client.patch('/app/turnos/bulk/', [
+            {'id': ids[0], 'estado': 'Cancelado'}, {'id': ids[1], 'motivo_consulta': 'x'},
+        ], format='json')
+        self.assertEqual(self.resumen(), {
+            (self.medico.pk, '2025-06-02', 'Pendiente'): 2,
+            (self.medico.pk, '2025-06-02', 'Cancelado'): 1,
+        })
+        self.assertIgualAReconstruido()
+
+    def test_reporte_lee_solo_el_resumen(self):
+        primero = self.crear(2, 9)
+        self.crear(2, 10, estado='Cancelado')
+        self.crear(3, 9, estado='Completado')
+        self.client.patch(f'/app/turnos/{primero}/', {'estado': 'Completado'}, format='json')
+        self.crear(20, 9)                               # fuera del rango
+
+        reporte = self.assertMaxQueries(
+            2, lambda: asistencia.reporte(date(2025, 6, 1), date(2025, 6, 7))
+        )
+        response = self.client.get('/app/reportes/asistencia/',
+                                   {'desde': '2025-06-01', 'hasta': '2025-06-07'})
+        self.assertEqual(response.status_code, 200)
+        fila, = response.json()['resultados']
+        self.assertEqual(fila['nombre'], 'Ana Pérez')
+        self.assertEqual(fila['total'], 3)
+        self.assertEqual(fila['por_estado'],
+                         {'Pendiente': 0, 'Confirmado': 0, 'Cancelado': 1, 'Completado': 2})
+        self.assertEqual(fila['asistencia'], round(2 / 3, 4))
+        self.assertEqual([d['dia'] for d in fila['por_dia']], ['2025-06-02', '2025-06-03'])
+        self.assertEqual(len(reporte), 1)
+        self.assertEqual(
+            self.client.get('/app/reportes/asistencia/', {'desde': '2025-06-07',
+                                                          'hasta': '2025-06-01'}).status_code,
+            400,
+        )
+
+    def test_vista_admin(self):
+        self.crear(2, 9)
+        get_user_model().objects.create_superuser('admin', password='x')
+        client = Client()
+        client.login(username='admin', password='x')
+        response = client.get(reverse('admin:reporte-asistencia'),
+                              {'desde': '2025-06-01', 'hasta': '2025-06-30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ana Pérez')
+
+    def test_vista_admin_fechas_por_defecto_en_iso(self):
+        get_user_model().objects.create_superuser('admin', password='x')
+        client = Client()
+        client.login(username='admin', password='x')
+        response = client.get(reverse('admin:reporte-asistencia'))
+        hoy = timezone.localdate()
+        self.assertContains(response, f'name="hasta" value="{hoy.isoformat()}"')
+        self.assertContains(
+            response, f'name="desde" value="{(hoy - timedelta(days=30)).isoformat()}"'
+        )
+
+
+# ---
+
+class PacienteTimelineTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.turnos = []
+        for i in range(6):
+            turno = Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                                         fecha=aware(2025, 6, 2 + i, 9), duracion=30,
+                                         recordatorio='24h')
+            self.turnos.append(turno)
+            if i % 2 == 0:
+                HistorialClinico.objects.create(turno=turno, paciente=self.paciente,
+                                                descripcion=f'Nota {i}')
+            for j in range(i % 3):
+                Receta.objects.create(medico=self.medico, paciente=self.paciente, turno=turno,
+                                      descripcion=f'Receta {i}.{j}')
+        otro = Paciente.objects.create(dni='2', nombre='Otro', apellido='Paciente')
+        Turno.objects.create(paciente=otro, medico=self.medico, fecha=aware(2025, 6, 2, 10),
+                             duracion=30, recordatorio='24h')
+
+    def test_turnos_con_historial_y_recetas_paginados(self):
+        url = f'/app/pacientes/{self.paciente.pk}/timeline/?page_size=4'
+        # paciente + turnos (JOIN médico e historial) + recetas, con cualquier historia.
+        data = self.assertMaxQueries(3, lambda: self.client.get(url)).json()
+        self.assertEqual([t['id'] for t in data['results']],
+                         [t.pk for t in reversed(self.turnos)][:4])
+        ultimo = data['results'][0]
+        self.assertEqual(ultimo['historial'], None)
+        self.assertEqual([r['descripcion'] for r in ultimo['recetas']], ['Receta 5.0', 'Receta 5.1'])
+        self.assertEqual(ultimo['recetas'][0]['medico_nombre'], 'Ana Pérez')
+        self.assertEqual(data['results'][1]['historial'], 'Nota 4')
+
+        # La última página de turnos además busca recetas sin turno.
+        siguiente = self.assertMaxQueries(4, lambda: self.client.get(data['next'])).json()
+        self.assertEqual([t['id'] for t in siguiente['results']], [self.turnos[1].pk, self.turnos[0].pk])
+        self.assertIsNone(siguiente['next'])
+
+    def test_recetas_sin_turno_al_final(self):
+        sueltas = [
+            Receta.objects.create(medico=self.medico, paciente=self.paciente,
+                                  descripcion=f'Previa {i}')
+            for i in range(3)
+        ]
+        otro = Paciente.objects.get(dni='2')
+        Receta.objects.create(medico=self.medico, paciente=otro, descripcion='De otro')
+        entradas, url = [], f'/app/pacientes/{self.paciente.pk}/timeline/?page_size=4'
+        while url:
+            data = self.assertMaxQueries(4, lambda: self.client.get(url)).json()
+            entradas += data['results']
+            url = data['next']
+        self.assertEqual(
+            [(e['tipo'], e['id']) for e in entradas],
+            [('turno', t.pk) for t in reversed(self.turnos)]
+            + [('receta', r.pk) for r in reversed(sueltas)],
+        )
+        self.assertEqual(entradas[-1]['descripcion'], 'Previa 0')
+        self.assertEqual(entradas[-1]['medico_nombre'], 'Ana Pérez')
+
+    def test_paciente_inexistente(self):
+        self.assertEqual(self.client.get('/app/pacientes/999/timeline/').status_code, 404)
+
+    def test_receta_no_acepta_turno_de_otro_paciente(self):
+        otro = Paciente.objects.get(dni='2')
+        response = self.client.post('/app/recetas/', {
+            'medico': self.medico.pk, 'paciente': otro.pk, 'turno': self.turnos[0].pk,
+            'descripcion': 'x',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('turno', response.json())
+
+
+# ---
+
+class AgendaSemanalTests(APITestMixin, TestCase):
+    URL = '/app/medicos/{}/agenda/'
+
+    def setUp(self):
+        super().setUp()
+        self.url = self.URL.format(self.medico.pk)
+        # Semana 2025-W23: lunes 2 a domingo 8 de junio.
+        self.turno = self.crear('2025-06-02T09:00:00Z').json()
+
+    def crear(self, fecha):
+        return self.client.post('/app/turnos/', {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk, 'fecha': fecha,
+            'duracion': 30, 'recordatorio': '24h',
+        }, format='json')
+
+    def agenda(self, semana='2025-W23', queries=None):
+        pedir = lambda: self.client.get(self.url, {'semana': semana})
+        response = pedir() if queries is None else self.assertMaxQueries(queries, pedir)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [t['id'] for t in response.json()['turnos']]
+
+    def test_sirve_desde_cache_y_acepta_fecha(self):
+        self.assertEqual(self.agenda(), [self.turno['id']])
+        self.assertEqual(self.agenda(queries=0), [self.turno['id']])
+        self.assertEqual(self.agenda('2025-06-08', queries=0), [self.turno['id']])
+        data = self.client.get(self.url, {'semana': '2025w23'}).json()
+        self.assertEqual((data['desde'], data['hasta']), ('2025-06-02', '2025-06-08'))
+        fila = data['turnos'][0]
+        self.assertEqual(fila, self.client.get(f"/app/turnos/{self.turno['id']}/").json())
+
+    def test_solo_invalida_las_semanas_afectadas(self):
+        self.agenda()
+        self.agenda('2025-W24')
+        self.crear('2025-06-10T09:00:00Z')                  # semana 24
+        self.agenda(queries=0)
+        self.assertEqual(len(self.agenda('2025-W24')), 1)
+        nuevo = self.crear('2025-06-03T09:00:00Z').json()   # semana 23
+        self.assertEqual(self.agenda(), [self.turno['id'], nuevo['id']])
+
+    def test_mover_invalida_semana_vieja_y_nueva(self):
+        self.agenda()
+        self.agenda('2025-W24')
+        self.client.patch(f"/app/turnos/{self.turno['id']}/", {'fecha': '2025-06-11T09:00:00Z'},
+                          format='json')
+        self.assertEqual(self.agenda(), [])
+        self.assertEqual(self.agenda('2025-W24'), [self.turno['id']])
+        self.client.patch('/app/turnos/bulk/', [{'id': self.turno['id'], 'estado': 'Cancelado'}],
+                          format='json')
+        self.assertEqual(self.agenda('2025-W24'), [])
+
+    def test_cambio_de_nombre_del_paciente(self):
+        self.agenda()
+        self.paciente.nombre = 'Juana'
+        self.paciente.save()
+        data = self.client.get(self.url, {'semana': '2025-W23'}).json()
+        self.assertTrue(data['turnos'][0]['paciente_nombre_completo'].startswith('Juana'))
+
+    def test_otros_pacientes_y_medicos_no_invalidan(self):
+        otro_medico = Medico.objects.create(nombre='Luis', apellido='Díaz',
+                                            especialidad=self.especialidad, mail='l@x.com')
+        otro_paciente = Paciente.objects.create(dni='2', nombre='Pedro', apellido='Ruiz')
+        Turno.objects.create(paciente=otro_paciente, medico=otro_medico,
+                             fecha=aware(2025, 6, 2, 9), duracion=30, recordatorio='24h')
+        self.agenda()
+        otro_paciente.nombre = 'Pablo'
+        otro_paciente.save()
+        otro_medico.nombre = 'Lucas'
+        otro_medico.save()
+        self.agenda(queries=0)
+
+    def test_cambio_de_nombre_del_medico(self):
+        self.agenda()
+        self.medico.nombre = 'Anabel'
+        self.medico.save()
+        data = self.client.get(self.url, {'semana': '2025-W23'}).json()
+        self.assertEqual(data['turnos'][0]['medico_nombre_completo'], 'Anabel Pérez')
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self.url, {'semana': '2025-W54'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'semana': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.URL.format(999)).status_code, 404)
+
+
+# ---
+
+class MetricasTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directorio = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(METRICS_DIR=directorio, METRICS_TOKEN='secreto'))
+        metrics.registro.reiniciar()
+        self.addCleanup(metrics.registro.reiniciar)
+
+    def exposicion(self):
+        return Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+
+    def test_server_timing_cuenta_queries(self):
+        response = self.client.get('/app/turnos/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/app/turnos/')
+        self.assertRegex(response['Server-Timing'],
+                         rf'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="{len(ctx)} queries"$')
+
+    def test_exposicion_prometheus(self):
+        for _ in range(3):
+            self.client.get('/app/turnos/')
+        self.client.get('/app/pacientes/999/')
+        texto = self.exposicion()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', texto)
+        self.assertIn(
+            'http_request_duration_seconds_count{vista="app:turno-list",metodo="GET",codigo="2xx"} 3',
+            texto,
+        )
+        self.assertIn(
+            'http_request_sql_queries_bucket{vista="app:paciente-detail",metodo="GET",'
+            'codigo="4xx",le="+Inf"} 1', texto,
+        )
+
+    def test_suma_los_archivos_de_otros_workers(self):
+        self.client.get('/app/turnos/')
+        metrics.registro.volcar()
+        archivo = next(Path(settings.METRICS_DIR).glob('metricas-*.json'))
+        # Otro proceso con la misma serie.
+        archivo.rename(archivo.with_name('metricas-1.json'))
+        texto = self.exposicion()
+        self.assertIn(
+            'http_request_sql_queries_count{vista="app:turno-list",metodo="GET",codigo="2xx"} 2',
+            texto,
+        )
+
+    def test_token(self):
+        self.assertEqual(Client().get('/metrics').status_code, 403)
+        response = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer otro')
+        self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(Client().get('/metrics').status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(Client().get('/metrics').status_code, 200)
+
+    def test_metodos_desconocidos_comparten_serie(self):
+        for metodo in ('FOO', 'BAR'):
+            self.client.generic(metodo, '/app/turnos/')
+        texto = self.exposicion()
+        self.assertIn(
+            'http_request_duration_seconds_count{vista="app:turno-list",metodo="OTRO",codigo="4xx"} 2',
+            texto,
+        )
+        self.assertNotIn('FOO', texto)
+
+
+# ---
+
+class SyncTests(APITestMixin, TestCase):
+    """Feed de cambios /app/sync/ (ver app.sync)."""
+
+    def sincronizar(self, cursor, **params):
+        return self.client.get('/app/sync/', {'since': cursor, **params}).json()
+
+    def test_primer_sync_trae_todo(self):
+        data = self.sincronizar(0)
+        self.assertFalse(data['hay_mas'])
+        self.assertEqual([e['nombre'] for e in data['cambios']['especialidades']], ['Clínica'])
+        self.assertEqual(data['cambios']['medicos'][0]['especialidad'], self.especialidad.pk)
+        # Sin nombres de otros objetos: no se actualizarían al renombrarlos.
+        self.assertNotIn('especialidad_nombre', data['cambios']['medicos'][0])
+        self.assertEqual(data['cambios']['pacientes'][0]['dni'], '30111222')
+        self.assertEqual(data['cambios']['turnos'], [])
+        # Sin cambios nuevos, el cursor no se mueve.
+        self.assertEqual(self.sincronizar(data['cursor'])['cursor'], data['cursor'])
+
+    def test_solo_cambios_posteriores_al_cursor(self):
+        cursor = self.sincronizar(0)['cursor']
+        creados = self.client.post('/app/turnos/bulk/', [{
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha': f'2025-06-02T{h}:00:00Z', 'duracion': 30, 'recordatorio': '24h',
+        } for h in (9, 10)], format='json').json()
+        self.client.patch(f'/app/pacientes/{self.paciente.pk}/', {'mail': 'juan@x.com'},
+                          format='json')
+        self.client.delete(f"/app/turnos/{creados[0]['id']}/")
+        nueva = self.client.post('/app/especialidades/', {'nombre': 'Pediatría'}, format='json')
+
+        # Cambio + una query por recurso con cambios.
+        with self.assertNumQueries(4):
+            data = self.sincronizar(cursor)
+        self.assertEqual([t['id'] for t in data['cambios']['turnos']], [creados[1]['id']])
+        esperado = self.client.get(f"/app/turnos/{creados[1]['id']}/").json()
+        del esperado['paciente_nombre_completo'], esperado['medico_nombre_completo']
+        self.assertEqual(data['cambios']['turnos'][0], esperado)
+        self.assertEqual(data['eliminados']['turnos'], [creados[0]['id']])
+        self.assertEqual(data['cambios']['pacientes'][0]['mail'], 'juan@x.com')
+        self.assertEqual([e['id'] for e in data['cambios']['especialidades']], [nueva.json()['id']])
+        self.assertEqual(data['cambios']['medicos'], [])
+
+    def test_paginas_y_cursor_monotono(self):
+        Paciente.objects.bulk_create([Paciente(dni=str(i)) for i in range(5)])
+        sync.registrar(Paciente, Paciente.objects.filter(dni__in=map(str, range(5)))
+                       .values_list('pk', flat=True))
+        cursor, vistos, cursores, guardado = 0, [], [], False
+        while True:
+            data = self.sincronizar(cursor, limite=2)
+            vistos += [p['id'] for p in data['cambios']['pacientes']]
+            cursores.append(data['cursor'])
+            # Un objeto ya entregado que cambia vuelve a aparecer más adelante.
+            if self.paciente.pk in vistos and not guardado:
+                self.paciente.save()
+                guardado = True
+            cursor = data['cursor']
+            if not data['hay_mas']:
+                break
+        self.assertEqual(cursores, sorted(set(cursores)))
+        self.assertEqual(vistos.count(self.paciente.pk), 2)
+        self.assertEqual(set(vistos), set(Paciente.objects.values_list('pk', flat=True)))
+
+    def test_recordatorios_enviados(self):
+        self.paciente.mail = 'juan@x.com'
+        self.paciente.save()
+        turno = Turno.objects.create(paciente=self.paciente, medico=self.medico,
+                                     fecha=timezone.now() + timedelta(hours=1), duracion=30,
+                                     recordatorio='24h')
+        cursor = self.sincronizar(0)['cursor']
+        self.assertEqual(despachar(), 1)
+        data = self.sincronizar(cursor)
+        self.assertEqual([t['id'] for t in data['cambios']['turnos']], [turno.pk])
+        self.assertIsNotNone(data['cambios']['turnos'][0]['recordatorio_enviado'])
+
+    def test_motor_sin_cursor_monotono(self):
+        self.assertEqual(sync.revisar_motor(None), [])
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            error, = sync.revisar_motor(None)
+        self.assertEqual(error.id, 'app.E001')
+
+    def test_si_falla_el_registro_no_se_guarda(self):
+        with mock.patch('app.sync.registrar', side_effect=OperationalError('disco lleno')), \
+                self.assertRaises(OperationalError):
+            Paciente.objects.create(dni='99999999', nombre='Rita')
+        self.assertFalse(Paciente.objects.filter(dni='99999999').exists())
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get('/app/sync/', {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/app/sync/', {'since': -1}).status_code, 400)
+
+
+class SeedClinicTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(CACHES=CACHES_TESTS))
+        cache.clear()
+        self.creados = seed.generar(
+            turnos=600, medicos=4, pacientes=50, especialidades=2, dias_atras=60, lote=200,
+        )
+
+    def test_datos_y_derivados_consistentes(self):
+        self.assertEqual(self.creados['turnos'], Turno.objects.count())
+        self.assertEqual(self.creados['historiales'], HistorialClinico.objects.count())
+        self.assertTrue(Receta.objects.filter(turno__isnull=False).exists())
+        # Una reserva por bloque de cada turno activo: ningún turno se solapa.
+        activos = Turno.objects.exclude(estado='Cancelado')
+        self.assertEqual(
+            ReservaSlot.objects.count(),
+            sum(len(list(bloques(t.fecha, t.duracion))) for t in activos),
+        )
+        self.assertEqual(
+            sum(ResumenAsistencia.objects.values_list('cantidad', flat=True)), 600,
+        )
+        self.assertFalse(Paciente.objects.filter(apellido_normalizado='').exists())
+        self.assertTrue(fts.buscar('diagnostico'))
+        # Todo lo sincronizable tiene su cambio registrado (app.sync).
+        self.assertEqual(Cambio.objects.filter(modelo='turno').count(), 600)
+        self.assertEqual(Cambio.objects.count(), 600 + 50 + 4 + 2)
+        # Los recordatorios vencidos quedan como enviados.
+        self.assertFalse(Turno.objects.filter(
+            recordatorio_enviado__isnull=True, recordatorio_programado__lte=timezone.now(),
+        ).exists())
+
+    def test_bench_endpoints_recorre_todas_las_rutas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            destino = Path(directorio) / 'resultados.json'
+            # El comando usa HTTP_HOST=localhost, permitido sólo con DEBUG.
+            with override_settings(METRICS_DIR=directorio, ALLOWED_HOSTS=['localhost']):
+                call_command('bench_endpoints', repeticiones=1, presupuesto=0,
+                             guardar=str(destino), stdout=io.StringIO())
+            resultados = json.loads(destino.read_text())
+        self.assertEqual(set(resultados), {nombre for nombre, _ in rutas(urlpatterns)})
+        self.assertIn('paciente-timeline', resultados)
+        for nombre, resultado in resultados.items():
+            self.assertEqual(resultado['codigo'], 200, nombre)
+            self.assertIsNotNone(resultado['queries'], nombre)
+
+
+# ---
+
+class CachedJWTAuthenticationTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.jwt = Client(HTTP_AUTHORIZATION=f'Bearer {self._token()}')
+
+    def _token(self):
+        return str(RefreshToken.for_user(self.user).access_token)
+
+    def _queries_de_usuario(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.jwt.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if 'auth_user' in q['sql']]
+
+    def test_segundo_request_no_consulta_el_usuario(self):
+        url = f'/app/pacientes/{self.paciente.pk}/'
+        response, queries = self._queries_de_usuario(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        response, queries = self._queries_de_usuario(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_usuario_desactivado(self):
+        self.assertEqual(self.jwt.get('/app/especialidades/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.jwt.get('/app/especialidades/').status_code, 401)
+
+    def test_usuario_borrado(self):
+        self.assertEqual(self.jwt.get('/app/especialidades/').status_code, 200)
+        self.user.delete()
+        self.assertEqual(self.jwt.get('/app/especialidades/').status_code, 401)
+
+    def test_cambio_de_contraseña_con_check_revoke_token(self):
+        # override_settings(SIMPLE_JWT=...) no llega a los módulos que ya importaron
+        # api_settings de simplejwt; se parchea el objeto compartido.
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.jwt = Client(HTTP_AUTHORIZATION=f'Bearer {self._token()}')
+            self.assertEqual(self.jwt.get('/app/especialidades/').status_code, 200)
+            self.user.set_password('otra')
+            self.user.save()
+            response = self.jwt.get('/app/especialidades/')
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json()['code'], 'password_changed')
+            self.jwt = Client(HTTP_AUTHORIZATION=f'Bearer {self._token()}')
+            self.assertEqual(self.jwt.get('/app/especialidades/').status_code, 200)
+
+    def test_vistas_async_usan_la_misma_autenticacion(self):
+        self.assertEqual(self.jwt.get('/app/async/turnos/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.jwt.get('/app/async/turnos/').status_code, 401)
+
+
+# ---
+
+@skipUnless(connection.vendor == 'sqlite', "Perfil específico de SQLite.")
+class SQLitePerfilTests(TestCase):
+
+    def test_pragmas_en_cada_conexion(self):
+        with connection.cursor() as cursor:
+            for pragma, esperado in (('synchronous', 1), ('busy_timeout', 5000),
+                                     ('cache_size', -64000), ('temp_store', 2)):
+                cursor.execute(f'PRAGMA {pragma}')
+                self.assertEqual(cursor.fetchone()[0], esperado, pragma)
+
+    def test_transacciones_toman_el_lock_de_escritura_al_empezar(self):
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_wal_en_archivo(self):
+        # La base de tests está en memoria; se prueba el perfil sobre un archivo.
+        with tempfile.TemporaryDirectory() as directorio:
+            conexion = connections['default'].__class__({
+                **connection.settings_dict, 'NAME': str(Path(directorio) / 'perfil.sqlite3'),
+            }, alias='perfil')
+            try:
+                with conexion.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+            finally:
+                conexion.close()
+
+
+# ---
+
+class ReplicaRouterTests(APITestMixin, TransactionTestCase):
+    """'replica' espeja a la base de tests de 'default' (TEST MIRROR en tp.settings)."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(DATABASE_REPLICAS=['replica']))
+
+    def _queries(self, funcion):
+        """Ejecuta `funcion` y devuelve (resultado, queries en default, queries en replica)."""
+        with CaptureQueriesContext(connections['default']) as primario, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            resultado = funcion()
+        return resultado, len(primario), len(replica)
+
+    def _turno(self, **extra):
+        return {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk,
+            'fecha': aware(2031, 3, 3, 10, 0).isoformat(), 'duracion': 30,
+            'recordatorio': '24h', **extra,
+        }
+
+    def test_lecturas_van_a_la_replica(self):
+        response, primario, replica = self._queries(
+            lambda: self.client.get(f'/app/pacientes/{self.paciente.pk}/')
+        )
+        self.assertEqual(response.json()['dni'], '30111222')
+        self.assertEqual(primario, 0)
+        self.assertGreater(replica, 0)
+
+    def test_sql_crudo_y_vistas_async_leen_de_la_replica(self):
+        # Las vistas async autentican por su cuenta: JWT real (el usuario queda en caché).
+        token = RefreshToken.for_user(self.user).access_token
+        cliente = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        cliente.get('/app/async/turnos/')
+        for url in ('/app/especialidades/', '/app/async/turnos/',
+                    f'/app/async/medicos/{self.medico.pk}/agenda/'):
+            response, primario, replica = self._queries(lambda: cliente.get(url))
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(primario, 0, url)
+            self.assertGreater(replica, 0, url)
+
+    def test_escrituras_leen_y_escriben_en_el_primario(self):
+        response, primario, replica = self._queries(
+            lambda: self.client.post('/app/turnos/', self._turno(), format='json')
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(primario, 0)
+        self.assertEqual(replica, 0)
+        self.assertIn('leer_primario', response.cookies)
+
+    def test_despues_de_escribir_lee_del_primario(self):
+        self.client.post('/app/turnos/', self._turno(), format='json')
+        url = f'/app/turnos/?medico={self.medico.pk}'
+        response, primario, replica = self._queries(lambda: self.client.get(url))
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertGreater(primario, 0)
+        self.assertEqual(replica, 0)
+        # Vencida la cookie, vuelve a la réplica.
+        self.client.cookies.clear()
+        _, primario, replica = self._queries(lambda: self.client.get(url))
+        self.assertEqual(primario, 0)
+        self.assertGreater(replica, 0)
+
+    def test_escritura_fallida_no_pega_al_primario(self):
+        response = self.client.post('/app/turnos/', self._turno(duracion='x'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('leer_primario', response.cookies)
+
+    def test_admin_usa_el_primario(self):
+        admin = get_user_model().objects.create_superuser('admin', password='x')
+        cliente = Client()
+        cliente.force_login(admin)
+        response, _, replica = self._queries(lambda: cliente.get('/admin/app/paciente/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+    def test_fuera_de_un_request_lee_del_primario(self):
+        self.assertEqual(Paciente.objects.get(pk=self.paciente.pk)._state.db, 'default')
+
+    def _atrasar_replica(self):
+        """Congela 'replica' en una copia del primario: lo que se escriba después no le llega."""
+        copia = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'replica.sqlite3'
+        connections['default'].ensure_connection()
+        destino = sqlite3.connect(copia)
+        connections['default'].connection.backup(destino)
+        destino.close()
+        replica = connections['replica']
+        nombre = replica.settings_dict['NAME']
+        # Con el nombre en memoria close() no hace nada: se cambia antes.
+        replica.settings_dict['NAME'] = str(copia)
+        replica.close()
+
+        def restaurar():
+            replica.close()
+            replica.settings_dict['NAME'] = nombre
+        self.addCleanup(restaurar)
+
+    def test_la_cache_no_guarda_lecturas_atrasadas_de_la_replica(self):
+        lector = APIClient()
+        lector.force_authenticate(self.user)
+        url = f'/app/medicos/{self.medico.pk}/'
+        self._atrasar_replica()
+        self.assertEqual(self.client.patch(url, {'nombre': 'Anabel'}, format='json').status_code, 200)
+        # La réplica todavía no tiene el cambio: se responde, pero sin guardarlo
+        # ni dar un ETag que después valide esa copia.
+        atrasada = lector.get(url)
+        self.assertEqual(atrasada.json()['nombre'], 'Ana')
+        self.assertNotIn('ETag', atrasada)
+        # Quien escribió lee del primario y ve su cambio.
+        self.assertEqual(self.client.get(url).json()['nombre'], 'Anabel')
+
+    def test_la_agenda_no_guarda_lecturas_atrasadas_de_la_replica(self):
+        lector = APIClient()
+        lector.force_authenticate(self.user)
+        url = f'/app/medicos/{self.medico.pk}/agenda/?semana=2031-W10'
+        self.assertEqual(lector.get(url).json()['turnos'], [])
+        self._atrasar_replica()
+        turno = self.client.post('/app/turnos/', self._turno(), format='json').json()
+        self.assertEqual(lector.get(url).json()['turnos'], [])
+        self.assertEqual([t['id'] for t in self.client.get(url).json()['turnos']], [turno['id']])
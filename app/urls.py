@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     EspecialidadViewSet, MedicoViewSet, PacienteViewSet, RecetaViewSet,
-    DisponibilidadMedicoViewSet, TurnoViewSet, HistorialClinicoViewSet
+    DisponibilidadMedicoViewSet, TurnoViewSet, HistorialClinicoViewSet, BusquedaViewSet,
+    ReporteAsistenciaViewSet, SyncViewSet
 )
 
 app_name = "app"
@@ -15,8 +17,16 @@ router.register(r'turnos', TurnoViewSet)
 router.register(r'recetas', RecetaViewSet)
 router.register(r'disponibilidad', DisponibilidadMedicoViewSet)
 router.register(r'historiales', HistorialClinicoViewSet)
+router.register(r'busqueda', BusquedaViewSet, basename="busqueda")
+router.register(r'reportes/asistencia', ReporteAsistenciaViewSet, basename="reporte-asistencia")
+router.register(r'sync', SyncViewSet, basename="sync")
 
 urlpatterns = [
     path('', include(router.urls)),
 
+    # Lecturas asíncronas (servir con un servidor ASGI, ver README)
+    path('async/turnos/', async_views.turnos, name='async-turnos'),
+    path('async/medicos/<int:pk>/agenda/', async_views.agenda_medico, name='async-agenda-medico'),
+    path('async/pacientes/', async_views.paciente, name='async-paciente-dni'),
+    path('async/pacientes/<int:pk>/', async_views.paciente, name='async-paciente'),
 ]
@@ -1,180 +1,316 @@
+from django.db.models import Prefetch
+from django.http import Http404
+from django.utils import timezone
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from .models import (
     Especialidad, Medico, Paciente, Receta,
     DisponibilidadMedico, Turno, HistorialClinico
 )
 from .serializers import (
     EspecialidadSerializer, MedicoSerializer, PacienteSerializer, RecetaSerializer,
-    DisponibilidadMedicoSerializer, TurnoSerializer, HistorialClinicoSerializer
+    DisponibilidadMedicoSerializer, TurnoSerializer, HistorialClinicoSerializer,
+    SlotsQuerySerializer, BusquedaQuerySerializer, ReporteAsistenciaQuerySerializer,
+    AgendaQuerySerializer, SyncQuerySerializer,
+    TimelineRecetaSueltaSerializer, TimelineTurnoSerializer
+)
+from . import agenda, asistencia, fts, search, sync
+from .bulk import LoteInvalido, actualizar_turnos, crear_turnos
+from .cache import cache_lectura
+from .campos import CamposMixin
+from .export import ExportMixin
+from .fast import FastReadMixin
+from .pagination import (
+    KeysetPagination, TimelinePagination, TimelineRecetasPagination, TurnoPagination,
+)
+from .raw import RawSQLViewSet
+from .renderers import ORJSONRenderer
+from .reservas import TurnoSuperpuesto
+from .slots import (
+    MARGEN_TURNOS, expandir_ventanas, fusionar_intervalos, intervalos_ocupados, slots_libres
 )
-from django.db import connection
 from rest_framework.response import Response
 
-# ViewSet para Especialidad (CRUD completo)
-class EspecialidadViewSet(viewsets.ViewSet):
-    
-    # ----------------------------------------------------
-    # 1. LISTAR (GET /app/especialidades/)
-    # Comportamiento: Retorna lista de objetos con código 200 OK.
-    # ----------------------------------------------------
-    def list(self, request):
-        sql_query = "SELECT id, nombre FROM app_especialidad ORDER BY nombre ASC"
-        
-        # Usamos .raw() para obtener objetos Model a partir del SQL.
-        queryset = Especialidad.objects.raw(sql_query)
-        
-        serializer = EspecialidadSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+# ViewSet para Especialidad (CRUD completo en SQL puro, una query por operación)
+class EspecialidadViewSet(RawSQLViewSet):
+    model = Especialidad
+    serializer_class = EspecialidadSerializer
+    raw_fields = ('nombre',)
+    raw_ordering = 'nombre'
+    # Tablas de las que dependen las respuestas cacheadas (ver app.cache)
+    cache_models = (Especialidad,)
+
+# ---
+
+# ViewSet para Paciente (CRUD completo)
+class PacienteViewSet(CamposMixin, FastReadMixin, viewsets.ModelViewSet):
+    queryset = Paciente.objects.all()
+    serializer_class = PacienteSerializer
+    pagination_class = KeysetPagination
 
     # ----------------------------------------------------
-    # 2. CREAR (POST /app/especialidades/)
-    # Comportamiento: Retorna el objeto creado con código 201 Created.
+    # TIMELINE (GET /app/pacientes/{id}/timeline/?cursor=&page_size=)
+    # Turnos del paciente (más recientes primero) con su historial clínico y
+    # sus recetas. Tres queries por página sin importar el largo de la
+    # historia: paciente, turnos + médico + historial (JOIN) y recetas.
+    # Las recetas sin turno no tienen fecha: van después del último turno
+    # (?parte=recetas, con su propio cursor), las últimas emitidas primero.
     # ----------------------------------------------------
-    def create(self, request):
-        data = request.data
-        
-        # 1. Validar la data (como lo haría un ModelViewSet)
-        serializer = EspecialidadSerializer(data=data)
-        serializer.is_valid(raise_exception=True)
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        paciente = self.get_object()
+        context = self.get_serializer_context()
+        sueltas = Receta.objects.filter(paciente=paciente, turno__isnull=True)
+        if request.query_params.get('parte') == 'recetas':
+            paginador = TimelineRecetasPagination()
+            pagina = paginador.paginate_queryset(sueltas.select_related('medico'), request, view=self)
+            serializer = TimelineRecetaSueltaSerializer(pagina, many=True, context=context)
+            return paginador.get_paginated_response(serializer.data)
 
-        try:
-            with connection.cursor() as cursor:
-                # Query de INSERT con SQL puro. RETURNING id es clave.
-                cursor.execute(
-                    """
-                    INSERT INTO app_especialidad (nombre)
-                    VALUES (%s)
-                    RETURNING id
-                    """,
-                    [data['nombre']]
-                )
-                new_id = cursor.fetchone()[0]
-            
-            # Devolvemos la respuesta formateada con el nuevo ID y código 201
-            created_data = {'id': new_id, 'nombre': data['nombre']}
-            return Response(created_data, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
-            # Manejo de errores de la DB
-            return Response({'detail': f'Error SQL al crear: {e}'}, 
-                            status=status.HTTP_400_BAD_REQUEST)
+        turnos = (
+            Turno.objects.filter(paciente=paciente)
+            .select_related('medico', 'historialclinico')
+            .prefetch_related(Prefetch(
+                'recetas', queryset=Receta.objects.select_related('medico').order_by('id'),
+            ))
+        )
+        paginador = TimelinePagination()
+        pagina = paginador.paginate_queryset(turnos, request, view=self)
+        serializer = TimelineTurnoSerializer(pagina, many=True, context=context)
+        response = paginador.get_paginated_response(serializer.data)
+        if response.data['next'] is None and sueltas.exists():
+            url = remove_query_param(request.build_absolute_uri(), paginador.cursor_query_param)
+            response.data['next'] = replace_query_param(url, 'parte', 'recetas')
+        return response
 
     # ----------------------------------------------------
-    # 3. DETALLE (GET /app/especialidades/{id}/)
-    # Comportamiento: Retorna el objeto con código 200 OK o 404 Not Found.
+    # BÚSQUEDA (GET /app/pacientes/search/?q=&limite=)
+    # Prefijo de DNI o de apellido/nombre sin acentos, por índice (ver
+    # app.search). Devuelve los primeros resultados, sin paginar.
     # ----------------------------------------------------
-    def retrieve(self, request, pk=None):
-        try:
-            # Usamos el ORM para obtener la instancia (más seguro que raw)
-            instance = get_object_or_404(Especialidad, pk=pk)
-        except Exception:
-            return Response(status=status.HTTP_404_NOT_FOUND)
-            
-        # Ejecutamos nuestra query SQL para obtener los datos
-        sql_query = "SELECT id, nombre FROM app_especialidad WHERE id = %s"
-        
-        # Usamos .raw() solo para simular que la lectura viene de SQL
-        queryset = Especialidad.objects.raw(sql_query, [pk])
-        
-        # Obtenemos el primer (y único) resultado
+    @action(detail=False, methods=['get'])
+    def search(self, request):
         try:
-            data_instance = queryset.model.objects.get(pk=pk)
-        except Especialidad.DoesNotExist:
-             return Response(status=status.HTTP_404_NOT_FOUND)
-
-        serializer = EspecialidadSerializer(data_instance)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    
-    # ----------------------------------------------------
-    # 4. ACTUALIZAR (PUT /app/especialidades/{id}/)
-    # Comportamiento: Retorna el objeto actualizado con código 200 OK.
-    # ----------------------------------------------------
-    def update(self, request, pk=None):
-        data = request.data
-        
-        # 1. Validación de datos
-        serializer = EspecialidadSerializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        
-        try:
-            with connection.cursor() as cursor:
-                # Query de UPDATE con SQL puro
-                cursor.execute(
-                    """
-                    UPDATE app_especialidad SET nombre = %s
-                    WHERE id = %s
-                    """,
-                    [data['nombre'], pk]
-                )
-            
-            # Devolvemos el objeto actualizado
-            updated_data = {'id': int(pk), 'nombre': data['nombre']}
-            return Response(updated_data, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            return Response({'detail': f'Error SQL al actualizar: {e}'}, 
+            limite = int(request.query_params.get('limite', search.LIMITE))
+        except ValueError:
+            return Response({'limite': ['Debe ser un número entero.']},
                             status=status.HTTP_400_BAD_REQUEST)
+        pacientes = search.buscar(self.get_queryset(), request.query_params.get('q', ''), limite)
+        return Response(self.get_serializer(pacientes, many=True).data)
+
+# ---
+
+# ViewSet para Médico (CRUD completo)
+class MedicoViewSet(CamposMixin, FastReadMixin, viewsets.ModelViewSet):
+    queryset = Medico.objects.select_related('especialidad')
+    serializer_class = MedicoSerializer
+    cache_models = (Medico, Especialidad)
+
+    @cache_lectura
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_lectura
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     # ----------------------------------------------------
-    # 5. ELIMINAR (DELETE /app/especialidades/{id}/)
-    # Comportamiento: Retorna un código 204 No Content.
+    # SLOTS LIBRES (GET /app/medicos/{id}/slots/?desde=&hasta=&duracion=)
+    # Expande la disponibilidad semanal del médico y descuenta los turnos
+    # no cancelados del rango. Costo: O(slots + turnos en el rango).
     # ----------------------------------------------------
-    def destroy(self, request, pk=None):
-        try:
-            with connection.cursor() as cursor:
-                # Query de DELETE con SQL puro
-                cursor.execute(
-                    "DELETE FROM app_especialidad WHERE id = %s",
-                    [pk]
-                )
-            
-            # Devolvemos una respuesta 204 sin contenido
-            return Response(status=status.HTTP_204_NO_CONTENT)
-            
-        except Exception as e:
-            # Capturar errores de integridad referencial
-            return Response({'detail': f'Error SQL al eliminar: {e}'}, 
-                            status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=True, methods=['get'])
+    def slots(self, request, pk=None):
+        medico = self.get_object()
+        params = SlotsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        desde = params.validated_data['desde']
+        hasta = params.validated_data['hasta']
+        duracion = params.validated_data['duracion']
 
-# ---
+        disponibilidades = DisponibilidadMedico.objects.filter(medico=medico).values_list(
+            'dia_semana', 'hora_inicio', 'hora_fin'
+        )
+        ventanas = fusionar_intervalos(expandir_ventanas(disponibilidades, desde, hasta))
+        if not ventanas:
+            return Response([], status=status.HTTP_200_OK)
 
-# ViewSet para Paciente (CRUD completo)
-class PacienteViewSet(viewsets.ModelViewSet):
-    queryset = Paciente.objects.all()
-    serializer_class = PacienteSerializer
+        turnos = (
+            Turno.objects
+            .filter(
+                medico=medico,
+                fecha__gte=ventanas[0][0] - MARGEN_TURNOS,
+                fecha__lt=ventanas[-1][1],
+            )
+            .exclude(estado='Cancelado')
+            .order_by('fecha')
+            .values_list('fecha', 'duracion')
+        )
+        ocupados = intervalos_ocupados(turnos)
 
-# ---
+        data = [
+            {'inicio': inicio, 'fin': fin}
+            for inicio, fin in slots_libres(ventanas, ocupados, duracion)
+        ]
+        return Response(data, status=status.HTTP_200_OK)
 
-# ViewSet para Médico (CRUD completo)
-class MedicoViewSet(viewsets.ModelViewSet):
-    queryset = Medico.objects.all()
-    serializer_class = MedicoSerializer
+    # ----------------------------------------------------
+    # AGENDA SEMANAL (GET /app/medicos/{id}/agenda/?semana=2025-W23)
+    # Turnos no cancelados de la semana ISO (por defecto, la actual). Se sirve
+    # desde la caché compartida; sólo la invalidan cambios en turnos de esa
+    # semana (ver app.agenda).
+    # ----------------------------------------------------
+    @action(detail=True, methods=['get'])
+    def agenda(self, request, pk=None):
+        params = AgendaQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        año, semana = params.validated_data.get('semana') or agenda.semana_iso(timezone.localdate())
+        try:
+            medico_id = int(pk)
+        except ValueError:
+            raise Http404
+        data = agenda.agenda_semanal(medico_id, año, semana)
+        if data is None:
+            raise Http404
+        return Response(data)
 
 # ---
 
+class ConflictoDeAgenda(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'El médico ya tiene un turno que se solapa con este horario.'
+    default_code = 'turno_superpuesto'
+
 # ViewSet para Turno (CRUD completo)
-class TurnoViewSet(viewsets.ModelViewSet):
-    queryset = Turno.objects.all()
+class TurnoViewSet(CamposMixin, FastReadMixin, ExportMixin, viewsets.ModelViewSet):
+    # select_related: los StringRelatedField no disparan una query por fila.
+    queryset = Turno.objects.select_related('paciente', 'medico')
     serializer_class = TurnoSerializer
-    filterset_fields = ['medico', 'paciente', 'estado'] # Opcional: para filtrar por campos
+    pagination_class = TurnoPagination
+    export_fields = ('id', 'paciente', 'medico', 'fecha', 'estado',
+                     'motivo_consulta', 'duracion', 'recordatorio')
+    # ?medico=&paciente=&estado=&fecha__gte=&fecha__lt= (respaldados por los índices de Turno)
+    filterset_fields = {
+        'medico': ['exact'],
+        'paciente': ['exact'],
+        'estado': ['exact'],
+        'fecha': ['gte', 'lt'],
+    }
+
+    # Crear/editar reserva la agenda en la misma transacción (ver app.reservas):
+    # si otro request tomó el horario, el INSERT de la reserva falla y se
+    # responde 409 sin dejar el turno a medio guardar.
+    def perform_create(self, serializer):
+        # Turno.save() reserva la agenda en su propia transacción.
+        try:
+            serializer.save()
+        except TurnoSuperpuesto as e:
+            raise ConflictoDeAgenda(str(e))
+
+    def perform_update(self, serializer):
+        self.perform_create(serializer)
+
+    # ----------------------------------------------------
+    # LOTES (POST / PATCH /app/turnos/bulk/)
+    # Recibe una lista de turnos; valida en bloque y escribe todo en una
+    # transacción. Ante cualquier error devuelve 400 con un error por item.
+    # ----------------------------------------------------
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        try:
+            if request.method == 'POST':
+                turnos = crear_turnos(request.data)
+                codigo = status.HTTP_201_CREATED
+            else:
+                turnos = actualizar_turnos(request.data)
+                codigo = status.HTTP_200_OK
+        except LoteInvalido as e:
+            return Response(e.errores, status=status.HTTP_400_BAD_REQUEST)
+        except TurnoSuperpuesto as e:
+            raise ConflictoDeAgenda(str(e))
+
+        serializer = self.get_serializer(turnos, many=True)
+        return Response(serializer.data, status=codigo)
 
 # ---
 
 # ViewSet para Receta (CRUD completo)
-class RecetaViewSet(viewsets.ModelViewSet):
-    queryset = Receta.objects.all()
+class RecetaViewSet(CamposMixin, FastReadMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = Receta.objects.select_related('paciente', 'medico')
     serializer_class = RecetaSerializer
+    export_fields = ('id', 'medico', 'paciente', 'descripcion')
 
 # ---
 
 # ViewSet para DisponibilidadMedico (CRUD completo)
-class DisponibilidadMedicoViewSet(viewsets.ModelViewSet):
+class DisponibilidadMedicoViewSet(CamposMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = DisponibilidadMedico.objects.all()
     serializer_class = DisponibilidadMedicoSerializer
 
 # ---
 
 # ViewSet para HistorialClinico (CRUD completo)
-class HistorialClinicoViewSet(viewsets.ModelViewSet):
+class HistorialClinicoViewSet(CamposMixin, FastReadMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = HistorialClinico.objects.all()
     serializer_class = HistorialClinicoSerializer
+    pagination_class = KeysetPagination
+    export_fields = ('turno_id', 'paciente', 'descripcion')
+
+# ---
+
+# Búsqueda de texto completo en historiales y recetas (solo lectura)
+class BusquedaViewSet(viewsets.ViewSet):
+    # ----------------------------------------------------
+    # GET /app/busqueda/?q=&paciente=&medico=&tipo=&limite=
+    # Resultados ordenados por relevancia (ver app.fts): una query por tipo.
+    # ----------------------------------------------------
+    def list(self, request):
+        params = BusquedaQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        datos = params.validated_data
+        tipos = [datos['tipo']] if 'tipo' in datos else None
+        return Response(fts.buscar(
+            datos['q'], paciente=datos.get('paciente'), medico=datos.get('medico'),
+            tipos=tipos, limite=datos['limite'],
+        ))
+
+# ---
+
+# Reporte de asistencia por médico (solo lectura, lee ResumenAsistencia)
+class ReporteAsistenciaViewSet(viewsets.ViewSet):
+    # ----------------------------------------------------
+    # GET /app/reportes/asistencia/?desde=&hasta=&medico=
+    # Turnos por estado y por día de cada médico (ver app.asistencia).
+    # ----------------------------------------------------
+    def list(self, request):
+        params = ReporteAsistenciaQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        datos = params.validated_data
+        return Response({
+            'desde': datos['desde'],
+            'hasta': datos['hasta'],
+            'resultados': asistencia.reporte(datos['desde'], datos['hasta'], datos.get('medico')),
+        })
+
+# ---
+
+# Feed de cambios para clientes offline (solo lectura, lee Cambio)
+class SyncViewSet(viewsets.ViewSet):
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    # ----------------------------------------------------
+    # GET /app/sync/?since=<cursor>&limite=
+    # Especialidades, médicos, pacientes y turnos creados o modificados
+    # después del cursor (con el formato de sus listados, sin los nombres de
+    # los objetos relacionados) e ids de los
+    # eliminados. El cliente guarda `cursor` y repite mientras `hay_mas`
+    # (ver app.sync).
+    # ----------------------------------------------------
+    def list(self, request):
+        params = SyncQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        datos = params.validated_data
+        return Response(sync.cambios(datos['since'], datos['limite']))
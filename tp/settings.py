@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -42,10 +44,15 @@ INSTALLED_APPS = [
     'corsheaders', 
     'rest_framework',
     'rest_framework_simplejwt',
+    'django_filters',
     "app"
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir todo el resto de la cadena (ver app.metrics).
+    'app.metrics.MetricasMiddleware',
+    # Decide si el request lee de las réplicas o del primario (ver app.routers).
+    'app.routers.ReplicasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
@@ -79,13 +86,114 @@ WSGI_APPLICATION = 'tp.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil de SQLite para varios workers (python manage.py bench_sqlite):
+# - WAL: los lectores no bloquean al que escribe ni al revés, y
+#   synchronous=NORMAL hace fsync en los checkpoints y no en cada commit (con
+#   WAL no se corrompe la base; un corte de luz puede perder el último commit).
+# - busy_timeout: esperar el lock en lugar de fallar con "database is locked".
+# - transaction_mode IMMEDIATE: cada atomic() toma el lock de escritura al
+#   empezar. Con DEFERRED, una transacción que lee y después escribe choca con
+#   otra que ya escribe y SQLite falla al instante, sin esperar busy_timeout.
+# - Caché de páginas de 64 MB, mmap de 256 MB y temporales en memoria.
+# - Conexiones persistentes (CONN_MAX_AGE): los PRAGMA se aplican una vez por
+#   conexión. Bajo ASGI conviene DB_CONN_MAX_AGE=0: cada request puede usar
+#   un hilo distinto y las conexiones de hilos viejos no se reutilizan.
+SQLITE_PRAGMAS = ';'.join([
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA cache_size = -64000',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA journal_size_limit = 67108864',
+])
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Réplicas de lectura (ver app.routers): DB_REPLICAS es una lista de archivos
+# SQLite separados por comas, copias del primario que mantiene otro proceso
+# (p. ej. litestream o LiteFS). Se abren con query_only para que una escritura
+# mal ruteada falle en lugar de divergir. Sin DB_REPLICAS todo va a 'default';
+# el alias 'replica' existe igual (apuntando al primario) para los tests,
+# donde espeja a la base de tests de 'default'.
+_REPLICAS = [nombre for nombre in os.environ.get('DB_REPLICAS', '').split(',') if nombre]
+for _i, _nombre in enumerate(_REPLICAS or [DATABASES['default']['NAME']]):
+    DATABASES['replica' if _i == 0 else f'replica{_i + 1}'] = {
+        **DATABASES['default'],
+        'NAME': _nombre,
+        'OPTIONS': {'init_command': SQLITE_PRAGMAS + ';PRAGMA query_only = ON'},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default'] if _REPLICAS else []
+DATABASE_ROUTERS = ['app.routers.ReplicaRouter']
+# Segundos que un cliente sigue leyendo del primario después de escribir.
+REPLICA_PEGADO_SEGUNDOS = int(os.environ.get('REPLICA_PEGADO_SEGUNDOS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Backend compartido entre procesos: las versiones de app.cache y las agendas
+# de app.agenda tienen que ser las mismas para todos los workers. Con
+# REDIS_URL (p. ej. redis://localhost:6379/0) se usa Redis; si no, archivos
+# en el directorio temporal (sirve para varios workers en una misma máquina).
+#
+# Los archivos tienen un tope de entradas y al pasarlo se borra un tercio al
+# azar, versiones y marcas INVALIDADA incluidas. CACHE_MAX_ENTRIES tiene que
+# cubrir todas las claves vivas: una versión por modelo y por médico, una
+# agenda por médico y semana consultada, las respuestas de listados y un
+# usuario por token activo. El default alcanza para unos miles de médicos;
+# como FileBasedCache además lista el directorio en cada escritura, con más
+# volumen la agenda necesita Redis.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': Path(tempfile.gettempdir()) / 'tp_cache',
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 50_000))},
+        }
+    }
+
+
+# Métricas (app.metrics, GET /metrics en formato Prometheus)
+# Cada worker vuelca sus histogramas en METRICS_DIR; /metrics los suma.
+# Fuera de DEBUG, /metrics responde 403 mientras no haya METRICS_TOKEN.
+
+METRICS_DIR = Path(os.environ.get('METRICS_DIR', Path(tempfile.gettempdir()) / 'tp_metricas'))
+METRICS_INTERVALO = float(os.environ.get('METRICS_INTERVALO', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# Email (recordatorios de turnos: manage.py enviar_recordatorios)
+# https://docs.djangoproject.com/en/5.2/topics/email/
+# Para desarrollo alcanza con un servidor SMTP de prueba local, por ejemplo:
+#   python -m aiosmtpd -n -l localhost:1025
+
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'turnos@clinica.local')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,11 +243,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # Esta línea asegura que las vistas estén protegidas por JWT por defecto
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Mismas validaciones que JWTAuthentication, con el usuario en caché.
+        'app.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_FILTER_BACKENDS': (
+        'django_filters.rest_framework.DjangoFilterBackend',
+    ),
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -156,6 +268,10 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Segundos que CachedJWTAuthentication reutiliza el usuario sin ir a la base
+# (se invalida antes al guardar o borrar el usuario).
+JWT_USER_CACHE_TIMEOUT = int(os.environ.get('JWT_USER_CACHE_TIMEOUT', 60))
+
 """
 JAZZMIN_SETTINGS = {
     # Títulos